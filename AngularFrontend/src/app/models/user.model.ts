@@ -3,3 +3,24 @@ export interface User {
   name: string;
   email: string;
 }
+
+export interface UserPage {
+  users: User[];
+  nextCursor: string | null;
+}
+
+export interface UserQuery {
+  q?: string;
+  email?: string;
+  name_prefix?: string;
+  sort?: 'id' | '-id' | 'name' | '-name' | 'email' | '-email';
+  // Comma-separated, e.g. 'name'; the other User fields are then absent
+  fields?: string;
+}
+
+export interface UserChanges {
+  users: User[];
+  deleted: number[];
+  token: string;
+  has_more: boolean;
+}
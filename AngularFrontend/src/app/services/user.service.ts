@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
-import { User } from '../models/user.model';
+import { HttpClient, HttpParams } from '@angular/common/http';
+import { EMPTY, Observable, expand, map, reduce } from 'rxjs';
+import { User, UserChanges, UserPage, UserQuery } from '../models/user.model';
 import { environment } from '../../environments/environments';
 
 @Injectable({
@@ -11,9 +11,53 @@ export class UserService {
 
   constructor(private http: HttpClient) {}
 
-  getUsers(): Observable<User[]> {
-    // Auth header is attached by AuthInterceptor registered in app config
-    return this.http.get<User[]>(environment.api.user);
+  getUsers(pageSize = 500): Observable<User[]> {
+    // Walk the keyset pages so the server never materializes the full table
+    return this.getUsersPage(pageSize).pipe(
+      expand((page) => page.nextCursor ? this.getUsersPage(pageSize, page.nextCursor) : EMPTY),
+      reduce((all, page) => all.concat(page.users), [] as User[])
+    );
+  }
+
+  getUsersPage(limit: number, cursor?: string | null, query: UserQuery = {}): Observable<UserPage> {
+    // Auth header is attached by AuthInterceptor registered in app config.
+    // Filtering and sorting happen on the server; the cursor only fits the same query.
+    let params = new HttpParams().set('limit', limit);
+    for (const [key, value] of Object.entries(query)) {
+      if (value) {
+        params = params.set(key, value);
+      }
+    }
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get<User[]>(environment.api.user, { params, observe: 'response' }).pipe(
+      map((res) => ({
+        users: res.body ?? [],
+        nextCursor: res.headers.get('X-Next-Cursor'),
+      }))
+    );
+  }
+
+  getChanges(since: string | null, limit = 500): Observable<UserChanges> {
+    // Follow has_more until caught up; the last response carries the token to keep
+    return this.getChangesPage(since, limit).pipe(
+      expand((page) => page.has_more ? this.getChangesPage(page.token, limit) : EMPTY),
+      reduce((all, page) => ({
+        users: all.users.concat(page.users),
+        deleted: all.deleted.concat(page.deleted),
+        token: page.token,
+        has_more: false,
+      }), { users: [], deleted: [], token: since ?? '', has_more: false } as UserChanges)
+    );
+  }
+
+  getChangesPage(since: string | null, limit: number): Observable<UserChanges> {
+    let params = new HttpParams().set('limit', limit);
+    if (since) {
+      params = params.set('since', since);
+    }
+    return this.http.get<UserChanges>(`${environment.api.user}/changes`, { params });
   }
 
   getUsersbyId(id: number): Observable<User[]> {
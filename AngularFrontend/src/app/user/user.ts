@@ -2,7 +2,7 @@ import { Component, OnInit, OnDestroy } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { UserService } from '../services/user.service';
-import { User } from '../models/user.model';
+import { User, UserChanges } from '../models/user.model';
 import { AuthService } from '../services/auth.service';
 import { ToastService } from '../services/toast.service';
 
@@ -18,6 +18,8 @@ export class UserComponent implements OnInit, OnDestroy {
   error: string | null = null;
   countdown = '';
   intervalId: any;
+  syncIntervalId: any;
+  syncToken: string | null = null;
   remaining: string | null = null;
 
   form: { name: string; email: string } = { name: '', email: '' };
@@ -33,20 +35,30 @@ export class UserComponent implements OnInit, OnDestroy {
   ngOnInit(): void {
     this.fetchUsers();
     this.startCountdown();
+    // Cheap when nothing changed: the feed only returns rows newer than the token
+    this.syncIntervalId = setInterval(() => this.fetchUsers(), 30000);
   }
 
   ngOnDestroy(): void {
     clearInterval(this.intervalId);
+    clearInterval(this.syncIntervalId);
   }
 
   fetchUsers(): void {
-    this.loading = true;
-    this.userService.getUsers().subscribe({
-      next: (list) => {
-        this.users = list ?? [];
+    this.loading = this.syncToken === null;
+    this.userService.getChanges(this.syncToken).subscribe({
+      next: (changes) => {
+        this.applyChanges(changes);
         this.loading = false;
       },
       error: (err) => {
+        if (err?.status === 410) {
+          // Token older than the kept deletions: start over with a full sync
+          this.syncToken = null;
+          this.users = [];
+          this.fetchUsers();
+          return;
+        }
         this.loading = false;
         this.toastService.show(err?.message ?? 'Unable to load users', 'error');
       },
@@ -66,10 +78,10 @@ export class UserComponent implements OnInit, OnDestroy {
       : this.userService.createUser(this.form);
 
     request.subscribe({
-      next: () => {
+      next: (saved) => {
         this.toastService.show(this.activeUserId ? 'User updated successfully' : 'User created successfully', 'success');
-        this.fetchUsers();  // Refresh full user list
-        this.resetForm();   // Clear form
+        this.upsertUser(saved);  // API returns the stored row, no need to re-fetch the list
+        this.resetForm();        // Clear form
       },
       error: (err) => {
         this.toastService.show(err?.message ?? 'Something went wrong', 'error');
@@ -78,6 +90,21 @@ export class UserComponent implements OnInit, OnDestroy {
   }
 
 
+  applyChanges(changes: UserChanges): void {
+    const byId = new Map(this.users.map((u) => [u.id, u] as [number, User]));
+    changes.users.forEach((u) => byId.set(u.id, u));
+    changes.deleted.forEach((id) => byId.delete(id));
+    this.users = [...byId.values()].sort((a, b) => a.id - b.id);
+    this.syncToken = changes.token;
+  }
+
+  upsertUser(saved: User): void {
+    const index = this.users.findIndex((u) => u.id === saved.id);
+    this.users = index === -1
+      ? [...this.users, saved]
+      : this.users.map((u) => (u.id === saved.id ? saved : u));
+  }
+
   edit(user: User): void {
     this.activeUserId = user.id ?? null;
     this.form = { name: user.name, email: user.email };
@@ -1,5 +1,7 @@
+# Development server only; production runs gunicorn -c gunicorn.conf.py wsgi:app
 from app import create_app
+from app.config import Config
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True,host='0.0.0.0',port=5000)
\ No newline at end of file
+    app.run(debug=Config.FLASK_DEBUG,host='0.0.0.0',port=5000)
\ No newline at end of file
@@ -18,10 +18,14 @@ except Exception:
             if app is not None:
                 app.logger.warning('Flask-Cors not installed; CORS will not be applied')
 
-from app.routes import user_bp
+from app.routes import user_bp, monitoring_bp
+from app.helpers.json_provider import FastJSONProvider
 
 def create_app():
     app = Flask(__name__)
+    # orjson-backed JSON (stdlib fallback) that also encodes SQL Server types
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
     # Load configuration from app.config.Config
     app.config.from_object('app.config.Config')
     
@@ -72,12 +76,24 @@ def create_app():
         app,
         resources={r"/api/*": {"origins": app.config.get('CORS_ORIGINS', '*')}},
         supports_credentials=True,
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", "If-Match", "If-None-Match"],
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        expose_headers=["X-Next-Cursor", "Link", "ETag"],
     )
     
     # Register Blueprint
     app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(monitoring_bp)
+
+    # Request latency / in-flight / error metrics exported at /metrics
+    from app.helpers import metrics, profiling
+    metrics.init_app(app)
+    # Server-Timing header, slow request/query log, sampled cProfile
+    profiling.init_app(app)
+    # gzip/brotli by Accept-Encoding; registered last so it runs first and
+    # its time shows up in Server-Timing
+    from app.helpers import compression
+    compression.init_app(app)
 
     # register error handlers
     from app.helpers.errors import register_error_handlers
@@ -23,6 +23,160 @@ ODBC_DRIVER = os.getenv("ODBC_DRIVER", "ODBC Driver 18 for SQL Server")
 DB_ENCRYPT = os.getenv("DB_ENCRYPT", "yes")
 DB_TRUSTSERVERCERTIFICATE = os.getenv("DB_TRUSTSERVERCERTIFICATE", "yes")
 
+# Connection pool sizing (per worker process)
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "0"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))
+
+# Circuit breaker in front of get_db_connection: open after this many
+# consecutive connect/disconnect failures, probe again after the timeout
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5"))
+DB_BREAKER_RESET_TIMEOUT = float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "10"))
+DB_BREAKER_HALF_OPEN_PROBES = int(os.getenv("DB_BREAKER_HALF_OPEN_PROBES", "1"))
+# Retries of read-only procedures on transient errors (jittered exponential backoff)
+DB_READ_RETRIES = int(os.getenv("DB_READ_RETRIES", "2"))
+DB_RETRY_BACKOFF_BASE = float(os.getenv("DB_RETRY_BACKOFF_BASE", "0.05"))
+DB_RETRY_BACKOFF_MAX = float(os.getenv("DB_RETRY_BACKOFF_MAX", "1"))
+
+# Admission control for the /api routes: concurrent requests per route class
+# and per worker (0 = unlimited); excess requests queue briefly, then get 503
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", str(DB_POOL_MAX_SIZE)))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(max(1, DB_POOL_MAX_SIZE // 2))))
+ADMISSION_LOGIN_LIMIT = int(os.getenv("ADMISSION_LOGIN_LIMIT", "4"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+
+# Token-bucket rate limit per JWT subject (429 when exceeded)
+# RATE_LIMIT_BACKEND: sqlite (shared by the workers on a host), memory (per process) or none
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite")
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "50"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH")
+
+# JWT signing keys as "kid:secret,kid:secret" (default: SECRET_KEY alone).
+# New tokens are signed with JWT_ACTIVE_KID (default: the first key); every
+# listed key still verifies, so keys rotate without logging anyone out.
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+# Verified tokens remembered per worker until they expire
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Revoked tokens (POST /api/logout): sqlite (shared by the workers on a host)
+# or memory (per process); other workers pick up a revocation within
+# AUTH_REVOCATION_REFRESH seconds
+AUTH_REVOCATION_BACKEND = os.getenv("AUTH_REVOCATION_BACKEND", "sqlite")
+AUTH_REVOCATION_SQLITE_PATH = os.getenv("AUTH_REVOCATION_SQLITE_PATH")
+AUTH_REVOCATION_REFRESH = float(os.getenv("AUTH_REVOCATION_REFRESH", "1"))
+
+# Password hashes in logins.password. Stored hashes carry their parameters, so
+# changing these only affects new hashes; older ones are upgraded on login.
+# PASSWORD_HASH_ALGORITHM: pbkdf2_sha256 or scrypt
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Hashing threads per worker (each keeps a core busy while it hashes), jobs
+# allowed to wait for them, and how long a login waits before a 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "1"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "8"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2"))
+
+# Background database probe behind /readyz and /api/health
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_STALE_AFTER = float(os.getenv("HEALTH_STALE_AFTER", str(HEALTH_CHECK_INTERVAL * 3)))
+
+# Pagination of GET /api/users
+USERS_PAGE_DEFAULT_LIMIT = int(os.getenv("USERS_PAGE_DEFAULT_LIMIT", "100"))
+USERS_PAGE_MAX_LIMIT = int(os.getenv("USERS_PAGE_MAX_LIMIT", "1000"))
+
+# Rows fetched per round-trip by GET /api/users/export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Maximum users accepted by one POST /api/users/bulk request
+BULK_MAX_USERS = int(os.getenv("BULK_MAX_USERS", "5000"))
+
+# Cache-Control of user resources. Responses carry ETags, so "no-cache" still
+# lets browsers keep them and revalidate with If-None-Match (304, no body).
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+# Response compression (gzip, or brotli when the brotli package is installed),
+# negotiated by Accept-Encoding. Bodies under COMPRESSION_MIN_SIZE bytes are
+# sent as is. Compressed bodies of responses with an ETag (list pages, users)
+# are kept per worker, up to COMPRESSION_CACHE_SIZE entries (0 disables).
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "64"))
+COMPRESSION_CACHE_TTL = float(os.getenv("COMPRESSION_CACHE_TTL", "300"))
+
+# Maximum operations accepted by one POST /api/batch request
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "100"))
+
+# Read-through cache in front of UserService.get_user_by_id
+# USER_CACHE_BACKEND: memory (per process, kept coherent across workers through
+# the sqlite event channel; disabled with several workers and no shared
+# channel), redis (shared) or none
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL")
+
+# GET /metrics: METRICS_BACKEND sqlite (every worker on the host, combined
+# through a local file each worker updates at most every
+# METRICS_PUBLISH_INTERVAL seconds) or memory (the worker that answers)
+METRICS_BACKEND = os.getenv("METRICS_BACKEND", "sqlite")
+METRICS_SQLITE_PATH = os.getenv("METRICS_SQLITE_PATH")
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "1"))
+
+# Request profiling: Server-Timing header, slow logs, sampled cProfile
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+# Production server (gunicorn.conf.py). Pools and caches are per worker, so
+# SQL Server sees up to WEB_WORKERS * DB_POOL_MAX_SIZE connections.
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str((os.cpu_count() or 1) * 2 + 1)))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "30"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "10000"))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "1000"))
+WEB_PRELOAD = os.getenv("WEB_PRELOAD", "true").lower() == "true"
+
+# Server-Sent Events on GET /api/users/stream
+# EVENTS_BACKEND: sqlite (shared by the workers on this host), memory (per process) or none
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "sqlite")
+EVENTS_SQLITE_PATH = os.getenv("EVENTS_SQLITE_PATH")
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "10000"))
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "0.2"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+# Every open stream holds a request thread; leave some for ordinary requests
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", str(max(1, WEB_THREADS // 2))))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+
+# ASGI mode (asgi.py): requests run on this many threads per worker. More
+# threads than can hold an admission slot or wait in an admission queue only
+# pile requests up in front of the pool, where nothing sheds them; fewer
+# leave slots idle. Streams hold a thread each, and a few are kept for
+# probes and metrics.
+_ADMITTED = (ADMISSION_READ_LIMIT or DB_POOL_MAX_SIZE) + (ADMISSION_WRITE_LIMIT or DB_POOL_MAX_SIZE) \
+    + ADMISSION_LOGIN_LIMIT + 3 * ADMISSION_QUEUE_SIZE if ADMISSION_ENABLED else DB_POOL_MAX_SIZE
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", str(_ADMITTED + EVENTS_MAX_SUBSCRIBERS + 4)))
+
+# Development server (python app.py) only
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "false").lower() == "true"
+
 
 def build_pyodbc_conn_str() -> str:
     # Build the connection string with encryption support
@@ -41,3 +195,85 @@ class Config:
     SECRET_KEY = SECRET_KEY
     SQLALCHEMY_DATABASE_URI = build_pyodbc_conn_str()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_CONNECT_TIMEOUT = DB_CONNECT_TIMEOUT
+    DB_POOL_MIN_SIZE = DB_POOL_MIN_SIZE
+    DB_POOL_MAX_SIZE = DB_POOL_MAX_SIZE
+    DB_POOL_TIMEOUT = DB_POOL_TIMEOUT
+    DB_POOL_IDLE_TIMEOUT = DB_POOL_IDLE_TIMEOUT
+    DB_POOL_VALIDATE_AFTER = DB_POOL_VALIDATE_AFTER
+    DB_BREAKER_FAILURE_THRESHOLD = DB_BREAKER_FAILURE_THRESHOLD
+    DB_BREAKER_RESET_TIMEOUT = DB_BREAKER_RESET_TIMEOUT
+    DB_BREAKER_HALF_OPEN_PROBES = DB_BREAKER_HALF_OPEN_PROBES
+    DB_READ_RETRIES = DB_READ_RETRIES
+    DB_RETRY_BACKOFF_BASE = DB_RETRY_BACKOFF_BASE
+    DB_RETRY_BACKOFF_MAX = DB_RETRY_BACKOFF_MAX
+    JWT_KEYS = JWT_KEYS
+    JWT_ACTIVE_KID = JWT_ACTIVE_KID
+    AUTH_CACHE_SIZE = AUTH_CACHE_SIZE
+    AUTH_REVOCATION_BACKEND = AUTH_REVOCATION_BACKEND
+    AUTH_REVOCATION_SQLITE_PATH = AUTH_REVOCATION_SQLITE_PATH
+    AUTH_REVOCATION_REFRESH = AUTH_REVOCATION_REFRESH
+    PASSWORD_HASH_ALGORITHM = PASSWORD_HASH_ALGORITHM
+    PASSWORD_PBKDF2_ITERATIONS = PASSWORD_PBKDF2_ITERATIONS
+    PASSWORD_SCRYPT_N = PASSWORD_SCRYPT_N
+    PASSWORD_SCRYPT_R = PASSWORD_SCRYPT_R
+    PASSWORD_SCRYPT_P = PASSWORD_SCRYPT_P
+    PASSWORD_HASH_WORKERS = PASSWORD_HASH_WORKERS
+    PASSWORD_HASH_QUEUE_SIZE = PASSWORD_HASH_QUEUE_SIZE
+    PASSWORD_HASH_QUEUE_TIMEOUT = PASSWORD_HASH_QUEUE_TIMEOUT
+    HEALTH_CHECK_INTERVAL = HEALTH_CHECK_INTERVAL
+    HEALTH_STALE_AFTER = HEALTH_STALE_AFTER
+    ADMISSION_ENABLED = ADMISSION_ENABLED
+    ADMISSION_READ_LIMIT = ADMISSION_READ_LIMIT
+    ADMISSION_WRITE_LIMIT = ADMISSION_WRITE_LIMIT
+    ADMISSION_LOGIN_LIMIT = ADMISSION_LOGIN_LIMIT
+    ADMISSION_QUEUE_SIZE = ADMISSION_QUEUE_SIZE
+    ADMISSION_QUEUE_TIMEOUT = ADMISSION_QUEUE_TIMEOUT
+    RATE_LIMIT_BACKEND = RATE_LIMIT_BACKEND
+    RATE_LIMIT_PER_SECOND = RATE_LIMIT_PER_SECOND
+    RATE_LIMIT_BURST = RATE_LIMIT_BURST
+    RATE_LIMIT_SQLITE_PATH = RATE_LIMIT_SQLITE_PATH
+    USERS_PAGE_DEFAULT_LIMIT = USERS_PAGE_DEFAULT_LIMIT
+    USERS_PAGE_MAX_LIMIT = USERS_PAGE_MAX_LIMIT
+    EXPORT_BATCH_SIZE = EXPORT_BATCH_SIZE
+    BULK_MAX_USERS = BULK_MAX_USERS
+    HTTP_CACHE_CONTROL = HTTP_CACHE_CONTROL
+    COMPRESSION_ENABLED = COMPRESSION_ENABLED
+    COMPRESSION_MIN_SIZE = COMPRESSION_MIN_SIZE
+    COMPRESSION_GZIP_LEVEL = COMPRESSION_GZIP_LEVEL
+    COMPRESSION_BROTLI_QUALITY = COMPRESSION_BROTLI_QUALITY
+    COMPRESSION_CACHE_SIZE = COMPRESSION_CACHE_SIZE
+    COMPRESSION_CACHE_TTL = COMPRESSION_CACHE_TTL
+    BATCH_MAX_OPERATIONS = BATCH_MAX_OPERATIONS
+    USER_CACHE_BACKEND = USER_CACHE_BACKEND
+    USER_CACHE_MAXSIZE = USER_CACHE_MAXSIZE
+    USER_CACHE_TTL = USER_CACHE_TTL
+    USER_CACHE_REDIS_URL = USER_CACHE_REDIS_URL
+    METRICS_BACKEND = METRICS_BACKEND
+    METRICS_SQLITE_PATH = METRICS_SQLITE_PATH
+    METRICS_PUBLISH_INTERVAL = METRICS_PUBLISH_INTERVAL
+    SERVER_TIMING_ENABLED = SERVER_TIMING_ENABLED
+    SLOW_REQUEST_MS = SLOW_REQUEST_MS
+    SLOW_QUERY_MS = SLOW_QUERY_MS
+    PROFILE_SAMPLE_RATE = PROFILE_SAMPLE_RATE
+    PROFILE_DIR = PROFILE_DIR
+    WEB_BIND = WEB_BIND
+    WEB_WORKERS = WEB_WORKERS
+    WEB_THREADS = WEB_THREADS
+    WEB_KEEPALIVE = WEB_KEEPALIVE
+    WEB_TIMEOUT = WEB_TIMEOUT
+    WEB_GRACEFUL_TIMEOUT = WEB_GRACEFUL_TIMEOUT
+    WEB_MAX_REQUESTS = WEB_MAX_REQUESTS
+    WEB_MAX_REQUESTS_JITTER = WEB_MAX_REQUESTS_JITTER
+    WEB_PRELOAD = WEB_PRELOAD
+    ASGI_THREADS = ASGI_THREADS
+    EVENTS_BACKEND = EVENTS_BACKEND
+    EVENTS_SQLITE_PATH = EVENTS_SQLITE_PATH
+    EVENTS_HISTORY = EVENTS_HISTORY
+    EVENTS_POLL_INTERVAL = EVENTS_POLL_INTERVAL
+    EVENTS_QUEUE_SIZE = EVENTS_QUEUE_SIZE
+    EVENTS_MAX_SUBSCRIBERS = EVENTS_MAX_SUBSCRIBERS
+    EVENTS_HEARTBEAT = EVENTS_HEARTBEAT
+    EVENTS_MAX_STREAM_SECONDS = EVENTS_MAX_STREAM_SECONDS
+    EVENTS_RETRY_MS = EVENTS_RETRY_MS
+    FLASK_DEBUG = FLASK_DEBUG
@@ -0,0 +1,154 @@
+# app/helpers/admission.py
+import math
+import threading
+import time
+from flask import g, request
+from app.config import Config
+from app.helpers import metrics
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; mapped to 503 with Retry-After."""
+
+    def __init__(self, route_class, retry_after=1):
+        super().__init__(f'Too many concurrent {route_class} requests, retry in {retry_after}s')
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at a time, at most `max_queue` callers waiting for a
+    slot, and no caller waits longer than `queue_timeout` seconds. Anything
+    beyond that is shed with Overloaded instead of piling onto the database.
+    """
+
+    def __init__(self, name, limit, max_queue=32, queue_timeout=1.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._active = 0
+        self._waiting = 0
+        self._counters = {'admitted': 0, 'queued': 0, 'rejected_full': 0, 'rejected_timeout': 0}
+
+    def acquire(self):
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                self._counters['admitted'] += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._counters['rejected_full'] += 1
+                raise Overloaded(self.name, self._retry_after())
+            self._waiting += 1
+            self._counters['queued'] += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['rejected_timeout'] += 1
+                        # pass on a wake-up this waiter may have consumed
+                        self._cond.notify()
+                        raise Overloaded(self.name, self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self._counters['admitted'] += 1
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def _retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'limit': self.limit, 'active': self._active, 'waiting': self._waiting,
+                    'max_queue': self.max_queue, **self._counters}
+
+
+_limiters = {}
+
+
+def get_limiter(route_class):
+    """Per-process limiter for a route class ("read", "write" or "login"), or None if unlimited."""
+    limiter = _limiters.get(route_class)
+    if limiter is None:
+        limit = {'read': Config.ADMISSION_READ_LIMIT,
+                 'write': Config.ADMISSION_WRITE_LIMIT,
+                 'login': Config.ADMISSION_LOGIN_LIMIT}[route_class]
+        if limit <= 0:
+            return None
+        limiter = _limiters.setdefault(route_class, ConcurrencyLimiter(
+            route_class, limit, Config.ADMISSION_QUEUE_SIZE, Config.ADMISSION_QUEUE_TIMEOUT))
+    return limiter
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def _collect_admission_metrics():
+    stats = admission_stats()
+    if not stats:
+        return []
+    return [
+        ('admission_active', 'Requests holding an admission slot.',
+         {'{class="%s"}' % name: s['active'] for name, s in stats.items()}),
+        ('admission_waiting', 'Requests queued for an admission slot.',
+         {'{class="%s"}' % name: s['waiting'] for name, s in stats.items()}),
+        ('admission_rejected', 'Requests shed with 503 (since start).',
+         {'{class="%s"}' % name: s['rejected_full'] + s['rejected_timeout'] for name, s in stats.items()},
+         'counter'),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_admission_metrics)
+
+
+def protect(blueprint, overrides=None):
+    """
+    Put every route of `blueprint` behind the per-class concurrency limiters.
+
+    GET/HEAD routes count as reads, everything else as writes; `overrides`
+    maps endpoint names to another class, or to None to skip admission.
+    The slot is released at teardown, or once a streamed response has been
+    sent.
+    """
+    overrides = overrides or {}
+
+    @blueprint.before_request
+    def _admit():
+        if not Config.ADMISSION_ENABLED:
+            return
+        endpoint = (request.endpoint or '').rsplit('.', 1)[-1]
+        if endpoint in overrides:
+            route_class = overrides[endpoint]
+        else:
+            route_class = 'read' if request.method in ('GET', 'HEAD') else 'write'
+        limiter = get_limiter(route_class) if route_class else None
+        if limiter is not None:
+            limiter.acquire()
+            g._admission = limiter
+
+    @blueprint.after_request
+    def _hold_while_streaming(response):
+        # Streamed bodies are produced after teardown; release once sent
+        if response.is_streamed:
+            limiter = g.pop('_admission', None)
+            if limiter is not None:
+                response.call_on_close(limiter.release)
+        return response
+
+    @blueprint.teardown_request
+    def _release(exc):
+        limiter = g.pop('_admission', None)
+        if limiter is not None:
+            limiter.release()
+
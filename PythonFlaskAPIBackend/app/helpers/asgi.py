@@ -0,0 +1,171 @@
+# app/helpers/asgi.py
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from app.helpers.worker import init_worker, shutdown_worker
+
+
+class ClientDisconnected(Exception):
+    """Raised into a request thread whose client has gone; unwinds the WSGI iterable."""
+
+
+class WSGIToASGI:
+    """
+    Serve a WSGI app (the Flask app) from an ASGI server such as uvicorn.
+
+    Connections, keep-alive and request bodies are handled on the event loop;
+    each request then runs on a bounded thread pool, so up to `max_threads`
+    requests (and their SQL Server round-trips) are in flight per worker.
+    Unlike asgiref's WsgiToAsgi, requests are not serialized onto one thread.
+
+    Once the body is read, `receive` is watched for `http.disconnect`; the
+    request thread's next write then raises ClientDisconnected and the WSGI
+    iterable is closed, so an event stream or export stops holding its
+    thread, subscriber slot or pooled connection.
+
+    The lifespan protocol runs the same per-worker setup and teardown as
+    gunicorn's post_fork / worker_exit hooks.
+    """
+
+    def __init__(self, wsgi_app, max_threads=100):
+        self.wsgi_app = wsgi_app
+        self.max_threads = max_threads
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_threads, thread_name_prefix='asgi-request')
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                init_worker()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                shutdown_worker()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            disconnected = threading.Event()
+
+            async def watch_disconnect():
+                # The server's send() does nothing once the client is gone,
+                # so this is the only way to learn about it
+                while (await receive())['type'] != 'http.disconnect':
+                    pass
+                disconnected.set()
+
+            def send_from_thread(message):
+                if disconnected.is_set():
+                    raise ClientDisconnected()
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            watcher = loop.create_task(watch_disconnect())
+            try:
+                await loop.run_in_executor(self.executor, self._run_wsgi, scope, body, send_from_thread)
+            except ClientDisconnected:
+                pass
+            finally:
+                watcher.cancel()
+
+    def _run_wsgi(self, scope, body, send):
+        """Run one request on a pool thread, streaming the body back to the event loop."""
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response_start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+            }
+
+        def send_start():
+            if not response_start.get('sent'):
+                response_start['sent'] = True
+                send(response_start['message'])
+
+        result = self.wsgi_app(build_environ(scope, body), start_response)
+        try:
+            # Hold one chunk back so the last one goes out with more_body=False;
+            # a single-chunk response is then one write instead of two.
+            pending = None
+            for chunk in result:
+                if not chunk:
+                    continue
+                if pending is not None:
+                    send_start()
+                    send({'type': 'http.response.body', 'body': pending, 'more_body': True})
+                pending = chunk
+            send_start()
+            send({'type': 'http.response.body', 'body': pending or b'', 'more_body': False})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ (PEP 3333)."""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
@@ -1,8 +1,10 @@
 import jwt
-from datetime import datetime, timedelta
+import time
 from functools import wraps
-from flask import request, jsonify
-from app import config
+from flask import g, request, jsonify
+from app.helpers import metrics, profiling
+from app.helpers.rate_limit import check_rate_limit
+from app.helpers.tokens import get_token_verifier
 
 
 def generate_jwt_token(username, expires_in=160):
@@ -14,15 +16,21 @@ def generate_jwt_token(username, expires_in=160):
         expires_in: Token expiration time in seconds (default: 1 hour).
     
     Returns:
-        A signed JWT token.
+        A token signed with the active key; it carries a unique `jti` so
+        that it can be revoked.
     """
-    payload = {
-        'username': username,
-        'exp': datetime.utcnow() + timedelta(seconds=expires_in),
-        'iat': datetime.utcnow()
-    }
-    token = jwt.encode(payload, config.SECRET_KEY, algorithm='HS256')
-    return token
+    return get_token_verifier().issue({'username': username}, expires_in)
+
+
+def decode_jwt_token(token):
+    """
+    Verify and decode a JWT token, from the verified-token cache if possible.
+
+    Raises:
+        jwt.ExpiredSignatureError: if the token has expired.
+        jwt.InvalidTokenError: if it is invalid or revoked.
+    """
+    return get_token_verifier().decode(token)
 
 
 def verify_jwt_token(token):
@@ -36,14 +44,16 @@ def verify_jwt_token(token):
         Decoded payload (dict) if valid, None if invalid.
     """
     try:
-        payload = jwt.decode(token, config.SECRET_KEY, algorithms=['HS256'])
-        return payload
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
+        return decode_jwt_token(token)
+    except jwt.InvalidTokenError:  # includes ExpiredSignatureError
         return None
 
 
+def revoke_jwt_token(token, payload):
+    """Refuse a token from now on, in every worker on the host."""
+    get_token_verifier().revoke(token, payload)
+
+
 def token_required(f):
     """
     Decorator to protect routes that require a valid JWT token.
@@ -70,9 +80,18 @@ def token_required(f):
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
+        start = time.perf_counter()
         payload = verify_jwt_token(token)
+        elapsed = time.perf_counter() - start
+        metrics.AUTH_DECODE.observe(elapsed)
+        profiling.record('auth', elapsed)
         if payload is None:
             return jsonify({'error': 'Invalid or expired token'}), 401
+
+        g.token, g.token_payload = token, payload
+
+        # Token bucket per subject; raises RateLimited (429)
+        check_rate_limit(payload['username'])
         
         # Pass username to the route function
         return f(payload['username'], *args, **kwargs)
@@ -0,0 +1,252 @@
+# app/helpers/cache.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.config import Config
+from app.helpers import metrics
+
+logger = logging.getLogger('app.cache')
+
+MISSING = object()
+
+
+def user_key(user_id):
+    """Key of a user row in the user cache."""
+    return f"user:{user_id}"
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with a size bound and a per-entry TTL.
+    Least recently used entries are evicted first once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize=10000, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return default
+            if entry[0] <= now:
+                del self._data[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def peek(self, key, default=MISSING):
+        """The live value of `key` without counting a hit or miss or refreshing its recency."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry is not None and entry[0] > time.monotonic() else default
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'memory', 'size': len(self._data), 'maxsize': self.maxsize,
+                    'ttl': self.ttl, **self._counters}
+
+
+class RedisCache:
+    """
+    Shared cache backed by Redis, for deployments with several worker processes.
+    Values must be JSON serializable. Counters are per process.
+    """
+
+    def __init__(self, url, ttl=30.0, prefix='flask-api:'):
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key, default=MISSING):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception:
+            # A cache outage must never fail the request; fall through to the DB.
+            self._count('errors')
+            return default
+        if raw is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self._client.set(self.prefix + key, json.dumps(value), px=max(1, int(ttl * 1000)))
+        except Exception:
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            self._client.delete(self.prefix + key)
+            self._count('invalidations')
+        except Exception:
+            self._count('errors')
+
+    def clear(self):
+        try:
+            for key in self._client.scan_iter(self.prefix + '*'):
+                self._client.delete(key)
+        except Exception:
+            self._count('errors')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'redis', 'ttl': self.ttl, **self._counters}
+
+
+class NullCache:
+    """Cache that stores nothing; used when caching is disabled."""
+
+    def get(self, key, default=MISSING):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {'backend': 'none'}
+
+
+def build_cache(backend: str, maxsize: int, ttl: float, redis_url: str | None = None):
+    """
+    Create a cache for the configured backend: "memory", "redis" or "none".
+    Falls back to the in-process cache when Redis is requested but not installed.
+    """
+    backend = (backend or 'memory').lower()
+    if backend == 'none' or maxsize <= 0:
+        return NullCache()
+    if backend == 'redis' and redis_url:
+        try:
+            return RedisCache(redis_url, ttl=ttl)
+        except ImportError:
+            logger.warning('redis package not installed; falling back to in-process user cache')
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+_user_cache = None
+_user_cache_pid = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """Return the per-process cache used by UserService, creating it on first use."""
+    global _user_cache, _user_cache_pid
+    if _user_cache is not None and _user_cache_pid == os.getpid():
+        return _user_cache
+    with _user_cache_lock:
+        if _user_cache is None or _user_cache_pid != os.getpid():
+            _user_cache = _follow_other_workers(build_cache(Config.USER_CACHE_BACKEND, Config.USER_CACHE_MAXSIZE,
+                                                            Config.USER_CACHE_TTL, Config.USER_CACHE_REDIS_URL))
+            _user_cache_pid = os.getpid()
+        return _user_cache
+
+
+def _follow_other_workers(cache):
+    """
+    Keep an in-process cache coherent with writes handled by other workers.
+
+    Every worker publishes its user writes on the event channel; with the
+    shared (SQLite) channel this worker's hub thread sees them within
+    EVENTS_POLL_INTERVAL and drops the rows it has cached. Without a shared
+    channel there is nothing to follow, so with several workers the cache
+    is disabled rather than serving rows for up to USER_CACHE_TTL after
+    another worker changed or deleted them.
+    """
+    if not isinstance(cache, LRUCache):
+        return cache  # redis is shared, none holds nothing
+    from app.helpers.events import get_event_hub  # events imports admission; keep cache importable first
+    hub = get_event_hub()
+    if hub is not None and hub.channel.shared:
+        hub.add_listener(_invalidate_from_events)
+    elif Config.WEB_WORKERS > 1:
+        logger.warning('USER_CACHE_BACKEND=memory needs EVENTS_BACKEND=sqlite (or USER_CACHE_BACKEND=redis) '
+                       'with %d workers; user cache disabled', Config.WEB_WORKERS)
+        return NullCache()
+    return cache
+
+
+def _invalidate_from_events(events):
+    """Event hub listener: drop cached users that a (possibly other) worker wrote."""
+    cache = _user_cache
+    if cache is None or _user_cache_pid != os.getpid():
+        return
+    if events is None:  # some events were missed; anything may have changed
+        cache.clear()
+        return
+    for event in events:
+        if not event.type.startswith('user.'):
+            continue
+        user = json.loads(event.data)
+        key = user_key(user['id'])
+        cached = cache.peek(key)
+        # The writing worker already cached the row it announced; keep that copy
+        if cached is not MISSING and (event.type == 'user.deleted' or cached.get('version') != user.get('version')):
+            cache.delete(key)
+
+
+def _collect_cache_metrics():
+    if _user_cache is None:
+        return []
+    stats = _user_cache.stats()
+    counters = ('hits', 'misses', 'evictions', 'expirations', 'invalidations', 'errors')
+    samples = [(f'user_cache_{name}', f'User cache {name} (since start).', stats[name], 'counter')
+               for name in counters if name in stats]
+    if 'size' in stats:
+        samples.append(('user_cache_size', 'Entries in the user cache.', stats['size']))
+    return samples
+
+
+metrics.REGISTRY.add_collector(_collect_cache_metrics)
+
+
+def reset_user_cache():
+    """Drop the per-process user cache; the next access builds a fresh one."""
+    global _user_cache
+    with _user_cache_lock:
+        _user_cache = None
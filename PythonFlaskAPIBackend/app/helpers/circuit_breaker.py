@@ -0,0 +1,119 @@
+# app/helpers/circuit_breaker.py
+import math
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class DatabaseUnavailable(Exception):
+    """Raised without touching the database while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Database unavailable, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed:    calls go through; `failure_threshold` failures in a row open it.
+    open:      allow() raises DatabaseUnavailable until `reset_timeout` passes.
+    half_open: up to `half_open_max_calls` probe calls go through; a success
+               closes the breaker, a failure opens it again.
+
+    Callers report outcomes with record_success() / record_failure().
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, half_open_max_calls=1, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._changed_at = clock()
+        self._probes = 0
+        self._rejections = 0
+        self._opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self):
+        now = self._clock()
+        if self._state == OPEN and now - self._changed_at >= self.reset_timeout:
+            self._set_state_locked(HALF_OPEN, now)
+        elif self._state == HALF_OPEN and now - self._changed_at >= self.reset_timeout:
+            # A probe that never reported back must not wedge the breaker
+            self._changed_at = now
+            self._probes = 0
+        return self._state
+
+    def _set_state_locked(self, state, now):
+        self._state = state
+        self._changed_at = now
+        self._probes = 0
+        if state == OPEN:
+            self._opened += 1
+        elif state == CLOSED:
+            self._failures = 0
+
+    def retry_after(self) -> int:
+        """Whole seconds until the breaker will let a probe through (at least 1)."""
+        with self._lock:
+            remaining = self.reset_timeout - (self._clock() - self._changed_at)
+        return max(1, math.ceil(remaining))
+
+    def allow(self):
+        """Raise DatabaseUnavailable if a call must not go to the database right now."""
+        with self._lock:
+            state = self._current_state_locked()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            self._rejections += 1
+            remaining = self.reset_timeout - (self._clock() - self._changed_at)
+        raise DatabaseUnavailable(max(1, math.ceil(remaining)))
+
+    def record_success(self):
+        with self._lock:
+            if self._state == CLOSED:
+                self._failures = 0
+            elif self._state == HALF_OPEN:
+                self._set_state_locked(CLOSED, self._clock())
+
+    def record_failure(self):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._set_state_locked(OPEN, now)
+            elif self._state == CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._set_state_locked(OPEN, now)
+
+    def reset(self):
+        with self._lock:
+            self._set_state_locked(CLOSED, self._clock())
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state_locked()
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'seconds_in_state': round(self._clock() - self._changed_at, 3),
+                'times_opened': self._opened,
+                'rejections': self._rejections,
+            }
@@ -0,0 +1,218 @@
+# app/helpers/compression.py
+import os
+import threading
+import time
+import zlib
+from flask import request
+from app.config import Config
+from app.helpers import metrics, profiling
+from app.helpers.cache import MISSING, LRUCache
+from app.helpers.conditional import coded_etag
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered without it
+    brotli = None
+
+# Media types worth compressing; images, archives and the like already are
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'text/csv', 'text/event-stream', 'text/html', 'text/plain', 'text/css', 'text/xml',
+})
+# Bodies above this are compressed on every request instead of being cached
+CACHE_MAX_BODY = 1024 * 1024
+
+
+def negotiate(accept_encodings) -> str | None:
+    """
+    The coding to use for a request's Accept-Encoding: "br" when brotli is
+    installed and the client ranks it at least as high as gzip, else "gzip",
+    or None when the client accepts neither.
+    """
+    gzip_q = accept_encodings.quality('gzip')
+    if brotli is not None:
+        br_q = accept_encodings.quality('br')
+        if br_q > 0 and br_q >= gzip_q:
+            return 'br'
+    return 'gzip' if gzip_q > 0 else None
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor; `flush` ends a block the client can decode at once."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._impl = brotli.Compressor(quality=level)
+        else:
+            self._impl = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._impl.process(data)
+        return self._impl.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == 'br':
+            return self._impl.flush()
+        return self._impl.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._impl.finish()
+        return self._impl.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a whole body in one call."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _level(encoding):
+    return Config.COMPRESSION_BROTLI_QUALITY if encoding == 'br' else Config.COMPRESSION_GZIP_LEVEL
+
+
+def _compress_stream(chunks, encoding, level):
+    """
+    Compress a streamed body chunk by chunk. Each chunk is flushed so that
+    NDJSON batches and server-sent events reach the client as they are
+    produced instead of waiting for the compressor's window to fill.
+    """
+    compressor = _Compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            metrics.HTTP_COMPRESSION_BYTES.inc(encoding, 'in', amount=len(chunk))
+            out = compressor.compress(chunk) + compressor.flush()
+            metrics.HTTP_COMPRESSION_BYTES.inc(encoding, 'out', amount=len(out))
+            yield out
+        out = compressor.finish()
+        metrics.HTTP_COMPRESSION_BYTES.inc(encoding, 'out', amount=len(out))
+        yield out
+    finally:
+        # Closing the wrapper (client gone, response closed) closes the source
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """
+    Compress `response` for the current request if it is worth it: a
+    compressible media type, no Content-Encoding yet, no `no-transform`,
+    and a body of at least COMPRESSION_MIN_SIZE bytes (streamed bodies,
+    whose size is unknown, always qualify).
+
+    A strong ETag gets the coding appended ("v5" -> "v5-gzip"): the bytes
+    differ from the identity body, so they need a validator of their own.
+    If-None-Match and If-Match accept the coded ETag for the version it was
+    derived from, and `Vary: Accept-Encoding` keeps caches from mixing the
+    encodings up. Compressed bodies of such responses are cached under
+    (encoding, URL, ETag), so a hot list page is compressed once per
+    version rather than per request.
+    """
+    if (response.mimetype not in COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.cache_control.no_transform:
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    level = _level(encoding)
+
+    if response.is_streamed:
+        length = response.content_length
+        if length is not None and length < Config.COMPRESSION_MIN_SIZE:
+            return response
+        response.response = _compress_stream(response.response, encoding, level)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+        _set_encoding(response, encoding)
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return response
+    start = time.perf_counter()
+    etag, _ = response.get_etag()
+    cache = None
+    if etag and request.method == 'GET' and Config.COMPRESSION_CACHE_SIZE > 0:
+        cache = get_compression_cache()
+    key = (encoding, request.full_path, etag)
+    compressed = cache.get(key) if cache is not None else MISSING
+    if compressed is MISSING:
+        compressed = compress(body, encoding, level)
+        metrics.HTTP_COMPRESSION_BYTES.inc(encoding, 'in', amount=len(body))
+        metrics.HTTP_COMPRESSION_BYTES.inc(encoding, 'out', amount=len(compressed))
+        if cache is not None and len(body) <= CACHE_MAX_BODY:
+            cache.set(key, compressed)
+    profiling.record('compress', time.perf_counter() - start)
+    response.set_data(compressed)
+    _set_encoding(response, encoding)
+    return response
+
+
+def _set_encoding(response, encoding):
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(coded_etag(etag, encoding))
+
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_compression_cache() -> LRUCache:
+    """Return this process' cache of compressed bodies, creating it on first use."""
+    global _cache, _cache_pid
+    if _cache is not None and _cache_pid == os.getpid():
+        return _cache
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            # Keys carry the version, so entries never go stale; the TTL only
+            # frees memory held by versions nobody asks for any more
+            _cache = LRUCache(maxsize=Config.COMPRESSION_CACHE_SIZE, ttl=Config.COMPRESSION_CACHE_TTL)
+            _cache_pid = os.getpid()
+        return _cache
+
+
+def reset_compression_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def init_app(app):
+    """Compress responses according to Accept-Encoding (COMPRESSION_ENABLED)."""
+    if not Config.COMPRESSION_ENABLED:
+        return
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response)
+
+
+def _collect_compression_metrics():
+    if _cache is None or _cache_pid != os.getpid():
+        return []
+    stats = _cache.stats()
+    return [
+        ('http_compression_cache_hits', 'Responses served from the compressed body cache (since start).',
+         stats['hits'], 'counter'),
+        ('http_compression_cache_misses', 'Compressible responses with an ETag not in the cache (since start).',
+         stats['misses'], 'counter'),
+        ('http_compression_cache_size', 'Entries in the compressed body cache.', stats['size']),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_compression_metrics)
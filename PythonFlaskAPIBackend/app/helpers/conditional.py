@@ -0,0 +1,82 @@
+# app/helpers/conditional.py
+from flask import Response, request
+from app.config import Config
+
+
+class PreconditionFailed(Exception):
+    """Raised when If-Match names a version other than the current one; mapped to 412."""
+
+    def __init__(self, current_version=None):
+        super().__init__('The resource was modified since it was read')
+        self.current_version = current_version
+
+
+def version_etag(version) -> str:
+    """Strong ETag value (unquoted) for a row or collection version."""
+    return f'v{version}'
+
+
+# Codings compression.py may name in a coded ETag
+CONTENT_CODINGS = frozenset({'gzip', 'br'})
+
+
+def coded_etag(etag, coding) -> str:
+    """
+    ETag of `etag`'s representation in a content coding, e.g. "v5-gzip".
+    Each coding gets its own strong ETag because the bytes differ.
+    """
+    return f'{etag}-{coding}'
+
+
+def _base_etag(etag) -> str:
+    """The version ETag underneath a coded one; "v5-gzip" -> "v5"."""
+    base, _, coding = etag.rpartition('-')
+    return base if base and coding in CONTENT_CODINGS else etag
+
+
+def not_modified(etag):
+    """
+    A 304 response if the request's If-None-Match already names `etag`,
+    otherwise None. Nothing is serialized for the 304. Matching uses weak
+    comparison (RFC 7232 3.2), so W/"v5" revalidates like "v5", and a coded
+    ETag such as "v5-gzip" matches its version too; the 304 repeats the
+    ETag the client sent.
+    """
+    if etag is None:
+        return None
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return cacheable(Response(status=304), etag)
+    for tag in if_none_match.as_set(include_weak=True):
+        if _base_etag(tag) == etag:
+            return cacheable(Response(status=304), tag)
+    return None
+
+
+def cacheable(response, etag=None):
+    """Set ETag and the configured Cache-Control on a response."""
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = Config.HTTP_CACHE_CONTROL
+    return response
+
+
+def expected_version():
+    """
+    The version an If-Match header requires, or None without one (or for `*`).
+
+    Raises:
+        PreconditionFailed: if the header can never match, e.g. a weak or
+            foreign ETag; ValueError if it lists several ETags. A coded
+            ETag ("v5-gzip") requires the version it was derived from.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    etags = if_match.as_set()  # strong comparison: weak ETags never match
+    if len(etags) > 1:
+        raise ValueError('If-Match must name a single ETag')
+    etag = _base_etag(etags.pop()) if etags else ''
+    if not etag.startswith('v') or not etag[1:].isdigit():
+        raise PreconditionFailed()
+    return int(etag[1:])
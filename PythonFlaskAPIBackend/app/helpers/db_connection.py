@@ -1,32 +1,448 @@
 # app/helpers/db_connection.py
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 import pyodbc
 from app.config import Config
+from app.helpers import metrics, profiling
+from app.helpers.circuit_breaker import CircuitBreaker, DatabaseUnavailable
+from app.helpers.db_pool import ConnectionPool, PooledConnection, PoolTimeout
 
+logger = logging.getLogger('app.db')
 
-def get_db_connection() -> pyodbc.Connection:
-    """
-    Create and return a live SQL Server connection using the
-    connection string assembled inside Config.SQLALCHEMY_DATABASE_URI.
-    Any exception will bubble up and the caller will handle it.
-    """
+# SQLSTATEs that mean the session is gone and must not go back into the pool
+_DISCONNECT_SQLSTATES = {'08S01', '08003', '08001', '08007', 'HYT00', 'HYT01'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Per-process; fed by connect/execute outcomes, consulted before every checkout
+_breaker = CircuitBreaker(
+    failure_threshold=Config.DB_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=Config.DB_BREAKER_RESET_TIMEOUT,
+    half_open_max_calls=Config.DB_BREAKER_HALF_OPEN_PROBES,
+)
+
+
+def _connect() -> pyodbc.Connection:
+    start = time.perf_counter()
     try:
         return pyodbc.connect(
             Config.SQLALCHEMY_DATABASE_URI,
-            timeout=5  # optional, avoids long hanging attempts
+            timeout=Config.DB_CONNECT_TIMEOUT  # avoids long hanging attempts
         )
     except Exception as ex:
-        print("Database connection failed:")
-        print(ex)
+        metrics.DB_ERRORS.inc('connect')
+        _breaker.record_failure()
+        logger.warning('Database connection failed: %s', ex)
         raise  # let the caller see the real error
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.DB_CONNECT.observe(elapsed)
+        profiling.record('db-connect', elapsed)
+
+
+_EXEC_RE = re.compile(r'^\s*EXEC(?:UTE)?\s+([\w.\[\]]+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def procedure_name(sql: str) -> str:
+    """Metric label for a statement: the stored procedure name, or "adhoc"."""
+    match = _EXEC_RE.match(sql)
+    return match.group(1).replace('[', '').replace(']', '') if match else 'adhoc'
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times execute and fetch calls per stored procedure for
+    /metrics and the request profile (Server-Timing, slow-query log).
+    Everything else is passed through to the pyodbc cursor.
+    """
+
+    __slots__ = ('_cursor', '_procedure')
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_procedure', 'adhoc')
+
+    def _execute(self, fn, sql, params):
+        procedure = procedure_name(sql)
+        object.__setattr__(self, '_procedure', procedure)
+        start = time.perf_counter()
+        try:
+            fn(sql, *params)
+        except Exception as ex:
+            metrics.DB_ERRORS.inc(procedure)
+            if _is_disconnect(ex):
+                _breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.DB_QUERY.observe(elapsed, procedure, 'execute')
+            profiling.observe_query(procedure, 'execute', elapsed, sql, params)
+        _breaker.record_success()
+        return self
+
+    def _fetch(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception as ex:
+            metrics.DB_ERRORS.inc(self._procedure)
+            if _is_disconnect(ex):
+                _breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.DB_QUERY.observe(elapsed, self._procedure, 'fetch')
+            profiling.record('db-fetch', elapsed)
+
+    def execute(self, sql, *params):
+        return self._execute(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, params):
+        return self._execute(self._cursor.executemany, sql, (params,))
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._fetch(self._cursor.fetchmany)
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+
+def _is_disconnect(exc) -> bool:
+    if isinstance(exc, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    args = getattr(exc, 'args', ())
+    return bool(args) and args[0] in _DISCONNECT_SQLSTATES
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, creating it on first use.
+    A pool inherited across fork() is never reused; the child builds its own.
+    """
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(
+                _connect,
+                min_size=Config.DB_POOL_MIN_SIZE,
+                max_size=Config.DB_POOL_MAX_SIZE,
+                timeout=Config.DB_POOL_TIMEOUT,
+                idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+                validate_after=Config.DB_POOL_VALIDATE_AFTER,
+                is_disconnect=_is_disconnect,
+                wrap_cursor=InstrumentedCursor,
+            )
+            _pool.fill()
+        return _pool
+
+
+def reset_pool():
+    """Close idle connections and drop the pool; the next checkout builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+
+
+def pool_stats() -> dict:
+    """Statistics of the current process' pool (empty before first use)."""
+    return _pool.stats() if _pool is not None and _pool.pid == os.getpid() else {}
+
+
+def _collect_pool_metrics():
+    stats = pool_stats()
+    if not stats:
+        return []
+    return [
+        ('db_pool_connections', 'Pooled connections by state.',
+         {'{state="idle"}': stats['idle'], '{state="in_use"}': stats['in_use']}),
+        ('db_pool_max_size', 'Configured pool size.', stats['max_size']),
+        ('db_pool_waiting', 'Requests waiting for a connection.', stats['waiting']),
+        ('db_pool_timeouts', 'Checkouts that timed out (since start).', stats['timeouts'], 'counter'),
+        ('db_pool_connections_created', 'Connections opened (since start).', stats['created'], 'counter'),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_pool_metrics)
+
+
+def get_db_connection() -> PooledConnection:
+    """
+    Check out a SQL Server connection from the pool.
+
+    Use it as a context manager so the connection always goes back:
+
+        with get_db_connection() as conn:
+            ...
+
+    Calling conn.close() also returns it to the pool rather than closing it.
+    While the circuit breaker is open this raises DatabaseUnavailable at once
+    instead of waiting on a database that is known to be down. Any other
+    exception will bubble up and the caller will handle it. Inside
+    connection_scope() the scope's connection is returned instead.
+    """
+    scoped = getattr(_scope, 'conn', None)
+    if scoped is not None:
+        return scoped
+    _breaker.allow()
+    start = time.perf_counter()
+    try:
+        return get_pool().acquire()
+    except PoolTimeout:
+        _breaker.record_failure()  # the database is too slow to hand connections back
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.DB_CHECKOUT.observe(elapsed)
+        profiling.record('db-checkout', elapsed)
+
+
+_scope = threading.local()
+
+
+class ScopedConnection:
+    """
+    The connection of a connection_scope(), as seen by code calling
+    get_db_connection() inside it. Leaving its `with` block or close() keeps
+    the connection checked out, and in an atomic scope commit() is a no-op:
+    the scope commits or rolls back once at the end.
+    """
+
+    def __init__(self, conn, atomic):
+        self._conn = conn
+        self.atomic = atomic
+        self._on_commit = []
+
+    def commit(self):
+        if not self.atomic:
+            self._conn.commit()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def connection_scope(atomic=False):
+    """
+    Run every get_db_connection() in the block on one pooled connection.
+
+    With atomic=True the statements form one transaction, committed when the
+    block exits normally and rolled back if it raises; callbacks registered
+    with on_commit() run only after that commit.
+    """
+    if getattr(_scope, 'conn', None) is not None:
+        raise RuntimeError('connection_scope() cannot be nested')
+    with get_db_connection() as conn:
+        scoped = _scope.conn = ScopedConnection(conn, atomic)
+        try:
+            yield scoped
+            if atomic:
+                conn.commit()
+        finally:
+            _scope.conn = None
+    for callback in scoped._on_commit:
+        callback()
+
+
+def in_transaction() -> bool:
+    """True inside an atomic connection_scope(), whose writes are not committed yet."""
+    scoped = getattr(_scope, 'conn', None)
+    return scoped is not None and scoped.atomic
+
+
+def on_commit(callback):
+    """Call `callback` now, or after the enclosing atomic scope commits (never if it rolls back)."""
+    scoped = getattr(_scope, 'conn', None)
+    if scoped is not None and scoped.atomic:
+        scoped._on_commit.append(callback)
+    else:
+        callback()
+
+
+def breaker_stats() -> dict:
+    """State and counters of the current process' circuit breaker."""
+    return _breaker.stats()
+
+
+def _collect_breaker_metrics():
+    stats = _breaker.stats()
+    yield ('db_circuit_breaker_open', '1 while the database circuit breaker rejects calls.',
+           {'{state="%s"}' % state: int(stats['state'] == state) for state in ('closed', 'open', 'half_open')})
+    yield ('db_circuit_breaker_rejections', 'Calls rejected by the open breaker (since start).',
+           stats['rejections'], 'counter')
+
+
+metrics.REGISTRY.add_collector(_collect_breaker_metrics)
+
+
+def _is_transient(exc) -> bool:
+    return isinstance(exc, PoolTimeout) or _is_disconnect(exc)
+
+
+def retry_read(fn):
+    """
+    Retry a read-only database call on transient errors (dropped connection,
+    timeout, pool exhaustion) with full-jitter exponential backoff, up to
+    DB_READ_RETRIES times. Never use it on writes: a retried write may apply twice.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(_scope, 'conn', None) is not None:
+            # Inside a scope a retry would reuse the same failed connection
+            return fn(*args, **kwargs)
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except DatabaseUnavailable:
+                raise
+            except Exception as ex:
+                if attempt >= Config.DB_READ_RETRIES or not _is_transient(ex):
+                    raise
+            delay = min(Config.DB_RETRY_BACKOFF_MAX, Config.DB_RETRY_BACKOFF_BASE * 2 ** attempt)
+            attempt += 1
+            metrics.DB_RETRIES.inc(fn.__name__)
+            time.sleep(random.uniform(0, delay))
+    return wrapper
+
+
+def column_names(cursor) -> tuple:
+    """Column names of the cursor's current result set."""
+    return tuple(col[0] for col in cursor.description)
+
+
+@lru_cache(maxsize=128)
+def compile_row_mapper(columns: tuple):
+    """
+    Build a row -> dict function for one column layout.
+
+    The names are bound once into a zip-based closure, so mapping a row does
+    no per-row name lookup, and the result is cached per layout.
+    """
+    def mapper(row, _columns=columns, _dict=dict, _zip=zip):
+        return _dict(_zip(_columns, row))
+    return mapper
+
+
+@lru_cache(maxsize=128)
+def compile_record_type(columns: tuple):
+    """namedtuple class for one column layout; instances need no per-row dict."""
+    return namedtuple('Record', columns, rename=True)
+
+
+def row_mapper(cursor):
+    """Compiled row -> dict mapper for the cursor's current result set."""
+    return compile_row_mapper(column_names(cursor))
+
+
+def rows_to_dicts(cursor, rows) -> list:
+    """Map a batch of rows to dicts, resolving column names once for the batch."""
+    start = time.perf_counter()
+    mapper = row_mapper(cursor)
+    result = [mapper(row) for row in rows]
+    profiling.record('map', time.perf_counter() - start)
+    return result
+
+
+def rows_to_records(cursor, rows) -> list:
+    """Map a batch of rows to namedtuple records sharing one compiled type."""
+    start = time.perf_counter()
+    make = compile_record_type(column_names(cursor))._make
+    result = [make(row) for row in rows]
+    profiling.record('map', time.perf_counter() - start)
+    return result
 
 
 def row_to_dict(cursor, row) -> dict | None:
     """
     Convert a pyodbc Row to a dictionary using column names.
     Example: {"id": 1, "name": "Sam"}
+    Prefer rows_to_dicts()/row_mapper() for more than one row.
     """
     if not row:
         return None
 
-    columns = [col[0] for col in cursor.description]
-    return dict(zip(columns, row))
+    return row_mapper(cursor)(row)
+
+
+class ResultStream:
+    """
+    Iterate the result set of an executed cursor in fetchmany() batches.
+
+    The stream owns the pooled connection: it is returned to the pool when the
+    rows are exhausted or when close() is called, whichever happens first.
+    Each batch is a list of dicts keyed by column name.
+    """
+
+    def __init__(self, conn, cursor, batch_size: int):
+        self._conn = conn
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self.columns = column_names(cursor)
+
+    def __iter__(self):
+        mapper = compile_row_mapper(self.columns)
+        try:
+            while True:
+                rows = self._cursor.fetchmany(self._batch_size)
+                if not rows:
+                    break
+                yield [mapper(row) for row in rows]
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.close()
+
+
+def stream_query(sql: str, params=(), batch_size: int = 1000) -> ResultStream:
+    """
+    Execute `sql` on a pooled connection and return a ResultStream over its rows.
+    The query runs before this returns, so connection/SQL errors surface here.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return ResultStream(conn, cursor, batch_size)
+    except Exception:
+        conn.close()
+        raise
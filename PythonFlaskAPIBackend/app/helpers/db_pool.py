@@ -0,0 +1,313 @@
+# app/helpers/db_pool.py
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a DB-API connection handed out by ConnectionPool.
+
+    close() (or leaving a `with` block) returns the connection to the pool
+    instead of closing the socket, so existing `conn.close()` call sites keep
+    working. Anything not defined here is delegated to the raw connection.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._checked_out = False
+        self._dirty = False
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def cursor(self):
+        # SQL Server runs with implicit transactions when autocommit is off,
+        # so any cursor use may leave a transaction open until commit/rollback.
+        self._dirty = True
+        cursor = self._raw.cursor()
+        wrap = self._pool.wrap_cursor
+        return wrap(cursor) if wrap is not None else cursor
+
+    def execute(self, *args, **kwargs):
+        self._dirty = True
+        return self._raw.execute(*args, **kwargs)
+
+    def commit(self):
+        self._raw.commit()
+        self._dirty = False
+
+    def rollback(self):
+        self._raw.rollback()
+        self._dirty = False
+
+    def close(self):
+        """Return the connection to the pool (idempotent)."""
+        if self._checked_out:
+            self._pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._checked_out:
+            self._pool.release(self, error=exc)
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+
+    Connections are created lazily up to `max_size`. Callers block for up to
+    `timeout` seconds when every connection is checked out. Idle connections
+    older than `idle_timeout` are closed (down to `min_size`), and a connection
+    that sat idle for more than `validate_after` seconds is pinged with
+    `SELECT 1` before being handed out again. Cursors can be wrapped by
+    `wrap_cursor` (used for instrumentation).
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=5.0,
+                 idle_timeout=300.0, validate_after=30.0, is_disconnect=None,
+                 wrap_cursor=None):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        if min_size < 0 or min_size > max_size:
+            raise ValueError('min_size must be between 0 and max_size')
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self._is_disconnect = is_disconnect or (lambda exc: False)
+        self.wrap_cursor = wrap_cursor  # e.g. an instrumenting proxy
+
+        self.pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()  # most recently used connection on the right
+        self._size = 0        # open + currently being opened
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'validation_failures': 0,
+            'connect_errors': 0,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Checkout / return
+    # ------------------------------------------------------------------ #
+    def acquire(self, timeout=None) -> PooledConnection:
+        """
+        Check out a connection.
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to the pool timeout).
+
+        Returns:
+            A PooledConnection; close it or use it as a context manager to return it.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout('connection pool is closed')
+                expired = self._pop_expired_locked()
+                if self._idle:
+                    conn = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                else:
+                    self._counters['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        while not self._idle and self._size >= self.max_size:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0 or self._closed:
+                                self._counters['timeouts'] += 1
+                                raise PoolTimeout(
+                                    f'timed out after {timeout}s waiting for a DB connection '
+                                    f'(max_size={self.max_size})'
+                                )
+                            self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            for stale in expired:
+                self._close_raw(stale)
+            if conn is None and not create:
+                continue
+            if create:
+                conn = self._open()
+            elif not self._validate(conn):
+                continue
+
+            with self._cond:
+                self._in_use += 1
+                self._counters['checkouts'] += 1
+            conn._checked_out = True
+            conn._dirty = False
+            return conn
+
+    def release(self, conn: PooledConnection, error=None):
+        """Return a connection to the pool, discarding it if it is no longer usable."""
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+
+        discard = error is not None and self._is_disconnect(error)
+        if not discard and conn._dirty:
+            # Never hand an open transaction to the next borrower.
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed or os.getpid() != self.pid:
+                self._size -= 1
+                self._counters['closed'] += 1
+                self._cond.notify()
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+                self._cond.notify()
+                conn = None
+
+        if conn is not None:
+            self._close_raw(conn)
+
+    def connection(self, timeout=None) -> PooledConnection:
+        """Alias of acquire() that reads naturally in `with pool.connection() as conn:`."""
+        return self.acquire(timeout)
+
+    # ------------------------------------------------------------------ #
+    # Maintenance
+    # ------------------------------------------------------------------ #
+    def fill(self):
+        """Open connections until `min_size` are idle. Errors are swallowed; the pool stays lazy."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                return
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def prune(self):
+        """Close idle connections that exceeded idle_timeout."""
+        with self._cond:
+            expired = self._pop_expired_locked()
+        for conn in expired:
+            self._close_raw(conn)
+
+    def close(self):
+        """Close every idle connection and refuse new checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._counters['closed'] += len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_raw(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool sizing and counters."""
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                **self._counters,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _open(self) -> PooledConnection:
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._counters['connect_errors'] += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters['created'] += 1
+        return PooledConnection(self, raw)
+
+    def _validate(self, conn: PooledConnection) -> bool:
+        if time.monotonic() - conn.last_used < self.validate_after:
+            return True
+        try:
+            cursor = conn.raw.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            # Leave no implicit transaction behind from the ping.
+            conn.raw.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._counters['validation_failures'] += 1
+                self._counters['closed'] += 1
+                self._cond.notify()
+            self._close_raw(conn)
+            return False
+
+    def _pop_expired_locked(self) -> list:
+        if not self.idle_timeout:
+            return []
+        now = time.monotonic()
+        expired = []
+        # Oldest idle connections sit on the left.
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0].last_used > self.idle_timeout):
+            expired.append(self._idle.popleft())
+            self._size -= 1
+            self._counters['closed'] += 1
+        return expired
+
+    @staticmethod
+    def _close_raw(conn: PooledConnection):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
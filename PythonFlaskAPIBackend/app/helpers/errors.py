@@ -1,4 +1,8 @@
 from flask import jsonify
+from app.helpers.admission import Overloaded
+from app.helpers.circuit_breaker import DatabaseUnavailable
+from app.helpers.conditional import PreconditionFailed, version_etag
+from app.helpers.rate_limit import RateLimited
 
 def register_error_handlers(app):
     @app.errorhandler(404)
@@ -17,4 +21,32 @@ def register_error_handlers(app):
     def forbidden(e):
         # Commonly browsers return CORS related failures as blocked requests.
         # Provide a clear JSON response for explicit 403 responses from the server.
-        return jsonify({'error': 'Forbidden', 'message': str(e)}), 403
\ No newline at end of file
+        return jsonify({'error': 'Forbidden', 'message': str(e)}), 403
+
+    @app.errorhandler(DatabaseUnavailable)
+    def database_unavailable(e):
+        # Raised before touching the database while the circuit breaker is open
+        response = jsonify({'error': 'Service unavailable', 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
+    @app.errorhandler(Overloaded)
+    def overloaded(e):
+        # Shed by admission control before reaching the database
+        response = jsonify({'error': 'Service unavailable', 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
+    @app.errorhandler(PreconditionFailed)
+    def precondition_failed(e):
+        # If-Match named an outdated version; send the current one for a retry
+        response = jsonify({'error': 'Precondition failed', 'message': str(e)})
+        if e.current_version is not None:
+            response.set_etag(version_etag(e.current_version))
+        return response, 412
+
+    @app.errorhandler(RateLimited)
+    def rate_limited(e):
+        response = jsonify({'error': 'Too many requests', 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
@@ -0,0 +1,395 @@
+# app/helpers/events.py
+import collections
+import json
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from app.config import Config
+from app.helpers import metrics
+from app.helpers.admission import Overloaded
+
+logger = logging.getLogger('app.events')
+
+Event = collections.namedtuple('Event', 'id type data')  # data is a JSON string
+
+
+class MemoryChannel:
+    """
+    Events of this process only, numbered 1, 2, ... and kept for replay up to
+    `history` events back. With several workers each one has its own channel,
+    so subscribers only see mutations handled by the same worker.
+    """
+
+    shared = False
+
+    def __init__(self, history=10000):
+        self._events = collections.deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    def publish(self, events):
+        with self._cond:
+            for event_type, data in events:
+                self._last_id += 1
+                self._events.append(Event(self._last_id, event_type, data))
+            self._cond.notify_all()
+
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def read(self, after_id, timeout=0.0):
+        """
+        Events newer than `after_id`, waiting up to `timeout` seconds for one.
+        None if the history no longer reaches back to `after_id`, or if
+        `after_id` was never issued (e.g. an id from before a restart).
+        """
+        with self._cond:
+            if after_id > self._last_id:
+                return None
+            if timeout and self._last_id == after_id:
+                self._cond.wait(timeout)
+            if not self._events or self._last_id <= after_id:
+                return []
+            first = self._events[0].id
+            if after_id < first - 1:
+                return None
+            # ids are contiguous, so the offset is arithmetic
+            return list(self._events)[after_id - first + 1:]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'backend': 'memory', 'last_id': self._last_id, 'history': len(self._events)}
+
+
+class SQLiteChannel:
+    """
+    Events in a local SQLite file shared by every worker on the host: publish()
+    appends rows and each worker's hub polls for rows newer than the last one
+    it saw, so all subscribers see the same ids in the same order. The oldest
+    rows beyond `history` are pruned.
+    """
+
+    shared = True
+
+    def __init__(self, path, history=10000, poll_interval=0.2):
+        self.path = path
+        self.history = history
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {'published': 0, 'errors': 0}
+        db = self._connection()
+        db.execute('CREATE TABLE IF NOT EXISTS events '
+                   '(id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, data TEXT NOT NULL)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def publish(self, events):
+        try:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = db.executemany('INSERT INTO events(type, data) VALUES (?, ?)', events)
+                last_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
+                if last_id // 1000 != (last_id - cursor.rowcount) // 1000:
+                    # Every thousand events drop what replay no longer needs
+                    db.execute('DELETE FROM events WHERE id <= ?', (last_id - self.history,))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        self._count('published', len(events))
+
+    def last_id(self) -> int:
+        return self._connection().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+    def read(self, after_id, timeout=0.0):
+        db = self._connection()
+        query = 'SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT ?'
+        rows = db.execute(query, (after_id, self.history)).fetchall()
+        if not rows and timeout:
+            time.sleep(min(timeout, self.poll_interval))
+            rows = db.execute(query, (after_id, self.history)).fetchall()
+        # AUTOINCREMENT ids have no holes, so a jump means rows were pruned
+        if rows and rows[0][0] > after_id + 1:
+            return None
+        # An id past the last one comes from an older file (e.g. before a
+        # reboot cleared the temp directory); its events are unknown
+        if not rows and after_id > self.last_id():
+            return None
+        return [Event(*row) for row in rows]
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'sqlite', 'path': self.path, **self._counters}
+
+
+def build_channel(backend: str, history: int, path: str | None = None, poll_interval: float = 0.2):
+    """
+    Create the broadcast channel for the configured backend: "sqlite" (shared
+    by the workers on this host), "memory" (this process) or "none".
+    """
+    backend = (backend or 'sqlite').lower()
+    if backend == 'none':
+        return None
+    if backend == 'sqlite':
+        path = path or os.path.join(tempfile.gettempdir(), 'flask-api-events.db')
+        try:
+            return SQLiteChannel(path, history, poll_interval)
+        except sqlite3.Error as ex:
+            logger.warning('Event channel %s unavailable (%s); falling back to per-process events', path, ex)
+    return MemoryChannel(history)
+
+
+class Subscription:
+    """One stream's bounded queue. `dropped` is set when it fell too far behind."""
+
+    def __init__(self, max_queue):
+        self._queue = queue.Queue(max_queue)
+        self.dropped = False
+
+    def offer(self, event) -> bool:
+        """Queue an event without blocking; False if the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    Fans channel events out to this worker's subscribers.
+
+    A daemon thread reads the channel and puts each event on every
+    subscriber's queue without blocking. A subscriber whose queue is full is
+    dropped instead of slowing the others down; its stream ends and the client
+    reconnects with Last-Event-ID to replay what it missed.
+    """
+
+    def __init__(self, channel, max_queue=256, max_subscribers=100):
+        self.channel = channel
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {'delivered': 0, 'dropped_subscribers': 0, 'rejected_subscribers': 0}
+
+    def publish(self, event_type, items):
+        """Publish one event per item; never raises into the caller."""
+        try:
+            self.channel.publish([(event_type, json.dumps(item, default=str)) for item in items])
+        except Exception:
+            logger.exception('Event publish failed')
+
+    def subscribe(self) -> Subscription:
+        """Register a subscriber, or raise Overloaded when the worker has too many."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._counters['rejected_subscribers'] += 1
+                raise Overloaded('stream')
+            subscription = Subscription(self.max_queue)
+            self._subscribers.add(subscription)
+            self._start()
+        return subscription
+
+    def add_listener(self, listener):
+        """
+        Call `listener(events)` from the hub thread with every batch of events
+        read from the channel, or with None when some were missed. Used by
+        in-process caches to follow writes made by other workers.
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+            self._start()
+
+    def _start(self):
+        # Called with self._lock held
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(self.channel.last_id(),),
+                                            name='event-hub', daemon=True)
+            self._thread.start()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def replay(self, after_id):
+        """Events after `after_id` still in the channel's history, or None if some are gone."""
+        return self.channel.read(after_id)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, last_id):
+        while not self._stop.is_set():
+            try:
+                events = self.channel.read(last_id, timeout=1.0)
+            except Exception:
+                logger.exception('Event channel read failed')
+                self._stop.wait(1.0)
+                continue
+            if events is None:
+                # The hub itself fell behind the history: every stream has a
+                # gap now, so end them all and let the clients replay
+                self._drop(self._snapshot())
+                self._notify(None)
+                last_id = self.channel.last_id()
+            elif events:
+                last_id = events[-1].id
+                self._notify(events)
+                self._deliver(events)
+
+    def _notify(self, events):
+        for listener in list(self._listeners):
+            try:
+                listener(events)
+            except Exception:
+                logger.exception('event listener %r failed', listener)
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def _deliver(self, events):
+        subscribers = self._snapshot()
+        slow = [subscription for subscription in subscribers
+                if not all(subscription.offer(event) for event in events)]
+        self._drop(slow)
+        with self._lock:
+            self._counters['delivered'] += len(events) * (len(subscribers) - len(slow))
+
+    def _drop(self, subscriptions):
+        for subscription in subscriptions:
+            subscription.dropped = True
+        with self._lock:
+            self._subscribers.difference_update(subscriptions)
+            self._counters['dropped_subscribers'] += len(subscriptions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'max_subscribers': self.max_subscribers,
+                    'channel': self.channel.stats(), **self._counters}
+
+
+def format_event(event) -> str:
+    """Render an Event in text/event-stream framing."""
+    return f'id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n'
+
+
+def stream_events(hub, subscription, last_event_id=None, heartbeat=15.0, max_seconds=300.0):
+    """
+    Generate the text/event-stream body for one subscriber.
+
+    Replays what happened after `last_event_id` first (or sends a "resync"
+    event when that is no longer possible), then live events, with a comment
+    line every `heartbeat` seconds. The stream ends after `max_seconds` so the
+    client reconnects and its token is checked again.
+    """
+    try:
+        yield f'retry: {Config.EVENTS_RETRY_MS}\n\n'
+        last_id = last_event_id
+        if last_event_id is not None:
+            replayed = hub.replay(last_event_id)
+            if replayed is None:
+                # Refetch with GET /api/users/changes; the ids the client
+                # knows no longer line up, so pass every live event on
+                yield 'event: resync\ndata: {}\n\n'
+                last_id = None
+            else:
+                for event in replayed:
+                    yield format_event(event)
+                    last_id = event.id
+        deadline = time.monotonic() + max_seconds
+        while not subscription.dropped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = subscription.get(min(heartbeat, remaining))
+            if event is None:
+                yield ': keep-alive\n\n'
+            elif last_id is None or event.id > last_id:
+                yield format_event(event)
+                last_id = event.id
+    finally:
+        hub.unsubscribe(subscription)
+
+
+_hub = None
+_hub_pid = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub():
+    """Return this process' event hub (None when EVENTS_BACKEND is "none")."""
+    global _hub, _hub_pid
+    if _hub_pid == os.getpid():
+        return _hub
+    with _hub_lock:
+        if _hub_pid != os.getpid():
+            # A hub inherited across fork has no poller thread; build a new one
+            channel = build_channel(Config.EVENTS_BACKEND, Config.EVENTS_HISTORY,
+                                    Config.EVENTS_SQLITE_PATH, Config.EVENTS_POLL_INTERVAL)
+            _hub = EventHub(channel, Config.EVENTS_QUEUE_SIZE, Config.EVENTS_MAX_SUBSCRIBERS) if channel else None
+            _hub_pid = os.getpid()
+        return _hub
+
+
+def stop_event_hub():
+    global _hub_pid
+    with _hub_lock:
+        hub, pid, _hub_pid = _hub, _hub_pid, None
+    if hub is not None and pid == os.getpid():
+        hub.stop()
+
+
+def publish_user_event(event_type, users):
+    """Announce created/updated/deleted users to stream subscribers (no-op when disabled)."""
+    hub = get_event_hub()
+    if hub is not None and users:
+        hub.publish(f'user.{event_type}', users)
+
+
+def _collect_event_metrics():
+    if _hub is None or _hub_pid != os.getpid():
+        return []
+    stats = _hub.stats()
+    return [
+        ('events_subscribers', 'Open /api/users/stream connections in this worker.', stats['subscribers']),
+        ('events_dropped_subscribers', 'Streams closed because the client fell behind (since start).',
+         stats['dropped_subscribers'], 'counter'),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_event_metrics)
@@ -0,0 +1,141 @@
+# app/helpers/health.py
+import os
+import threading
+import time
+from app.config import Config
+from app.helpers import metrics
+from app.helpers.circuit_breaker import DatabaseUnavailable
+from app.helpers.db_connection import get_db_connection
+
+
+def probe_database():
+    """Run SELECT 1 on a pooled connection (no new login per probe)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        cursor.close()
+
+
+class HealthMonitor:
+    """
+    Runs `probe` every `interval` seconds on a daemon thread and keeps the
+    outcome, so health endpoints answer from memory instead of hitting the
+    database once per request. A result older than `stale_after` seconds
+    (e.g. a probe that hangs) no longer counts as healthy.
+    """
+
+    def __init__(self, probe, interval=5.0, stale_after=15.0):
+        self.probe = probe
+        self.interval = interval
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = {
+            'status': 'unknown',
+            'checked_at': None,
+            'latency_ms': None,
+            'last_error': None,
+            'last_error_at': None,
+            'consecutive_failures': 0,
+            'checks': 0,
+        }
+        self._checked_monotonic = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='db-health', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_now()
+            self._stop.wait(self.interval)
+
+    def check_now(self):
+        """Probe once and record the result."""
+        start = time.perf_counter()
+        try:
+            self.probe()
+        except DatabaseUnavailable as ex:
+            self._record('unavailable', start, ex)
+        except Exception as ex:
+            self._record('error', start, ex)
+        else:
+            self._record('ok', start, None)
+
+    def _record(self, status, start, error):
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            state = self._state
+            state['status'] = status
+            state['checked_at'] = time.time()
+            state['latency_ms'] = latency_ms
+            state['checks'] += 1
+            if error is None:
+                state['consecutive_failures'] = 0
+            else:
+                state['consecutive_failures'] += 1
+                state['last_error'] = f'{type(error).__name__}: {error}'
+                state['last_error_at'] = state['checked_at']
+            self._checked_monotonic = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Last probe result plus its age and whether it counts as ready."""
+        with self._lock:
+            state = dict(self._state)
+            checked = self._checked_monotonic
+        age = None if checked is None else round(time.monotonic() - checked, 3)
+        state['age_seconds'] = age
+        state['stale'] = age is None or age > self.stale_after
+        state['ready'] = state['status'] == 'ok' and not state['stale']
+        return state
+
+
+_monitor = None
+_monitor_pid = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Return this process' database health monitor, starting it on first use."""
+    global _monitor, _monitor_pid
+    if _monitor is not None and _monitor_pid == os.getpid():
+        return _monitor
+    with _monitor_lock:
+        if _monitor is None or _monitor_pid != os.getpid():
+            # A monitor inherited across fork has no thread; build a new one
+            _monitor = HealthMonitor(probe_database, Config.HEALTH_CHECK_INTERVAL,
+                                     Config.HEALTH_STALE_AFTER).start()
+            _monitor_pid = os.getpid()
+        return _monitor
+
+
+def stop_health_monitor():
+    global _monitor
+    with _monitor_lock:
+        monitor, _monitor = _monitor, None
+    if monitor is not None and _monitor_pid == os.getpid():
+        monitor.stop()
+
+
+def _collect_health_metrics():
+    if _monitor is None or _monitor_pid != os.getpid():
+        return []
+    state = _monitor.snapshot()
+    samples = [('db_health_up', '1 if the last background database probe succeeded and is fresh.',
+                int(state['ready']))]
+    if state['latency_ms'] is not None:
+        samples.append(('db_health_probe_latency_seconds', 'Duration of the last database probe.',
+                        state['latency_ms'] / 1000))
+    return samples
+
+
+metrics.REGISTRY.add_collector(_collect_health_metrics)
@@ -0,0 +1,125 @@
+# app/helpers/json_provider.py
+import datetime
+import decimal
+import json
+import time
+import uuid
+from flask.json.provider import DefaultJSONProvider
+from app.helpers import metrics, profiling
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; stdlib json is used without it
+    orjson = None
+
+
+def _default(o):
+    """Serialize the SQL Server types pyodbc hands back."""
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)  # keep DECIMAL/MONEY precision
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return bytes(o).hex()  # rowversion / varbinary
+    if isinstance(o, RowSet):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class RowSet:
+    """
+    Result rows plus their column names, kept as tuples until they are serialized.
+
+    Behaves like a read-only list of dicts (indexing, iteration, len) for code
+    that needs to look at individual rows; FastJSONProvider encodes it in one
+    orjson call.
+    """
+
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns, rows):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RowSet(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self):
+        columns = self.columns
+        for row in self.rows:
+            yield dict(zip(columns, row))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+def rows_to_json(columns, rows) -> bytes:
+    """Encode rows as a JSON array of objects keyed by `columns`."""
+    columns = tuple(columns)
+    objects = [dict(zip(columns, row)) for row in rows]
+    if orjson is None:
+        return json.dumps(objects, default=_default).encode()
+    try:
+        # Plain ints/strings are the common case and need no default hook
+        return orjson.dumps(objects)
+    except orjson.JSONEncodeError:
+        return orjson.dumps(objects, default=_default)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that uses orjson when it is installed and the stdlib otherwise.
+
+    Responses are encoded straight to bytes, and RowSet values are encoded
+    in a single call. Pretty printing (debug mode) and any non-default
+    dumps() keyword fall back to the stdlib implementation.
+    """
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj) -> bytes:
+        if isinstance(obj, RowSet):
+            return rows_to_json(obj.columns, obj.rows)
+        if orjson is None:
+            return super().dumps(obj).encode()
+        return orjson.dumps(obj, default=_default, option=self._orjson_options())
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # Human-readable output in debug mode, same as Flask's default
+            return super().response(obj)
+        start = time.perf_counter()
+        body = self.dumps_bytes(obj)
+        elapsed = time.perf_counter() - start
+        metrics.JSON_ENCODE.observe(elapsed)
+        profiling.record('serialize', elapsed)
+        return self._app.response_class(body, mimetype=self.mimetype)
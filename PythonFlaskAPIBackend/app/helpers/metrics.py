@@ -0,0 +1,427 @@
+# app/helpers/metrics.py
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+from app.config import Config
+
+logger = logging.getLogger('app.metrics')
+
+# Latency buckets in seconds (Prometheus convention: upper bounds, +Inf implied)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _add_label(labels: str, pair: str) -> str:
+    """Append `name="value"` to a rendered label set such as '{a="1"}' (or '')."""
+    return '{' + pair + '}' if not labels else labels[:-1] + ',' + pair + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._values.items())
+        return {'help': self.documentation, 'kind': self.kind,
+                'samples': {_format_labels(self.labelnames, labels): value for labels, value in items}}
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with running sum and count per label combination."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # per-bucket (non-cumulative) counts, +Inf last, then sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        return {'help': self.documentation, 'kind': self.kind, 'buckets': list(self.buckets),
+                'samples': {_format_labels(self.labelnames, labels): series for labels, series in items}}
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    """Set of metrics plus callbacks that report point-in-time values at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        collect() returns an iterable of (name, help, {labels: value} or value)
+        tuples, optionally with a fourth item "counter" for since-start totals
+        (the default is "gauge").
+        """
+        self._collectors.append(collect)
+
+    def reset(self):
+        """Forget every recorded value, e.g. those a worker inherited across fork."""
+        for metric in self._metrics:
+            metric.clear()
+
+    def snapshot(self) -> dict:
+        """Every metric of this process as {name: {help, kind, samples[, buckets]}}, JSON serializable."""
+        families = {metric.name: metric.snapshot() for metric in self._metrics}
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                continue  # a broken collector must not break the scrape
+            for name, documentation, value, *kind in samples:
+                families[name] = {'help': documentation, 'kind': kind[0] if kind else 'gauge',
+                                  'samples': value if isinstance(value, dict) else {'': value}}
+        return families
+
+    def render(self) -> str:
+        return render_families(self.snapshot())
+
+
+def _render_family(name, family) -> list:
+    lines = [f'# HELP {name} {family["help"]}', f'# TYPE {name} {family["kind"]}']
+    if family['kind'] != 'histogram':
+        lines.extend(f'{name}{labels} {_format_value(value)}' for labels, value in family['samples'].items())
+        return lines
+    bounds = tuple(family['buckets']) + (float('inf'),)
+    for labels, series in family['samples'].items():
+        cumulative = 0
+        for bound, count in zip(bounds, series[:-1]):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f'{name}_bucket{_add_label(labels, le)} {cumulative}')
+        lines.append(f'{name}_sum{labels} {_format_value(series[-1])}')
+        lines.append(f'{name}_count{labels} {cumulative}')
+    return lines
+
+
+def render_families(families: dict) -> str:
+    """Prometheus text exposition of a snapshot."""
+    lines = []
+    for name, family in families.items():
+        lines.extend(_render_family(name, family))
+    return '\n'.join(lines) + '\n'
+
+
+def merge_families(workers) -> dict:
+    """
+    Combine the snapshots of several workers, given as (pid, families) pairs.
+
+    Counters and histograms are summed, so totals only grow as long as every
+    worker that ever counted is included. Gauges describe one process (its
+    pool, its in-flight requests), so they are kept per worker with a
+    `worker` label.
+    """
+    merged = {}
+    for pid, families in workers:
+        for name, family in families.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**family, 'samples': {}}
+            elif target['kind'] != family['kind']:
+                continue
+            samples = target['samples']
+            for labels, value in family['samples'].items():
+                if family['kind'] == 'gauge':
+                    samples[_add_label(labels, f'worker="{pid}"')] = value
+                elif family['kind'] == 'histogram':
+                    current = samples.get(labels)
+                    samples[labels] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    samples[labels] = samples.get(labels, 0) + value
+    return merged
+
+
+def _totals(families: dict) -> dict:
+    return {name: family for name, family in families.items() if family['kind'] != 'gauge'}
+
+
+def _alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by someone else
+    return True
+
+
+class SQLiteMetricsStore:
+    """
+    Snapshots of every worker on the host in a local SQLite file, one row per
+    pid. When a worker exits (or is found dead at scrape time) its counters
+    and histograms are folded into the row of pid 0 and its gauges dropped,
+    so the summed totals never go backwards when workers are recycled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._connection()
+        db.execute('CREATE TABLE IF NOT EXISTS workers '
+                   '(pid INTEGER PRIMARY KEY, updated REAL NOT NULL, families TEXT NOT NULL)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def publish(self, pid, families):
+        self._connection().execute('INSERT OR REPLACE INTO workers(pid, updated, families) VALUES (?, ?, ?)',
+                                   (pid, time.time(), json.dumps(families)))
+
+    def collect(self) -> list:
+        """(pid, families) of every live worker plus the retired totals (pid 0)."""
+        rows = self._connection().execute('SELECT pid, families FROM workers ORDER BY pid').fetchall()
+        workers = []
+        for pid, data in rows:
+            if pid != 0 and pid != os.getpid() and not _alive(pid):
+                self.retire(pid)
+                continue
+            workers.append((pid, json.loads(data)))
+        retired = self._connection().execute('SELECT families FROM workers WHERE pid = 0').fetchone()
+        workers = [(pid, families) for pid, families in workers if pid != 0]
+        if retired is not None:
+            workers.insert(0, (0, json.loads(retired[0])))
+        return workers
+
+    def retire(self, pid, families=None):
+        """Fold the totals of `pid` (its last snapshot, or `families`) into pid 0 and drop its row."""
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if families is None:
+                row = db.execute('SELECT families FROM workers WHERE pid = ?', (pid,)).fetchone()
+                families = json.loads(row[0]) if row else {}
+            row = db.execute('SELECT families FROM workers WHERE pid = 0').fetchone()
+            retired = [(0, json.loads(row[0]))] if row else []
+            totals = merge_families(retired + [(pid, _totals(families))])
+            db.execute('INSERT OR REPLACE INTO workers(pid, updated, families) VALUES (0, ?, ?)',
+                       (time.time(), json.dumps(totals)))
+            db.execute('DELETE FROM workers WHERE pid = ?', (pid,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests by endpoint and status.', ('method', 'endpoint', 'status')))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce the response.', ('method', 'endpoint')))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'http_requests_in_flight', 'Requests currently being handled.', ('endpoint',)))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    'http_request_errors_total', 'Requests that ended in a 5xx or an unhandled exception.', ('endpoint',)))
+DB_CONNECT = REGISTRY.register(Histogram(
+    'db_connect_duration_seconds', 'Time to open a new SQL Server connection.'))
+DB_CHECKOUT = REGISTRY.register(Histogram(
+    'db_pool_checkout_duration_seconds', 'Time spent waiting for a pooled connection.'))
+DB_QUERY = REGISTRY.register(Histogram(
+    'db_query_duration_seconds', 'Time in cursor.execute / fetch* per stored procedure.', ('procedure', 'phase')))
+DB_ERRORS = REGISTRY.register(Counter(
+    'db_errors_total', 'Failed connects and statements.', ('procedure',)))
+DB_RETRIES = REGISTRY.register(Counter(
+    'db_retries_total', 'Read calls retried after a transient database error.', ('operation',)))
+AUTH_DECODE = REGISTRY.register(Histogram(
+    'auth_token_verify_duration_seconds', 'Time to verify a JWT in token_required.'))
+RATE_LIMITED = REGISTRY.register(Counter(
+    'rate_limited_requests_total', 'Requests rejected with 429 by the per-subject rate limit.'))
+JSON_ENCODE = REGISTRY.register(Histogram(
+    'json_serialize_duration_seconds', 'Time to encode JSON response bodies.'))
+HTTP_COMPRESSION_BYTES = REGISTRY.register(Counter(
+    'http_compression_bytes_total', 'Response body bytes into ("in") and out of ("out") compression.',
+    ('encoding', 'direction')))
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+_publish_lock = threading.Lock()
+_next_publish = 0.0
+
+
+def get_metrics_store():
+    """This process' view of the shared metrics file, or None with METRICS_BACKEND=memory."""
+    global _store, _store_pid
+    if _store_pid == os.getpid():
+        return _store
+    with _store_lock:
+        if _store_pid != os.getpid():
+            _store = None
+            if (Config.METRICS_BACKEND or 'sqlite').lower() == 'sqlite':
+                path = Config.METRICS_SQLITE_PATH or os.path.join(tempfile.gettempdir(), 'flask-api-metrics.db')
+                try:
+                    _store = SQLiteMetricsStore(path)
+                except sqlite3.Error as ex:
+                    logger.warning('metrics store %s unavailable (%s); /metrics reports one worker', path, ex)
+            _store_pid = os.getpid()
+        return _store
+
+
+def publish_snapshot(force=False):
+    """Write this worker's snapshot to the shared store, at most every METRICS_PUBLISH_INTERVAL seconds."""
+    global _next_publish
+    store = get_metrics_store()
+    if store is None or (not force and time.monotonic() < _next_publish):
+        return
+    if not _publish_lock.acquire(blocking=False):
+        return  # another thread of this worker is publishing
+    try:
+        _next_publish = time.monotonic() + Config.METRICS_PUBLISH_INTERVAL
+        store.publish(os.getpid(), REGISTRY.snapshot())
+    except sqlite3.Error as ex:
+        logger.warning('could not publish metrics: %s', ex)
+    finally:
+        _publish_lock.release()
+
+
+def render_all() -> str:
+    """The exposition for /metrics: every worker on the host, or this one without a shared store."""
+    store = get_metrics_store()
+    if store is None:
+        return REGISTRY.render()
+    families = REGISTRY.snapshot()
+    try:
+        store.publish(os.getpid(), families)
+        return render_families(merge_families(store.collect()))
+    except sqlite3.Error as ex:
+        logger.warning('could not read the metrics of other workers: %s', ex)
+        return render_families(families)
+
+
+def retire_worker():
+    """On worker exit: keep this worker's totals in the shared store and drop its gauges."""
+    store = get_metrics_store()
+    if store is not None:
+        try:
+            store.retire(os.getpid(), REGISTRY.snapshot())
+        except sqlite3.Error as ex:
+            logger.warning('could not retire the metrics of this worker: %s', ex)
+
+
+def _endpoint_label():
+    return request.endpoint or 'unmatched'
+
+
+def init_app(app):
+    """Install request hooks that feed the HTTP metrics."""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_endpoint = _endpoint_label()
+        HTTP_IN_FLIGHT.inc(g._metrics_endpoint)
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = g._metrics_endpoint
+            HTTP_LATENCY.observe(time.perf_counter() - start, request.method, endpoint)
+            HTTP_REQUESTS.inc(request.method, endpoint, str(response.status_code))
+            if response.status_code >= 500:
+                HTTP_ERRORS.inc(endpoint)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        endpoint = g.pop('_metrics_endpoint', None)
+        if endpoint is not None:
+            HTTP_IN_FLIGHT.dec(endpoint)
+            # Only count here if no response made it through _record_request
+            if exc is not None and g.pop('_metrics_start', None) is not None:
+                HTTP_ERRORS.inc(endpoint)
+        publish_snapshot()
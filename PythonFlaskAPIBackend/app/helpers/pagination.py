@@ -0,0 +1,66 @@
+# app/helpers/pagination.py
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encode a keyset position (e.g. {"id": 42}) as an opaque, URL-safe token.
+    Clients must treat the token as opaque and send it back unchanged.
+    """
+    raw = json.dumps(position, separators=(',', ':'), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: str) -> dict:
+    """
+    Decode a token produced by encode_cursor.
+
+    Raises:
+        InvalidCursor: if the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as ex:
+        raise InvalidCursor('Malformed cursor') from ex
+    if not isinstance(position, dict):
+        raise InvalidCursor('Malformed cursor')
+    return position
+
+
+def parse_limit(value, default: int, maximum: int) -> int:
+    """
+    Parse a `limit` query parameter, clamped to [1, maximum].
+
+    Raises:
+        ValueError: if the value is not a positive integer.
+    """
+    if value is None or value == '':
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def parse_sort(value, allowed, default='id'):
+    """
+    Parse a `sort` query parameter such as "name" or "-email" (descending).
+
+    Returns:
+        (column, descending)
+
+    Raises:
+        ValueError: if the column is not in `allowed`.
+    """
+    value = (value or default).strip()
+    descending = value.startswith('-')
+    column = value.lstrip('-')
+    if column not in allowed:
+        raise ValueError(f"sort must be one of {', '.join(allowed)} (prefix '-' for descending)")
+    return column, descending
@@ -0,0 +1,244 @@
+# app/helpers/passwords.py
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from app.config import Config
+from app.helpers import metrics
+from app.helpers.admission import Overloaded
+
+ALGORITHMS = ('pbkdf2_sha256', 'scrypt')
+
+PASSWORD_HASH = metrics.REGISTRY.register(metrics.Histogram(
+    'password_hash_duration_seconds', 'Time spent in the password KDF per job.', ('algorithm',)))
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """
+    Salted, tunable password hashes stored as self-describing strings:
+
+        pbkdf2_sha256$<iterations>$<salt>$<hash>
+        scrypt$<n>$<r>$<p>$<salt>$<hash>
+
+    Every stored value carries its own parameters, so raising the cost or
+    switching algorithm needs no migration: old hashes keep verifying and
+    needs_rehash() reports them for an upgrade on the next successful login.
+    A value in neither format is a legacy plaintext password.
+    """
+
+    def __init__(self, algorithm='pbkdf2_sha256', iterations=600000, scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown password hash algorithm {algorithm!r}')
+        self.algorithm = algorithm
+        self.iterations = iterations
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self._dummy = None
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        if self.algorithm == 'scrypt':
+            params = self.scrypt_params
+        else:
+            params = (self.iterations,)
+        digest = self._derive(self.algorithm, params, password, salt)
+        return '$'.join([self.algorithm, *map(str, params), _b64encode(salt), _b64encode(digest)])
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Constant-time check of `password` against a stored hash or legacy plaintext value."""
+        parsed = self._parse(encoded)
+        if parsed is None:
+            return hmac.compare_digest(encoded.encode(), password.encode())
+        if parsed is False:
+            return False
+        algorithm, params, salt, digest = parsed
+        return hmac.compare_digest(self._derive(algorithm, params, password, salt), digest)
+
+    def verify_dummy(self, password: str) -> bool:
+        """Spend the same work as a real verification, so unknown usernames are not faster to reject."""
+        if self._dummy is None:
+            self._dummy = self.hash(secrets.token_urlsafe(16))
+        self.verify(password, self._dummy)
+        return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        parsed = self._parse(encoded)
+        if not parsed:
+            return True
+        algorithm, params = parsed[:2]
+        if algorithm != self.algorithm:
+            return True
+        return params != (self.scrypt_params if algorithm == 'scrypt' else (self.iterations,))
+
+    @staticmethod
+    def _parse(encoded):
+        """(algorithm, params, salt, digest); None for plaintext; False if malformed."""
+        algorithm, _, rest = encoded.partition('$')
+        if algorithm not in ALGORITHMS or not rest:
+            return None
+        parts = rest.split('$')
+        try:
+            *params, salt, digest = parts
+            params = tuple(int(p) for p in params)
+            if len(params) != (3 if algorithm == 'scrypt' else 1):
+                return False
+            return algorithm, params, _b64decode(salt), _b64decode(digest)
+        except ValueError:  # includes binascii.Error
+            return False
+
+    @staticmethod
+    def _derive(algorithm, params, password, salt) -> bytes:
+        # Both KDFs run in OpenSSL with the GIL released
+        start = time.perf_counter()
+        if algorithm == 'scrypt':
+            n, r, p = params
+            digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                                    maxmem=128 * r * (n + p + 2) + (1 << 20), dklen=32)
+        else:
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, params[0])
+        PASSWORD_HASH.observe(time.perf_counter() - start, algorithm)
+        return digest
+
+
+class VerifierPool:
+    """
+    A few dedicated threads for KDF work, so request threads only wait on it.
+
+    hashlib's KDFs release the GIL, so the pool hashes in parallel with the
+    rest of the worker while never using more than `workers` cores for it:
+    /api/users keeps its CPU however hard /api/login is hit. At most
+    `max_queue` jobs wait, and a job that has not started within
+    `queue_timeout` seconds is cancelled; both cases raise Overloaded (503).
+    """
+
+    def __init__(self, workers, max_queue=16, queue_timeout=1.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {'completed': 0, 'rejected_full': 0, 'rejected_timeout': 0}
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._counters['rejected_full'] += 1
+                raise Overloaded('login', self._retry_after())
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.queue_timeout)
+        except FutureTimeout:
+            if future.cancel():  # still queued: give up on it
+                with self._lock:
+                    self._counters['rejected_timeout'] += 1
+                raise Overloaded('login', self._retry_after())
+            return future.result()  # already hashing; it finishes in one KDF
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._counters['completed'] += 1
+
+    def _retry_after(self):
+        return max(1, round(self.queue_timeout))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'workers': self.workers, 'pending': self._pending, 'max_queue': self.max_queue,
+                    **self._counters}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = None
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(Config.PASSWORD_HASH_ALGORITHM, Config.PASSWORD_PBKDF2_ITERATIONS,
+                                 Config.PASSWORD_SCRYPT_N, Config.PASSWORD_SCRYPT_R, Config.PASSWORD_SCRYPT_P)
+    return _hasher
+
+
+def get_verifier_pool() -> VerifierPool:
+    """Return this process' verifier pool (threads do not survive fork, so each worker builds its own)."""
+    global _pool, _pool_pid
+    if _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            _pool = VerifierPool(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_QUEUE_SIZE,
+                                 Config.PASSWORD_HASH_QUEUE_TIMEOUT)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def stop_verifier_pool():
+    global _pool_pid
+    with _pool_lock:
+        pool, pid, _pool_pid = _pool, _pool_pid, None
+    if pool is not None and pid == os.getpid():
+        pool.shutdown()
+
+
+def _check(password, encoded):
+    hasher = get_password_hasher()
+    if encoded is None:
+        return hasher.verify_dummy(password), None
+    if not hasher.verify(password, encoded):
+        return False, None
+    return True, hasher.hash(password) if hasher.needs_rehash(encoded) else None
+
+
+def check_password(password, encoded):
+    """
+    Verify `password` against a stored value (None for an unknown user) on the
+    verifier pool. Returns (ok, new_hash), where new_hash is set when the
+    stored value should be replaced: legacy plaintext or outdated parameters.
+    """
+    return get_verifier_pool().run(_check, password, encoded)
+
+
+def hash_password(password) -> str:
+    """Hash a new password on the verifier pool."""
+    return get_verifier_pool().run(get_password_hasher().hash, password)
+
+
+def _collect_password_metrics():
+    if _pool is None or _pool_pid != os.getpid():
+        return []
+    stats = _pool.stats()
+    return [
+        ('password_hash_pending', 'Password hash jobs running or queued in this worker.', stats['pending']),
+        ('password_hash_rejected', 'Logins shed with 503 by the verifier pool (since start).',
+         stats['rejected_full'] + stats['rejected_timeout'], 'counter'),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_password_metrics)
+
+
+if __name__ == '__main__':
+    # python -m app.helpers.passwords  -> prints a hash for INSERT INTO logins
+    import getpass
+    print(get_password_hasher().hash(getpass.getpass('Password: ')))
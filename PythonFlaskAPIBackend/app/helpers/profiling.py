@@ -0,0 +1,141 @@
+# app/helpers/profiling.py
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from functools import lru_cache
+from flask import g, has_request_context, request
+from app.config import Config
+
+logger = logging.getLogger('app.profiling')
+
+# Order of phases in the Server-Timing header
+PHASES = ('auth', 'db-checkout', 'db-connect', 'db-execute', 'db-fetch', 'map', 'serialize', 'compress')
+
+_PARAM_NAME_RE = re.compile(r'(@?\w+)\s*=\s*\?')
+_SECRET_RE = re.compile(r'pass|secret|token', re.IGNORECASE)
+
+
+def record(phase, seconds):
+    """Add `seconds` to a phase of the current request (no-op outside a request)."""
+    if not has_request_context():
+        return
+    timings = g.get('_timings')
+    if timings is not None:
+        entry = timings.get(phase)
+        if entry is None:
+            timings[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@lru_cache(maxsize=256)
+def _param_names(sql):
+    return tuple(name.lstrip('@') for name in _PARAM_NAME_RE.findall(sql))
+
+
+def _describe_params(sql, params):
+    """Name the parameters of a statement and redact anything that looks like a secret."""
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    names = _param_names(sql)
+    described = {}
+    for i, value in enumerate(params):
+        name = names[i] if i < len(names) else f'p{i}'
+        if _SECRET_RE.search(name):
+            value = '***'
+        elif isinstance(value, (list, tuple)):
+            value = f'<{len(value)} rows>'  # table-valued parameter
+        elif isinstance(value, str) and len(value) > 200:
+            value = value[:200] + '...'
+        described[name] = value
+    return described
+
+
+def observe_query(procedure, phase, seconds, sql, params):
+    """Feed a timed cursor call into the request profile and the slow-query log."""
+    record('db-' + phase, seconds)
+    if phase == 'execute' and seconds * 1000 >= Config.SLOW_QUERY_MS:
+        entry = {
+            'event': 'slow_query',
+            'procedure': procedure,
+            'duration_ms': round(seconds * 1000, 2),
+            'params': _describe_params(sql, params),
+        }
+        if has_request_context():
+            entry['endpoint'] = request.endpoint
+        logger.warning(json.dumps(entry, default=str))
+
+
+def _server_timing(timings, total):
+    parts = []
+    for phase in PHASES:
+        entry = timings.get(phase)
+        if entry is not None:
+            parts.append(f'{phase};dur={entry[0] * 1000:.2f};desc="{entry[1]}x"')
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def init_app(app):
+    """Install request hooks for Server-Timing, the slow-request log and sampled cProfile."""
+
+    @app.before_request
+    def _start_profile():
+        g._timings = {}
+        g._profile_start = time.perf_counter()
+        if Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+            g._profiler = profiler
+            profiler.enable()
+
+    @app.after_request
+    def _finish_profile(response):
+        start = g.pop('_profile_start', None)
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        timings = g.pop('_timings', {})
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _report_profile(profiler, total)
+
+        if Config.SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = _server_timing(timings, total)
+
+        if total * 1000 >= Config.SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 2),
+                'phases_ms': {phase: round(entry[0] * 1000, 2) for phase, entry in timings.items()},
+            }))
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        # after_request is skipped on some failures; never leave a profiler running
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+
+def _report_profile(profiler, total):
+    name = f'{int(time.time() * 1000)}-{request.endpoint or "unmatched"}'
+    if Config.PROFILE_DIR:
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(Config.PROFILE_DIR, name + '.prof'))
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+    logger.warning('cProfile %s %s (%.1f ms)\n%s', request.method, request.path, total * 1000, out.getvalue())
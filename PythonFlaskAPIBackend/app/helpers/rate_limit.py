@@ -0,0 +1,188 @@
+# app/helpers/rate_limit.py
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from app.config import Config
+from app.helpers import metrics
+
+logger = logging.getLogger('app.rate_limit')
+
+
+class RateLimited(Exception):
+    """Raised when a token subject is out of tokens; mapped to 429 with Retry-After."""
+
+    def __init__(self, subject, retry_after):
+        super().__init__(f'Rate limit exceeded for {subject}, retry in {retry_after}s')
+        self.subject = subject
+        self.retry_after = retry_after
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in this process only. With several workers each one keeps its
+    own buckets, so the effective limit is multiplied by the worker count.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self._counters = {'allowed': 0, 'limited': 0}
+
+    def take(self, key) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()  # crude bound; a full bucket is the default anyway
+                bucket = self._buckets[key] = [self.burst, now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                self._counters['allowed'] += 1
+                return 0.0
+            bucket[0] = tokens
+            self._counters['limited'] += 1
+            return (1 - tokens) / self.rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'memory', 'rate': self.rate, 'burst': self.burst,
+                    'subjects': len(self._buckets), **self._counters}
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a local SQLite file shared by every worker on the host.
+    Each take() is a single UPSERT, so concurrent workers never double-spend a
+    token. Store errors are counted and the request is allowed (fail open).
+    """
+
+    _TAKE = """
+        INSERT INTO buckets(key, tokens, updated, allowed) VALUES (:key, :burst - 1, :now, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            allowed = MIN(:burst, tokens + (:now - updated) * :rate) >= 1,
+            tokens = MIN(:burst, tokens + (:now - updated) * :rate)
+                     - (MIN(:burst, tokens + (:now - updated) * :rate) >= 1),
+            updated = :now
+        RETURNING tokens, allowed
+    """
+
+    def __init__(self, path, rate, burst):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {'allowed': 0, 'limited': 0, 'errors': 0}
+        self._calls = 0
+        db = self._connection()
+        db.execute('CREATE TABLE IF NOT EXISTS buckets '
+                   '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')  # losing a bucket on power loss is harmless
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def take(self, key) -> float:
+        now = time.time()
+        try:
+            db = self._connection()
+            tokens, allowed = db.execute(
+                self._TAKE, {'key': key, 'now': now, 'rate': self.rate, 'burst': self.burst}).fetchone()
+            self._maybe_prune(db, now)
+        except sqlite3.Error:
+            self._count('errors')
+            return 0.0
+        if allowed:
+            self._count('allowed')
+            return 0.0
+        self._count('limited')
+        return (1 - tokens) / self.rate
+
+    def _maybe_prune(self, db, now):
+        # Every so often drop buckets that have long since refilled
+        self._calls += 1
+        if self._calls % 10000 == 0:
+            db.execute('DELETE FROM buckets WHERE updated < ?', (now - self.burst / self.rate - 60,))
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'sqlite', 'path': self.path, 'rate': self.rate, 'burst': self.burst,
+                    **self._counters}
+
+
+def build_bucket_store(backend: str, rate: float, burst: float, path: str | None = None):
+    """
+    Create the token-bucket store for the configured backend: "sqlite"
+    (shared by the workers on this host), "memory" or "none" (no limit).
+    """
+    backend = (backend or 'sqlite').lower()
+    if backend == 'none' or rate <= 0:
+        return None
+    if backend == 'sqlite':
+        path = path or os.path.join(tempfile.gettempdir(), 'flask-api-rate-limit.db')
+        try:
+            return SQLiteBucketStore(path, rate, burst)
+        except sqlite3.Error as ex:
+            logger.warning('Rate limit store %s unavailable (%s); falling back to per-process buckets', path, ex)
+    return MemoryBucketStore(rate, burst)
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Return the process' token-bucket store (None when rate limiting is off)."""
+    global _store, _store_pid
+    if _store_pid == os.getpid():
+        return _store
+    with _store_lock:
+        if _store_pid != os.getpid():
+            _store = build_bucket_store(Config.RATE_LIMIT_BACKEND, Config.RATE_LIMIT_PER_SECOND,
+                                        Config.RATE_LIMIT_BURST, Config.RATE_LIMIT_SQLITE_PATH)
+            _store_pid = os.getpid()
+        return _store
+
+
+def reset_bucket_store():
+    global _store_pid
+    with _store_lock:
+        _store_pid = None
+
+
+def check_rate_limit(subject):
+    """Spend one token for `subject` or raise RateLimited."""
+    store = get_bucket_store()
+    if store is None:
+        return
+    wait = store.take(subject)
+    if wait > 0:
+        metrics.RATE_LIMITED.inc()
+        raise RateLimited(subject, max(1, math.ceil(wait)))
+
+
+def rate_limit_stats() -> dict:
+    store = get_bucket_store()
+    return store.stats() if store is not None else {'backend': 'none'}
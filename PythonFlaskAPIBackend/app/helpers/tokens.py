@@ -0,0 +1,262 @@
+# app/helpers/tokens.py
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import jwt
+from app.config import Config
+from app.helpers import metrics
+from app.helpers.cache import MISSING, LRUCache
+
+logger = logging.getLogger('app.tokens')
+
+ALGORITHM = 'HS256'
+
+
+class KeyRing:
+    """
+    Signing keys by `kid`. New tokens are signed with the active key and carry
+    its kid in the header; any key in the ring still verifies, so a key can be
+    rotated by adding the new one as active and removing the old one once its
+    tokens have expired. Tokens without a kid (issued before kids existed)
+    verify with the active key.
+    """
+
+    def __init__(self, keys: dict, active_kid: str):
+        if active_kid not in keys:
+            raise ValueError(f'Active JWT key {active_kid!r} is not in the key ring')
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+
+    @classmethod
+    def from_config(cls, spec: str, active_kid: str, fallback_secret: str):
+        """Parse JWT_KEYS ("kid:secret,kid:secret"); without it, SECRET_KEY is the only key."""
+        keys = {}
+        for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+            kid, sep, secret = item.partition(':')
+            if not sep or not kid or not secret:
+                raise ValueError('JWT_KEYS entries must look like kid:secret')
+            keys[kid] = secret
+        if not keys:
+            keys = {'default': fallback_secret}
+        return cls(keys, active_kid or next(iter(keys)))
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(payload, self.keys[self.active_kid], algorithm=ALGORITHM,
+                          headers={'kid': self.active_kid})
+
+    def decode(self, token: str) -> dict:
+        if len(self.keys) == 1:
+            # Nothing to select; a token signed with any other key fails the signature check
+            return jwt.decode(token, self.keys[self.active_kid], algorithms=[ALGORITHM])
+        kid = jwt.get_unverified_header(token).get('kid', self.active_kid)
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f'Unknown key id {kid!r}')
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
+
+
+class MemoryRevocationList:
+    """Revoked token ids (jti) in this process only; every worker keeps its own list."""
+
+    def __init__(self):
+        self._revoked = {}  # jti -> exp
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+            self._prune(time.time())
+
+    def is_revoked(self, jti) -> bool:
+        return jti in self._revoked
+
+    def _prune(self, now):
+        # A revoked token that has expired is rejected on exp alone
+        if len(self._revoked) % 1000 == 0:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    def stats(self) -> dict:
+        return {'backend': 'memory', 'revoked': len(self._revoked)}
+
+
+class SQLiteRevocationList(MemoryRevocationList):
+    """
+    Revoked token ids in a local SQLite file shared by every worker on the host.
+
+    Lookups stay in memory: each worker copies new rows into its own set at most
+    every `refresh_interval` seconds, so a token revoked in one worker is
+    refused by the others within that interval (and by its own at once). On
+    store errors the last known list is kept and the error is counted.
+    """
+
+    def __init__(self, path, refresh_interval=1.0):
+        super().__init__()
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._local = threading.local()
+        self._last_seq = 0
+        self._next_refresh = 0.0
+        self._errors = 0
+        db = self._connection()
+        db.execute('CREATE TABLE IF NOT EXISTS revoked '
+                   '(seq INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, exp REAL NOT NULL)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def revoke(self, jti, exp):
+        super().revoke(jti, exp)
+        try:
+            db = self._connection()
+            db.execute('INSERT OR IGNORE INTO revoked(jti, exp) VALUES (?, ?)', (jti, exp))
+            db.execute('DELETE FROM revoked WHERE exp < ?', (time.time(),))
+        except sqlite3.Error:
+            self._errors += 1
+
+    def is_revoked(self, jti) -> bool:
+        if time.monotonic() >= self._next_refresh:
+            self._refresh()
+        return jti in self._revoked
+
+    def _refresh(self):
+        with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            try:
+                rows = self._connection().execute(
+                    'SELECT seq, jti, exp FROM revoked WHERE seq > ? ORDER BY seq', (self._last_seq,)).fetchall()
+            except sqlite3.Error:
+                self._errors += 1
+                return
+            if rows:
+                revoked = dict(self._revoked)  # readers see either the old or the new dict
+                revoked.update((jti, exp) for _, jti, exp in rows)
+                self._revoked = revoked
+                self._last_seq = rows[-1][0]
+                self._prune(time.time())
+
+    def stats(self) -> dict:
+        return {'backend': 'sqlite', 'path': self.path, 'revoked': len(self._revoked), 'errors': self._errors}
+
+
+def build_revocation_list(backend: str, path: str | None = None, refresh_interval: float = 1.0):
+    """Create the revocation list for the configured backend: "sqlite" (shared on the host) or "memory"."""
+    if (backend or 'sqlite').lower() == 'sqlite':
+        path = path or os.path.join(tempfile.gettempdir(), 'flask-api-revoked-tokens.db')
+        try:
+            return SQLiteRevocationList(path, refresh_interval)
+        except sqlite3.Error as ex:
+            logger.warning('Token revocation store %s unavailable (%s); falling back to a per-process list', path, ex)
+    return MemoryRevocationList()
+
+
+class TokenVerifier:
+    """
+    Verifies tokens with the key ring and remembers verified payloads, keyed
+    by a SHA-256 digest of the token, until the token's own `exp`. A repeat
+    token then costs a digest, a cache lookup and a revocation check instead
+    of an HMAC verification and claims parse. A forged or altered token has
+    a different digest, so it never hits the cache.
+    """
+
+    def __init__(self, keyring, revocations, maxsize=10000, ttl=300.0):
+        self.keyring = keyring
+        self.revocations = revocations
+        # ttl only bounds entries of tokens that carry no exp
+        self.cache = LRUCache(maxsize, ttl)
+
+    def issue(self, claims: dict, expires_in: int) -> str:
+        now = int(time.time())
+        return self.keyring.encode({**claims, 'exp': now + expires_in, 'iat': now, 'jti': uuid.uuid4().hex})
+
+    def decode(self, token: str) -> dict:
+        """
+        The verified payload of `token`.
+
+        Raises:
+            jwt.ExpiredSignatureError: if the token has expired.
+            jwt.InvalidTokenError: if it is malformed, forged, signed with an
+                unknown key or revoked.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.cache.get(key)
+        if payload is MISSING:
+            payload = self.keyring.decode(token)
+            exp = payload.get('exp')
+            ttl = None if exp is None else exp - time.time()
+            if ttl is None or ttl > 0:
+                self.cache.set(key, payload, ttl)
+        elif 'exp' in payload and payload['exp'] <= time.time():
+            # The cache expires entries on a monotonic clock; exp is wall-clock
+            self.cache.delete(key)
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        jti = payload.get('jti')
+        if jti is not None and self.revocations.is_revoked(jti):
+            raise jwt.InvalidTokenError('Token has been revoked')
+        return payload
+
+    def revoke(self, token: str, payload: dict):
+        """Refuse `token` from now on (tokens without a jti can only expire)."""
+        self.cache.delete(hashlib.sha256(token.encode()).digest())
+        if payload.get('jti') is not None:
+            self.revocations.revoke(payload['jti'], payload.get('exp', time.time() + self.cache.ttl))
+
+    def stats(self) -> dict:
+        cache = self.cache.stats()
+        return {'active_kid': self.keyring.active_kid, 'kids': sorted(self.keyring.keys),
+                'cache': {name: cache[name] for name in ('size', 'maxsize', 'hits', 'misses', 'evictions')},
+                'revocations': self.revocations.stats()}
+
+
+_verifier = None
+_verifier_pid = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Return this process' token verifier (its SQLite connections are per process)."""
+    global _verifier, _verifier_pid
+    if _verifier_pid == os.getpid():
+        return _verifier
+    with _verifier_lock:
+        if _verifier_pid != os.getpid():
+            keyring = KeyRing.from_config(Config.JWT_KEYS, Config.JWT_ACTIVE_KID, Config.SECRET_KEY)
+            revocations = build_revocation_list(Config.AUTH_REVOCATION_BACKEND, Config.AUTH_REVOCATION_SQLITE_PATH,
+                                                Config.AUTH_REVOCATION_REFRESH)
+            _verifier = TokenVerifier(keyring, revocations, Config.AUTH_CACHE_SIZE)
+            _verifier_pid = os.getpid()
+        return _verifier
+
+
+def reset_token_verifier():
+    global _verifier_pid
+    with _verifier_lock:
+        _verifier_pid = None
+
+
+def _collect_token_metrics():
+    if _verifier is None or _verifier_pid != os.getpid():
+        return []
+    stats = _verifier.cache.stats()
+    return [
+        ('auth_token_cache_hits', 'Tokens accepted from the verified-token cache (since start).', stats['hits'],
+         'counter'),
+        ('auth_token_cache_misses', 'Tokens verified with a full HMAC check (since start).', stats['misses'],
+         'counter'),
+        ('auth_token_cache_size', 'Entries in the verified-token cache.', stats['size']),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_token_metrics)
@@ -0,0 +1,44 @@
+# app/helpers/worker.py
+import logging
+from app.config import Config
+from app.helpers import metrics
+from app.helpers.cache import get_user_cache, reset_user_cache
+from app.helpers.db_connection import get_pool, reset_pool
+from app.helpers.events import stop_event_hub
+from app.helpers.health import get_health_monitor, stop_health_monitor
+from app.helpers.passwords import stop_verifier_pool
+
+logger = logging.getLogger('app.worker')
+
+
+def init_worker():
+    """
+    Set up per-process resources in a freshly forked worker.
+
+    Anything the master created before fork (with preload_app) is dropped
+    without being closed, since its sockets are shared with the master; the
+    worker then builds its own cache, warms its own connection pool if
+    DB_POOL_MIN_SIZE is set, and starts its health monitor.
+    """
+    # Values recorded in the master would otherwise be counted once per worker
+    metrics.REGISTRY.reset()
+    reset_pool()
+    reset_user_cache()
+    get_user_cache()
+    if Config.DB_POOL_MIN_SIZE > 0:
+        try:
+            get_pool()
+        except Exception as ex:  # the pool fills lazily once the database is reachable
+            logger.warning('Could not warm the connection pool: %s', ex)
+    # Start probing now so /readyz turns green without waiting for traffic
+    get_health_monitor()
+
+
+def shutdown_worker():
+    """Stop the background threads and close this worker's pooled connections before it exits."""
+    stop_health_monitor()
+    stop_event_hub()
+    stop_verifier_pool()
+    reset_pool()
+    reset_user_cache()
+    metrics.retire_worker()
@@ -1,3 +1,4 @@
 from app.routes.routes import user_bp
+from app.routes.monitoring import monitoring_bp
 
-__all__ = ["user_bp"]
\ No newline at end of file
+__all__ = ["user_bp", "monitoring_bp"]
\ No newline at end of file
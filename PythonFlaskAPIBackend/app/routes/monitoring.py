@@ -0,0 +1,57 @@
+from flask import Blueprint, Response, jsonify
+from app.helpers import metrics
+from app.helpers.health import get_health_monitor
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Prometheus metrics of every worker on this host
+    ---
+    tags:
+      - Monitoring
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: >
+          Metrics in the Prometheus text exposition format. Counters and
+          histograms are summed over the workers (including exited ones);
+          gauges carry a worker label with the pid.
+    """
+    return Response(metrics.render_all(), mimetype='text/plain; version=0.0.4')
+
+
+@monitoring_bp.route('/livez', methods=['GET'])
+def livez():
+    """
+    Liveness probe; answers as long as the worker can serve requests
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: The process is alive (no dependencies are checked)
+    """
+    return jsonify({'status': 'ok'}), 200
+
+
+@monitoring_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness probe from the cached result of the background database check
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: The last database probe succeeded and is recent
+      503:
+        description: The database is unreachable, or the last probe is stale or still pending
+    """
+    state = get_health_monitor().snapshot()
+    body = {'status': 'ok' if state['ready'] else 'unavailable', 'db': state['status'],
+            'checked_at': state['checked_at'], 'age_seconds': state['age_seconds']}
+    return jsonify(body), 200 if state['ready'] else 503
@@ -1,14 +1,31 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import re
+from functools import lru_cache
+from flask import Blueprint, Response, current_app, g, request, jsonify, url_for
 import jwt
 from marshmallow import ValidationError
-from app.config import SECRET_KEY
-from app.services.services import LoginService, UserService
+from app.config import Config
+from app.services.services import LoginService, SyncTokenExpired, UserService
 from app.schemas.schemas import UserSchema, UserLoginSchema
-from app.helpers.auth import token_required, generate_jwt_token
-from app.helpers.db_connection import get_db_connection
+from app.helpers import admission
+from app.helpers.auth import token_required, decode_jwt_token, generate_jwt_token, revoke_jwt_token
+from app.helpers.circuit_breaker import DatabaseUnavailable
+from app.helpers.conditional import cacheable, expected_version, not_modified, version_etag
+from app.helpers.db_connection import connection_scope, pool_stats, breaker_stats
+from app.helpers.events import get_event_hub, stream_events
+from app.helpers.health import get_health_monitor
+from app.helpers.pagination import encode_cursor, decode_cursor, parse_limit, parse_sort
+from app.helpers.rate_limit import rate_limit_stats
+from app.helpers.tokens import get_token_verifier
 
 user_bp = Blueprint('users', __name__)
+# Bounded concurrency per route class; token refresh and logout, health checks and
+# long-lived event streams (capped separately) never queue
+admission.protect(user_bp, overrides={'login': 'login', 'refresh_token': None, 'logout': None,
+                                      'health': None, 'user_stream': None})
 user_schema = UserSchema()
+users_schema = UserSchema(many=True)
 login_schema = UserLoginSchema()
 
 
@@ -64,7 +81,7 @@ def refresh_token():
 
     try:
         token = auth_header.split(" ")[1]  # "Bearer <token>"
-        decoded = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        decoded = decode_jwt_token(token)
         
         username = decoded.get("username")
         if not username:
@@ -80,28 +97,380 @@ def refresh_token():
         return jsonify({'error': 'Invalid token'}), 401
 
 
+@user_bp.route('/logout', methods=['POST'])
+@token_required
+def logout(current_user):
+    """
+    Revoke the token used for this request
+    ---
+    tags:
+      - Auth
+    security:
+      - Bearer: []
+    responses:
+      204:
+        description: Token revoked; it is refused by every worker from now on
+      401:
+        description: Missing, invalid or expired token
+    """
+    revoke_jwt_token(g.token, g.token_payload)
+    return '', 204
+
+
 @user_bp.route('/users', methods=['GET'])
 @token_required
 def get_users(current_user):
     """
-    Get all users (protected)
+    Get a page of users, optionally filtered and sorted (protected)
     ---
     tags:
       - Users
     security:
       - Bearer: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (default 100, capped at 1000)
+      - name: q
+        in: query
+        type: string
+        required: false
+        description: Users whose name or email starts with this (case-insensitive)
+      - name: email
+        in: query
+        type: string
+        required: false
+        description: Users with exactly this email (case-insensitive)
+      - name: name_prefix
+        in: query
+        type: string
+        required: false
+        description: Users whose name starts with this (case-insensitive)
+      - name: sort
+        in: query
+        type: string
+        required: false
+        enum: [id, -id, name, -name, email, -email]
+        description: Sort column, "-" for descending; ties are ordered by id (default id)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated user fields to return, e.g. "name"; id is always included (default all)
+      - name: after_id
+        in: query
+        type: integer
+        required: false
+        description: Return users with an id greater than this value (id order only)
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Opaque token from the X-Next-Cursor header of the previous page
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of a previously fetched page
     responses:
       200:
-        description: List of all users
+        description: One page of users. X-Next-Cursor and Link headers point to the next page when there is one.
         example:
           - id: 1
             name: "John"
             email: "john@example.com"
+      304:
+        description: No user changed since the page with this ETag was fetched
+      400:
+        description: Invalid limit, after_id, cursor, sort, filter or fields
       401:
         description: Unauthorized - missing or invalid token
     """
-    users = UserService.get_all_users()
-    return jsonify(users), 200
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            Config.USERS_PAGE_DEFAULT_LIMIT, Config.USERS_PAGE_MAX_LIMIT)
+        sort, descending = parse_sort(request.args.get('sort'), _USER_SORT_COLUMNS)
+        filters = _user_filters()
+        fields = _user_fields()
+        after_id = request.args.get('after_id', type=int)
+        if request.args.get('after_id') and after_id is None:
+            raise ValueError('after_id must be an integer')
+        if after_id is not None and (sort != 'id' or descending):
+            raise ValueError('after_id only applies to the default sort; use cursor')
+        after = (None, after_id) if after_id is not None else None
+        if request.args.get('cursor'):
+            position = decode_cursor(request.args['cursor'])
+            if position.get('s', 'id') != request.args.get('sort', 'id'):
+                raise ValueError('cursor belongs to a different sort order')
+            after = (position.get('k'), int(position['id']))
+    except (ValueError, KeyError, TypeError) as err:
+        return jsonify({'error': 'Invalid pagination parameters', 'message': str(err)}), 400
+
+    # Revalidation costs one tiny query instead of reading the page
+    if request.if_none_match:
+        cached = not_modified(version_etag(UserService.get_users_version()))
+        if cached is not None:
+            return cached
+
+    if filters or fields or sort != 'id' or descending:
+        users, next_after, version = UserService.search_users(
+            limit, sort=sort, descending=descending, after=after, fields=fields, **filters)
+    else:
+        users, next_after_id, version = UserService.get_users_page(limit, after and after[1])
+        next_after = (None, next_after_id) if next_after_id is not None else None
+    response = cacheable(jsonify(users), version_etag(version))
+    if next_after is not None:
+        position = {'id': next_after[1]}
+        if 'sort' in request.args:
+            position.update(s=request.args['sort'], k=next_after[0])
+        next_cursor = encode_cursor(position)
+        response.headers['X-Next-Cursor'] = next_cursor
+        query = {name: request.args[name] for name in ('sort', 'fields', *_USER_FILTERS) if request.args.get(name)}
+        next_url = url_for('.get_users', limit=limit, cursor=next_cursor, **query)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response, 200
+
+
+# Sortable columns of GET /api/users; each has an index ordered by (column, id)
+_USER_SORT_COLUMNS = ('id', 'name', 'email')
+# Filter parameter -> maximum length (the width of the column it is matched against)
+_USER_FILTERS = {'q': 120, 'email': 120, 'name_prefix': 100}
+
+
+def _user_filters():
+    """The non-empty search filters of the request, as search_users keyword arguments."""
+    filters = {}
+    for name, max_length in _USER_FILTERS.items():
+        value = request.args.get(name, '').strip()
+        if len(value) > max_length:
+            raise ValueError(f'{name} must be at most {max_length} characters')
+        if value:
+            filters[name] = value
+    return filters
+
+
+def _user_fields():
+    """
+    The `fields` parameter as a tuple of UserSchema fields in schema order,
+    always starting with id, or None when absent (every field).
+    """
+    value = request.args.get('fields', '').strip()
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(user_schema.fields)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+    return tuple(_fields_schema(frozenset(requested | {'id'})).fields)
+
+
+@lru_cache(maxsize=16)
+def _fields_schema(fields):
+    """A UserSchema that dumps only `fields` (a frozenset of its field names)."""
+    return UserSchema(only=fields)
+
+@user_bp.route('/users/changes', methods=['GET'])
+@token_required
+def get_user_changes(current_user):
+    """
+    Get users changed since a sync token (protected)
+    ---
+    tags:
+      - Users
+    security:
+      - Bearer: []
+    parameters:
+      - name: since
+        in: query
+        type: string
+        required: false
+        description: Token from the previous response; omit it for a full sync
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of changes (default 100, capped at 1000)
+    responses:
+      200:
+        description: Users inserted or updated and ids deleted since the token, plus the next token. Call again with the new token while has_more is true.
+        example:
+          users:
+            - id: 1
+              name: "John"
+              email: "john@example.com"
+          deleted: [7]
+          token: "eyJ2IjoyMDA1fQ"
+          has_more: false
+      400:
+        description: Invalid since token or limit
+      401:
+        description: Unauthorized - missing or invalid token
+      410:
+        description: The token is older than the kept deletions; sync again without it
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            Config.USERS_PAGE_DEFAULT_LIMIT, Config.USERS_PAGE_MAX_LIMIT)
+        since = None
+        if request.args.get('since'):
+            since = int(decode_cursor(request.args['since'])['v'])
+            if since < 0:
+                raise ValueError('since must not be negative')
+    except (ValueError, KeyError, TypeError) as err:
+        return jsonify({'error': 'Invalid sync parameters', 'message': str(err)}), 400
+
+    try:
+        users, deleted, version, has_more = UserService.get_user_changes(limit, since)
+    except SyncTokenExpired as err:
+        return jsonify({'error': 'Sync token expired', 'message': str(err)}), 410
+    return jsonify({
+        'users': users,
+        'deleted': deleted,
+        'token': encode_cursor({'v': version}),
+        'has_more': has_more,
+    }), 200
+
+@user_bp.route('/users/stream', methods=['GET'])
+@token_required
+def user_stream(current_user):
+    """
+    Server-Sent Events stream of user changes (protected)
+    ---
+    tags:
+      - Users
+    security:
+      - Bearer: []
+    produces:
+      - text/event-stream
+    parameters:
+      - name: Last-Event-ID
+        in: header
+        type: integer
+        required: false
+        description: Id of the last event received; missed events are replayed first
+    responses:
+      200:
+        description: >
+          Events user.created, user.updated and user.deleted with the user as
+          JSON data. A resync event means the missed events are no longer
+          available; refetch with /api/users/changes. The stream ends after a
+          few minutes or when the client falls behind; reconnect with
+          Last-Event-ID.
+      400:
+        description: Invalid Last-Event-ID
+      401:
+        description: Unauthorized - missing or invalid token
+      503:
+        description: Events are disabled or this worker has too many open streams
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    hub = get_event_hub()
+    if hub is None:
+        return jsonify({'error': 'Event stream is disabled'}), 503
+    subscription = hub.subscribe()  # raises Overloaded (503) when full
+    body = stream_events(hub, subscription, last_event_id,
+                         Config.EVENTS_HEARTBEAT, Config.EVENTS_MAX_STREAM_SECONDS)
+    response = Response(body, mimetype='text/event-stream')
+    # Release the slot even if the body is never iterated
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@user_bp.route('/users/export', methods=['GET'])
+@token_required
+def export_users(current_user):
+    """
+    Stream every user as NDJSON or CSV (protected)
+    ---
+    tags:
+      - Users
+    security:
+      - Bearer: []
+    produces:
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, csv]
+        default: ndjson
+        required: false
+        description: Output format
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated user fields to export, e.g. "name"; id is always included (default all)
+    responses:
+      200:
+        description: Chunked stream of all users
+      400:
+        description: Unsupported format or unknown fields
+      401:
+        description: Unauthorized - missing or invalid token
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format. Use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    try:
+        fields = _user_fields()
+    except ValueError as err:
+        return jsonify({'error': 'Invalid fields', 'message': str(err)}), 400
+
+    stream = UserService.stream_all_users(Config.EXPORT_BATCH_SIZE, fields)
+    render, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(render(stream, current_app.json.dumps), mimetype=mimetype)
+    # Return the connection even if the client goes away before the first chunk
+    response.call_on_close(stream.close)
+    response.headers['Content-Disposition'] = f'attachment; filename=users.{fmt}'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks through
+    return response
+
+
+def _render_ndjson(stream, dumps):
+    for batch in stream:
+        yield ''.join(dumps(user) + '\n' for user in batch)
+
+
+def _render_csv(stream, dumps):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(stream.columns)
+    for batch in stream:
+        writer.writerows([user[col] for col in stream.columns] for user in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (_render_ndjson, 'application/x-ndjson'),
+    'csv': (_render_csv, 'text/csv'),
+}
+
+
+def _user_body(user):
+    """A user as returned to clients; its version travels in the ETag header instead."""
+    return {key: value for key, value in user.items() if key != 'version'}
+
+
+def _user_etag(user):
+    # Entries cached by an older release (shared cache) have no version
+    version = user.get('version')
+    return version_etag(version) if version is not None else None
+
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 @token_required
@@ -119,22 +488,47 @@ def get_user(current_user, user_id):
         type: integer
         required: true
         description: User ID
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated user fields to return, e.g. "name"; id is always included (default all)
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of the copy the client already has
     responses:
       200:
-        description: User found
+        description: User found; the ETag header carries its row version
         example:
           id: 1
           name: "John"
           email: "john@example.com"
+      304:
+        description: The client's copy is current (usually answered from the cache)
+      400:
+        description: Unknown fields
       404:
         description: User not found
       401:
         description: Unauthorized - missing or invalid token
     """
-    user = UserService.get_user_by_id(user_id)
+    try:
+        fields = _user_fields()
+    except ValueError as err:
+        return jsonify({'error': 'Invalid fields', 'message': str(err)}), 400
+
+    # With fields the projection is made in SQL and the cache is bypassed
+    user = UserService.get_user_by_id(user_id, fields)
     if not user:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify(user), 200
+    etag = _user_etag(user)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    body = _user_body(user) if fields is None else _fields_schema(frozenset(fields)).dump(user)
+    return cacheable(jsonify(body), etag), 200
 
 @user_bp.route('/users', methods=['POST'])
 @token_required
@@ -177,11 +571,78 @@ def create_user(current_user):
     try:
         data = user_schema.load(request.get_json())
     except ValidationError as err:
-        print(err.messages)
         return jsonify({'error': 'Validation failed', 'messages': err.messages}), 400
     
     new_user = UserService.create_user(data['name'], data['email'])
-    return jsonify(new_user), 201
+    return cacheable(jsonify(_user_body(new_user)), _user_etag(new_user)), 201
+
+@user_bp.route('/users/bulk', methods=['POST'])
+@token_required
+def create_users_bulk(current_user):
+    """
+    Create many users in one request and one transaction (protected)
+    ---
+    tags:
+      - Users
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - name
+              - email
+            properties:
+              name:
+                type: string
+                example: "John"
+              email:
+                type: string
+                example: "john@example.com"
+    responses:
+      201:
+        description: Valid users were created; invalid rows are reported by index
+        example:
+          created:
+            - index: 0
+              id: 1
+              name: "John"
+              email: "john@example.com"
+          errors:
+            "1":
+              email: ["Not a valid email address."]
+      400:
+        description: Body is not a list, is too large, or no row is valid
+      401:
+        description: Unauthorized - missing or invalid token
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('users')
+    if not isinstance(payload, list) or not payload:
+        return jsonify({'error': 'Expected a non-empty JSON array of users'}), 400
+    if len(payload) > Config.BULK_MAX_USERS:
+        return jsonify({'error': f'At most {Config.BULK_MAX_USERS} users per request'}), 400
+
+    # Validate every row in one pass; keep the valid ones and report the rest
+    try:
+        loaded = users_schema.load(payload)
+        errors = {}
+    except ValidationError as err:
+        loaded = err.valid_data
+        errors = err.messages
+
+    valid = [(index, user) for index, user in enumerate(loaded) if index not in errors]
+    if not valid:
+        return jsonify({'error': 'Validation failed', 'messages': errors}), 400
+
+    created = UserService.create_users_bulk(valid)
+    return jsonify({'created': created, 'errors': errors}), 201
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 @token_required
@@ -211,9 +672,14 @@ def update_user(current_user, user_id):
             email:
               type: string
               example: "john.updated@example.com"
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of the copy being edited; the update only applies if it is still current
     responses:
       200:
-        description: User updated successfully
+        description: User updated successfully; the ETag header carries the new version
         example:
           id: 1
           name: "John Updated"
@@ -222,20 +688,24 @@ def update_user(current_user, user_id):
         description: Invalid data or validation error
       404:
         description: User not found
+      412:
+        description: The user was modified since the If-Match ETag was issued
       401:
         description: Unauthorized - missing or invalid token
     """
     try:
         data = user_schema.load(request.get_json(), partial=True)
+        version = expected_version()
     except ValidationError as err:
         return jsonify({'error': 'Validation failed', 'messages': err.messages}), 400
-    
-    # Check if user exists first
-    if not UserService.get_user_by_id(user_id):
-        return jsonify({'error': 'User not found'}), 404
+    except ValueError as err:
+        return jsonify({'error': 'Invalid If-Match header', 'message': str(err)}), 400
 
-    updated_user = UserService.update_user(user_id, data.get('name'), data.get('email'))
-    return jsonify(updated_user), 200
+    # The procedure returns the updated row, or nothing when the id is unknown
+    updated_user = UserService.update_user(user_id, data.get('name'), data.get('email'), version)
+    if not updated_user:
+        return jsonify({'error': 'User not found'}), 404
+    return cacheable(jsonify(_user_body(updated_user)), _user_etag(updated_user)), 200
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 @token_required
@@ -253,33 +723,200 @@ def delete_user(current_user, user_id):
         type: integer
         required: true
         description: User ID
+      - name: If-Match
+        in: header
+        type: string
+        required: false
+        description: ETag of the copy being deleted; the delete only applies if it is still current
     responses:
       200:
-        description: User deleted successfully
+        description: User deleted successfully; the deleted row is echoed back
+        example:
+          message: "User deleted"
+          user:
+            id: 1
+            name: "John"
+            email: "john@example.com"
       404:
         description: User not found
+      412:
+        description: The user was modified since the If-Match ETag was issued
       401:
         description: Unauthorized - missing or invalid token
     """
-    if not UserService.get_user_by_id(user_id):
+    try:
+        version = expected_version()
+    except ValueError as err:
+        return jsonify({'error': 'Invalid If-Match header', 'message': str(err)}), 400
+    deleted_user = UserService.delete_user(user_id, version)
+    if not deleted_user:
         return jsonify({'error': 'User not found'}), 404
-        
-    UserService.delete_user(user_id)
-    return jsonify({'message': 'User deleted'}), 200
+    return jsonify({'message': 'User deleted', 'user': _user_body(deleted_user)}), 200
+
+
+@user_bp.route('/batch', methods=['POST'])
+@token_required
+def batch(current_user):
+    """
+    Run several user operations in one request and on one connection (protected)
+    ---
+    tags:
+      - Users
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - operations
+          properties:
+            atomic:
+              type: boolean
+              default: false
+              description: Apply all operations in one transaction, or none of them
+            operations:
+              type: array
+              items:
+                type: object
+                required:
+                  - method
+                  - path
+                properties:
+                  method:
+                    type: string
+                    enum: [GET, POST, PUT, DELETE]
+                  path:
+                    type: string
+                    example: "/users/1"
+                  body:
+                    type: object
+    responses:
+      200:
+        description: >
+          One result per operation, in order, with the status and body the
+          single-operation endpoint would have returned. In atomic mode the
+          first failing operation rolls everything back; the other operations
+          then report 424.
+        example:
+          committed: true
+          results:
+            - status: 200
+              body:
+                id: 1
+                name: "John"
+                email: "john@example.com"
+            - status: 404
+              body:
+                error: "User not found"
+      400:
+        description: Malformed batch or too many operations
+      401:
+        description: Unauthorized - missing or invalid token
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list) \
+            or not payload['operations']:
+        return jsonify({'error': 'Expected {"operations": [...]} with at least one operation'}), 400
+    operations = payload['operations']
+    if len(operations) > Config.BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_OPERATIONS} operations per batch'}), 400
+    atomic = bool(payload.get('atomic', False))
+
+    results = []
+    try:
+        with connection_scope(atomic=atomic) as conn:
+            for operation in operations:
+                try:
+                    status, body = _run_batch_operation(operation)
+                except DatabaseUnavailable:
+                    raise
+                except Exception:
+                    current_app.logger.exception('batch operation %d failed', len(results))
+                    status, body = 500, {'error': 'Internal server error'}
+                    if not atomic:
+                        conn.rollback()  # raises too if the connection is gone
+                results.append({'status': status, 'body': body})
+                if atomic and status >= 400:
+                    raise _BatchRollback()
+    except _BatchRollback:
+        failed = len(results) - 1
+        skipped = {'status': 424, 'body': {'error': f'Not applied: operation {failed} failed'}}
+        results = [result if index == failed else skipped for index, result in enumerate(results)]
+        results += [skipped] * (len(operations) - len(results))
+        return jsonify({'committed': False, 'results': results}), 200
+    return jsonify({'committed': True, 'results': results}), 200
+
+
+class _BatchRollback(Exception):
+    """Raised inside an atomic batch to roll back its transaction."""
+
+
+_BATCH_PATH = re.compile(r'^(?:/api)?/users(?:/(\d+))?/?$')
+
+
+def _run_batch_operation(operation):
+    """Run one batch operation through UserService; returns (status, body) like the single endpoints."""
+    if not isinstance(operation, dict):
+        return 400, {'error': 'Operation must be an object with method and path'}
+    method = str(operation.get('method', '')).upper()
+    match = _BATCH_PATH.match(str(operation.get('path', '')))
+    if match is None:
+        return 404, {'error': 'Not found'}
+    body = operation.get('body')
+
+    if match.group(1) is None:
+        if method != 'POST':
+            return 405, {'error': 'Method not allowed in a batch'}
+        try:
+            data = user_schema.load(body)
+        except ValidationError as err:
+            return 400, {'error': 'Validation failed', 'messages': err.messages}
+        return 201, _user_body(UserService.create_user(data['name'], data['email']))
+
+    user_id = int(match.group(1))
+    if method == 'GET':
+        user = UserService.get_user_by_id(user_id)
+        return (200, _user_body(user)) if user else (404, {'error': 'User not found'})
+    if method == 'PUT':
+        try:
+            data = user_schema.load(body, partial=True)
+        except ValidationError as err:
+            return 400, {'error': 'Validation failed', 'messages': err.messages}
+        user = UserService.update_user(user_id, data.get('name'), data.get('email'))
+        return (200, _user_body(user)) if user else (404, {'error': 'User not found'})
+    if method == 'DELETE':
+        user = UserService.delete_user(user_id)
+        return (200, {'message': 'User deleted', 'user': _user_body(user)}) if user else (404, {'error': 'User not found'})
+    return 405, {'error': 'Method not allowed in a batch'}
 
 
 @user_bp.route('/health', methods=['GET'])
 def health():
-    """Health-check endpoint for DB connectivity. Returns 200 when DB is reachable."""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            raise Exception('unable to obtain DB connection')
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1')
-        cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return jsonify({"db": "ok"}), 200
-    except Exception as e:
-        return jsonify({"db": "error", "error": str(e)}), 500
+    """
+    Detailed health of this worker, served from the background database probe
+    ---
+    tags:
+      - Monitoring
+    responses:
+      200:
+        description: Database reachable; includes pool, breaker, cache and admission statistics
+      503:
+        description: Database unreachable or the last probe is stale
+    """
+    state = get_health_monitor().snapshot()
+    body = {
+        "db": state,
+        "pool": pool_stats(),
+        "breaker": breaker_stats(),
+        "cache": UserService.cache_stats(),
+        "admission": admission.admission_stats(),
+        "rate_limit": rate_limit_stats(),
+        "auth": get_token_verifier().stats(),
+    }
+    hub = get_event_hub()
+    if hub is not None:
+        body["events"] = hub.stats()
+    return jsonify(body), 200 if state['ready'] else 503
@@ -1,73 +1,374 @@
-from app.helpers.db_connection import get_db_connection, row_to_dict
+import logging
+from app.helpers.cache import MISSING, get_user_cache, user_key as _user_key
+from app.helpers.conditional import PreconditionFailed
+from app.helpers.events import publish_user_event
+from app.helpers.db_connection import get_db_connection, in_transaction, on_commit, retry_read, row_to_dict, rows_to_records, column_names, stream_query
+from app.helpers.json_provider import RowSet
+from app.helpers.passwords import check_password, hash_password
+
+logger = logging.getLogger('app.services')
+
+
+def _announce(event_type, users):
+    """Bring the cache up to date with committed changes and tell stream subscribers."""
+    cache = get_user_cache()
+    for user in users:
+        if event_type == 'deleted':
+            cache.delete(_user_key(user["id"]))
+        else:
+            # Refresh rather than drop: the row is in hand and likely read next
+            cache.set(_user_key(user["id"]), dict(user))
+    publish_user_event(event_type, users)
+
+
+def _fields_param(fields):
+    """@Fields of the read procedures: a comma-separated column list, or NULL for every column."""
+    return ','.join(fields) if fields is not None else None
+
+
+def _raise_if_exists(cursor, user_id):
+    """After a conditional write matched nothing: 412 if the user exists (other version), else fall through to 404."""
+    cursor.execute("EXEC dbo.sp_get_user_by_id @UserId = ?", (user_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        raise PreconditionFailed(row_to_dict(cursor, row)["version"])
+
+
+class SyncTokenExpired(Exception):
+    """Raised when a sync token predates the oldest kept tombstone; the client must sync from scratch."""
+
+    def __init__(self):
+        super().__init__('The sync token has expired; sync again without it')
+
 
 class LoginService:
     @staticmethod
     def validate_user(username, password):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("select COUNT(1) from logins where username = ? AND password = ?", (username, password))
-        count = cursor.fetchone()[0]
-        if count > 0:
-            return True
-        return False
+        """
+        Check a username/password pair against logins.
+
+        The stored hash is fetched and the pooled connection released before
+        the KDF runs on the verifier pool. A legacy plaintext password or a
+        hash with outdated parameters is replaced after a successful check.
+        """
+        login_id, stored = LoginService._get_login(username)
+        valid, new_hash = check_password(password, stored)
+        if valid and new_hash:
+            try:
+                LoginService._set_password(login_id, new_hash, expected=stored)
+            except Exception as ex:  # the login itself succeeded; try again next time
+                logger.warning('Could not upgrade the password hash of login %s: %s', login_id, ex)
+        return valid
+
+    @staticmethod
+    def set_password(username, password):
+        """Store a freshly hashed password for an existing login; False if there is none."""
+        login_id, _ = LoginService._get_login(username)
+        if login_id is None:
+            return False
+        return LoginService._set_password(login_id, hash_password(password))
+
+    @staticmethod
+    @retry_read
+    def _get_login(username):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXEC dbo.sp_get_login @Username = ?", (username,))
+            row = cursor.fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    @staticmethod
+    def _set_password(login_id, password_hash, expected=None):
+        # With `expected`, only replace that exact value: a concurrent password
+        # change must not be overwritten by a rehash of the old password
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXEC dbo.sp_set_login_password @LoginId = ?, @Password = ?, @ExpectedPassword = ?",
+                           (login_id, password_hash, expected))
+            updated = cursor.fetchone()[0]
+            conn.commit()
+        return updated > 0
 
 class UserService: 
     @staticmethod
-    def get_all_users():
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("EXEC dbo.sp_get_all_users")
-        
-        rows = cursor.fetchall()
-        
-        # Convert list of rows to list of dicts
-        results = [row_to_dict(cursor, row) for row in rows]
-        
-        conn.close()
-        return results
+    def stream_all_users(batch_size=1000, fields=None):
+        """
+        Stream every user without materializing the table.
+
+        Args:
+            batch_size: Rows per batch.
+            fields: Columns to read (always including id), or None for all.
+
+        Returns:
+            A ResultStream yielding lists of at most `batch_size` user dicts.
+            Close it (or exhaust it) to release the DB connection.
+        """
+        return stream_query("EXEC dbo.sp_get_all_users @Fields = ?", (_fields_param(fields),), batch_size=batch_size)
 
     @staticmethod
-    def get_user_by_id(user_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("EXEC dbo.sp_get_user_by_id @UserId = ?", (user_id,))
-        
-        row = cursor.fetchone()
-        result = row_to_dict(cursor, row) if row else None
-        
-        conn.close()
+    @retry_read
+    def get_users_page(limit, after_id=None):
+        """
+        Return one keyset page of users ordered by id.
+
+        Args:
+            limit: Maximum number of users in the page.
+            after_id: Only users with an id greater than this are returned.
+
+        Returns:
+            (users, next_after_id, version) where users is a RowSet (a
+            read-only list of dicts), next_after_id is None on the last page
+            and version is the high-water mark of committed user changes.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            # Ask for one extra row to learn whether another page exists
+            cursor.execute("EXEC dbo.sp_get_users_page @Limit = ?, @AfterId = ?", (limit + 1, after_id))
+
+            rows = cursor.fetchall()
+            # Serialized straight from the row tuples by FastJSONProvider
+            results = RowSet(column_names(cursor), rows[:limit])
+            cursor.nextset()
+            version = cursor.fetchone()[0]
+
+        next_after_id = results[-1]['id'] if len(rows) > limit else None
+        return results, next_after_id, version
+
+    @staticmethod
+    @retry_read
+    def search_users(limit, q=None, email=None, name_prefix=None, sort='id', descending=False, after=None,
+                     fields=None):
+        """
+        Return one keyset page of users matching the filters, in `sort` order.
+
+        Args:
+            limit: Maximum number of users in the page.
+            q: Name or email starts with this.
+            email: Email equals this.
+            name_prefix: Name starts with this.
+            sort: "id", "name" or "email"; ties are broken by id.
+            descending: Reverse the order.
+            after: (sort value, id) of the last user of the previous page.
+            fields: Columns to return (always including id), or None for all;
+                only these are selected in SQL.
+
+        Returns:
+            (users, next_after, version) where next_after is the position to
+            pass as `after` for the next page, or None on the last page.
+        """
+        after_key, after_id = after if after is not None else (None, None)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "EXEC dbo.sp_search_users @Limit = ?, @Q = ?, @Email = ?, @NamePrefix = ?, @Sort = ?, "
+                "@Descending = ?, @AfterKey = ?, @AfterId = ?, @Fields = ?",
+                (limit + 1, q, email, name_prefix, sort, int(descending), after_key, after_id,
+                 _fields_param(fields)),
+            )
+            rows = cursor.fetchall()
+            columns = column_names(cursor)
+            cursor.nextset()
+            version = cursor.fetchone()[0]
+
+        next_after = None
+        if len(rows) > limit:
+            last = dict(zip(columns, rows[limit - 1]))
+            next_after = (last[sort], last['id'])
+        rows = rows[:limit]
+        if fields is not None and len(columns) > len(fields):
+            # The sort column was only selected for the cursor; it comes last
+            columns, rows = columns[:len(fields)], [row[:len(fields)] for row in rows]
+        return RowSet(columns, rows), next_after, version
+
+    @staticmethod
+    @retry_read
+    def get_users_version():
+        """High-water mark of committed user changes; it moves on every insert, update and delete."""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXEC dbo.sp_get_users_version")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    @retry_read
+    def get_user_changes(limit, since=None):
+        """
+        Return users inserted, updated or deleted after change version `since`.
+
+        Args:
+            limit: Maximum number of changes (upserts plus deletions).
+            since: Version returned by a previous call; None for a full sync.
+
+        Returns:
+            (users, deleted_ids, version, has_more) where users is a RowSet of
+            the current rows, deleted_ids lists removed users and version is
+            the value to pass as `since` next time.
+
+        Raises:
+            SyncTokenExpired: if tombstones newer than `since` have been
+                pruned, so its deletions can no longer be listed.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("EXEC dbo.sp_get_user_changes @Since = ?, @Limit = ?", (since, limit + 1))
+
+            columns = column_names(cursor)
+            rows = cursor.fetchall()
+            cursor.nextset()
+            high_water, pruned_through = cursor.fetchone()
+
+        if since is not None and since < pruned_through:
+            raise SyncTokenExpired()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        id_at, version_at, deleted_at = (columns.index(name) for name in ('id', 'version', 'is_deleted'))
+        user_at = [i for i in range(len(columns)) if i not in (version_at, deleted_at)]
+        users = RowSet(tuple(columns[i] for i in user_at),
+                       [tuple(row[i] for i in user_at) for row in rows if not row[deleted_at]])
+        deleted_ids = [row[id_at] for row in rows if row[deleted_at]]
+        if has_more:
+            version = rows[-1][version_at]
+        else:
+            version = max(high_water, since or 0)
+        return users, deleted_ids, version, has_more
+
+    @staticmethod
+    @retry_read
+    def get_user_by_id(user_id, fields=None):
+        """
+        Return the user with its version, or None.
+
+        Args:
+            user_id: Id of the user.
+            fields: Columns to read (always including id), or None for all.
+                A narrowed row is read from SQL Server with @Fields and
+                bypasses the cache, which holds whole rows only.
+        """
+        cache = get_user_cache()
+        # An open batch transaction may have changed the row; the cache is
+        # only updated once it commits
+        use_cache = fields is None and not in_transaction()
+        cached = cache.get(_user_key(user_id)) if use_cache else MISSING
+        if cached is not MISSING:
+            return dict(cached)
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("EXEC dbo.sp_get_user_by_id @UserId = ?, @Fields = ?", (user_id, _fields_param(fields)))
+            
+            row = cursor.fetchone()
+            result = row_to_dict(cursor, row) if row else None
+
+        # Only hits are cached so a create never has to chase a negative entry
+        if result is not None and use_cache:
+            cache.set(_user_key(user_id), dict(result))
         return result
 
     @staticmethod
     def create_user(name, email):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("EXEC dbo.sp_create_user @Name = ?, @Email = ?", (name, email))
-        conn.commit() # Important: Commit changes!
-        conn.close()     
-        return {"name": name, "email": email}
+        """Insert a user and return the stored row, including its generated id."""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXEC dbo.sp_create_user @Name = ?, @Email = ?", (name, email))
+            created_row = cursor.fetchone()  # OUTPUT inserted.*
+            created_user = row_to_dict(cursor, created_row)
+            conn.commit() # Important: Commit changes!
+
+        on_commit(lambda: _announce('created', [created_user]))
+        return created_user
 
     @staticmethod
-    def update_user(user_id, name, email):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("EXEC dbo.sp_update_user @UserId = ?, @Name = ?, @Email = ?", (user_id, name, email))
-        updated_row = cursor.fetchone()
-        updated_user = row_to_dict(cursor, updated_row) if updated_row else None
-        conn.commit()
-        conn.close()
+    def create_users_bulk(users):
+        """
+        Insert many users in a single round-trip and a single transaction.
+
+        Args:
+            users: List of (index, {"name": ..., "email": ...}) pairs; index is
+                the caller's position of the user and is echoed back.
+
+        Returns:
+            List of {"index", "id", "name", "email"} dicts ordered by index.
+        """
+        # One table-valued parameter instead of one EXEC per row
+        tvp = [(index, user['name'], user['email']) for index, user in users]
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("EXEC dbo.sp_create_users_bulk @Users = ?", (tvp,))
+            records = rows_to_records(cursor, cursor.fetchall())
+            conn.commit()
+
+        created = [{"index": r.RowNo, "id": r.id, "name": r.name, "email": r.email} for r in records]
+        created.sort(key=lambda user: user["index"])
+
+        rows = [{"id": r.id, "name": r.name, "email": r.email, "version": r.version} for r in records]
+        on_commit(lambda: _announce('created', rows))
+        return created
+
+    @staticmethod
+    def update_user(user_id, name, email, expected_version=None):
+        """
+        Update a user in one round-trip; None for name/email keeps the current value.
+
+        Args:
+            expected_version: Only update if the row still has this version
+                (from its ETag).
+
+        Returns:
+            The updated row, or None when no user has this id.
+
+        Raises:
+            PreconditionFailed: if the row exists with another version.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("EXEC dbo.sp_update_user @UserId = ?, @Name = ?, @Email = ?, @ExpectedVersion = ?",
+                           (user_id, name, email, expected_version))
+            updated_row = cursor.fetchone()  # OUTPUT inserted.*, empty if id not found
+            updated_user = row_to_dict(cursor, updated_row) if updated_row else None
+            if updated_user is None and expected_version is not None:
+                _raise_if_exists(cursor, user_id)
+            conn.commit()
+
+        if updated_user is not None:
+            on_commit(lambda: _announce('updated', [updated_user]))
+        else:
+            get_user_cache().delete(_user_key(user_id))
         return updated_user
 
     @staticmethod
-    def delete_user(user_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("EXEC dbo.sp_delete_user @UserId = ?", (user_id,))
-        rows_affected = cursor.fetchone()[0]  # @@ROWCOUNT returned
-        conn.commit()
-        conn.close()
-        return rows_affected > 0
\ No newline at end of file
+    def delete_user(user_id, expected_version=None):
+        """
+        Delete a user in one round-trip.
+
+        Args:
+            expected_version: Only delete if the row still has this version.
+
+        Returns:
+            The deleted row, or None when no user has this id.
+
+        Raises:
+            PreconditionFailed: if the row exists with another version.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("EXEC dbo.sp_delete_user @UserId = ?, @ExpectedVersion = ?", (user_id, expected_version))
+            deleted_row = cursor.fetchone()  # OUTPUT deleted.*, empty if id not found
+            deleted_user = row_to_dict(cursor, deleted_row) if deleted_row else None
+            if deleted_user is None and expected_version is not None:
+                _raise_if_exists(cursor, user_id)
+            conn.commit()
+        if deleted_user is not None:
+            on_commit(lambda: _announce('deleted', [deleted_user]))
+        else:
+            get_user_cache().delete(_user_key(user_id))
+        return deleted_user
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss/eviction counters of the user cache."""
+        return get_user_cache().stats()
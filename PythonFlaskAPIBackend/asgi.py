@@ -0,0 +1,7 @@
+# asgi.py
+# ASGI entry point: uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+from app import create_app
+from app.config import Config
+from app.helpers.asgi import WSGIToASGI
+
+app = WSGIToASGI(create_app(), max_threads=Config.ASGI_THREADS)
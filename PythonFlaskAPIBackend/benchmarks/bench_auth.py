@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: cost of authenticating a repeat bearer token.
+
+Compares a full jwt.decode (HMAC verification and claims parse on every
+request, the previous behaviour) with TokenVerifier on a cache miss and on a
+hit (the same token again), and times a whole token_required request through
+the Flask test client with and without the cache.
+
+    python benchmarks/bench_auth.py --number 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'none')
+os.environ.setdefault('AUTH_REVOCATION_BACKEND', 'memory')
+
+import fake_pyodbc  # noqa: E402
+fake_pyodbc.install()  # the app package imports pyodbc
+
+import jwt  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+from app.helpers.tokens import KeyRing, MemoryRevocationList, TokenVerifier  # noqa: E402
+
+SECRET = 'a-benchmark-secret-that-is-long-enough'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='decodes per measurement')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    verifier = TokenVerifier(KeyRing({'k1': SECRET}, 'k1'), MemoryRevocationList(), maxsize=args.number)
+    token = verifier.issue({'username': 'admin'}, 3600)
+    uncached = TokenVerifier(verifier.keyring, MemoryRevocationList(), maxsize=0)  # nothing is kept
+
+    cases = {
+        'jwt.decode every time': lambda: jwt.decode(token, SECRET, algorithms=['HS256']),
+        'verifier, cache miss': lambda: uncached.decode(token),
+        'verifier, repeat token': lambda: verifier.decode(token),
+    }
+    print(f"{'case':<28} {'us/token':>9}")
+    baseline = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / args.number
+        baseline = baseline or best
+        print(f"{name:<28} {best * 1e6:9.2f}   x{baseline / best:5.2f}")
+
+    # End to end: a trivial protected view, so auth dominates the request
+    from app.helpers import tokens
+    from app.helpers.auth import token_required
+    tokens._verifier, tokens._verifier_pid = verifier, os.getpid()
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    @token_required
+    def ping(current_user):
+        return jsonify(user=current_user)
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    number = max(1, args.number // 10)
+    cached = min(timeit.repeat(lambda: client.get('/ping', headers=headers), number=number, repeat=args.repeat))
+    tokens._verifier = uncached
+    full = min(timeit.repeat(lambda: client.get('/ping', headers=headers), number=number, repeat=args.repeat))
+    print(f"\ntoken_required request, full verify  {full / number * 1e6:9.1f} us")
+    print(f"token_required request, cache hit    {cached / number * 1e6:9.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: size and cost of compressing a GET /api/users page.
+
+Builds a page of users as FastJSONProvider serializes it and reports, per
+encoding, the body size and the time to compress it once (a cache miss) and
+to serve it again for the same URL and ETag (a cache hit), through the same
+after_request hook the app installs. brotli is measured when installed.
+
+    python benchmarks/bench_compression.py --rows 1000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fake_pyodbc  # noqa: E402
+fake_pyodbc.install()  # the app package imports pyodbc
+
+from flask import Flask  # noqa: E402
+from app.helpers import compression  # noqa: E402
+from app.helpers.json_provider import FastJSONProvider, RowSet  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000, help='users in the page')
+    parser.add_argument('--number', type=int, default=200, help='requests per measurement')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    page = RowSet(('id', 'name', 'email'),
+                  [(i, f'User {i}', f'user{i}@example.com') for i in range(1, args.rows + 1)])
+    app = Flask(__name__)
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    body = app.json.dumps(page).encode()
+
+    def respond():
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag('v1')
+        return response
+
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+    print(f"{args.rows} rows, {len(body)} bytes of JSON")
+    print(f"{'encoding':<10} {'bytes':>9} {'ratio':>6} {'miss ms':>9} {'hit ms':>8}")
+    for encoding in encodings:
+        with app.test_request_context('/api/users?limit=1000', headers={'Accept-Encoding': encoding}):
+            compression.reset_compression_cache()
+            size = len(compression.compress_response(respond()).get_data())
+
+            def miss():
+                compression.reset_compression_cache()
+                compression.compress_response(respond())
+
+            hit = lambda: compression.compress_response(respond())  # noqa: E731
+            times = [min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / args.number
+                     for fn in (miss, hit)]
+        print(f"{encoding:<10} {size:>9} {len(body) / size:6.1f} {times[0] * 1000:9.3f} {times[1] * 1000:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
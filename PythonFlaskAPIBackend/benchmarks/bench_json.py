@@ -0,0 +1,55 @@
+"""
+Micro-benchmark: JSON encoding of a large /api/users payload.
+
+Compares Flask's stdlib provider on row dicts (the previous behaviour) with
+FastJSONProvider on row dicts and on a RowSet (rows encoded without dicts).
+
+    python benchmarks/bench_json.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app.helpers import json_provider  # noqa: E402
+from app.helpers.json_provider import FastJSONProvider, RowSet  # noqa: E402
+
+COLUMNS = ('id', 'name', 'email')
+
+
+def make_rows(n):
+    return [(i, f'User {i}', f'user{i}@example.com') for i in range(1, n + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    cases = {
+        'stdlib, row_to_dict per row': lambda: stdlib.response([dict(zip(COLUMNS, r)) for r in rows]),
+        'fast provider, dicts': lambda: fast.response([dict(zip(COLUMNS, r)) for r in rows]),
+        'fast provider, RowSet': lambda: fast.response(RowSet(COLUMNS, rows)),
+    }
+
+    print(f"orjson available: {json_provider.orjson is not None}; rows: {args.rows}")
+    with app.app_context():
+        baseline = None
+        for name, fn in cases.items():
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            baseline = baseline or best
+            print(f"{name:<32} {best * 1000:9.2f} ms   x{baseline / best:5.2f}")
+
+
+if __name__ == '__main__':
+    main()
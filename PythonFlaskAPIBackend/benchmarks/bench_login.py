@@ -0,0 +1,111 @@
+"""
+Login benchmark: password-hashing throughput and its effect on /api/users.
+
+Boots create_app() like load_test.py, then measures
+  1. GET /api/users/<id> alone (baseline latency),
+  2. POST /api/login alone (throughput at the configured hash cost),
+  3. GET /api/users/<id> again while a login storm runs in the background.
+
+Comparing 1 and 3 shows how much the KDF work leaks into other routes. Run it
+with the default verifier pool and with --hash-workers equal to
+ADMISSION_LOGIN_LIMIT, which hashes as if on the request threads:
+
+    python benchmarks/bench_login.py --iterations 600000
+    python benchmarks/bench_login.py --iterations 600000 --hash-workers 4
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from load_test import Client, build_scenarios, run_scenario  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=600000, help='PBKDF2 iterations')
+    parser.add_argument('--algorithm', choices=('pbkdf2_sha256', 'scrypt'), default='pbkdf2_sha256')
+    parser.add_argument('--hash-workers', type=int, help='PASSWORD_HASH_WORKERS (default: config)')
+    parser.add_argument('--users', type=int, default=10000, help='users seeded before the run')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent GET clients')
+    parser.add_argument('--login-concurrency', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--requests', type=int, default=2000, help='measured GET requests per phase')
+    parser.add_argument('--logins', type=int, default=50, help='measured logins in phase 2')
+    args = parser.parse_args()
+
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'none')
+    os.environ['PASSWORD_HASH_ALGORITHM'] = args.algorithm
+    os.environ['PASSWORD_PBKDF2_ITERATIONS'] = str(args.iterations)
+    if args.hash_workers:
+        os.environ['PASSWORD_HASH_WORKERS'] = str(args.hash_workers)
+    # Shed logins only when the pool cannot keep up at all
+    os.environ.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', '30')
+    os.environ.setdefault('ADMISSION_QUEUE_TIMEOUT', '30')
+
+    import fake_pyodbc
+    fake_pyodbc.configure()
+    low, high = fake_pyodbc.seed_users(args.users)
+    fake_pyodbc.install()
+
+    import logging
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+    from app.config import Config
+    from app.helpers.auth import generate_jwt_token
+    from app.services.services import LoginService
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    logging.getLogger('app.profiling').setLevel(logging.ERROR)
+    app = create_app()
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    token = generate_jwt_token('admin', expires_in=24 * 3600)
+    LoginService.set_password('admin', 'admin')  # hashed with the configured parameters
+
+    fns = build_scenarios((low, high), itertools.count())
+    print(f"{args.algorithm}, {args.iterations} iterations; hash workers {Config.PASSWORD_HASH_WORKERS}, "
+          f"login admission limit {Config.ADMISSION_LOGIN_LIMIT}, cpus {os.cpu_count()}")
+    print(f"{'phase':<22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    def report(name, result):
+        lat = result['latency_ms']
+        print(f"{name:<22} {result['throughput_rps']:>9} {lat['p50']:>9} {lat['p95']:>9} {lat['p99']:>9} "
+              f"{result['errors']:>7}")
+
+    report('get', run_scenario('get', fns['get'], port, token, args.concurrency, args.requests, 5))
+    report('login', run_scenario('login', fns['login'], port, token, args.login_concurrency, args.logins, 1))
+
+    stop = threading.Event()
+    storm = {'logins': 0, 'errors': 0}
+
+    def login_storm():
+        client = Client(port, token)
+        while not stop.is_set():
+            status, expected = fns['login'](client)
+            storm['logins' if status == expected else 'errors'] += 1
+
+    storm_threads = [threading.Thread(target=login_storm) for _ in range(args.login_concurrency)]
+    for t in storm_threads:
+        t.start()
+    time.sleep(0.5)  # let the storm saturate the pool
+    started = time.perf_counter()
+    report('get during login storm', run_scenario('get', fns['get'], port, token, args.concurrency,
+                                                  args.requests, 5))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in storm_threads:
+        t.join()
+    print(f"  background logins: ~{storm['logins'] / elapsed:.1f}/s, {storm['errors']} errors (503s)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: mapping pyodbc rows to Python objects.
+
+Compares the old per-row row_to_dict (column list rebuilt from
+cursor.description for every row) with the cached per-layout mappers in
+app.helpers.db_connection, reporting time and peak allocation.
+
+    python benchmarks/bench_row_mapping.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.helpers.db_connection import rows_to_dicts, rows_to_records  # noqa: E402
+
+
+class FakeCursor:
+    """Just enough of a pyodbc cursor: a DB-API description."""
+    description = [(name, None, None, None, None, None, True) for name in ('id', 'name', 'email')]
+
+
+def legacy_row_to_dict(cursor, row):
+    # Behaviour before per-layout mappers
+    if not row:
+        return None
+    columns = [col[0] for col in cursor.description]
+    return dict(zip(columns, row))
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cursor = FakeCursor()
+    rows = [(i, f'User {i}', f'user{i}@example.com') for i in range(1, args.rows + 1)]
+
+    cases = {
+        'row_to_dict per row (old)': lambda: [legacy_row_to_dict(cursor, row) for row in rows],
+        'rows_to_dicts (cached)': lambda: rows_to_dicts(cursor, rows),
+        'rows_to_records (namedtuple)': lambda: rows_to_records(cursor, rows),
+    }
+
+    print(f"rows: {args.rows}")
+    baseline = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<30} {best * 1000:8.2f} ms   x{baseline / best:5.2f}   peak {peak_kib(fn):10.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Search benchmark: GET /api/users filters over a million users.
+
+Seeds the SQLite stand-in (benchmarks/fake_pyodbc) and runs each search shape
+of dbo.sp_search_users next to the query it replaces, printing the best time
+and the query plan: "SEARCH ... USING INDEX" is an index seek, "SCAN" a pass
+over the whole table. benchmarks/search_benchmark.sql makes the same
+comparison against SQL Server.
+
+    python benchmarks/bench_search.py --users 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import fake_pyodbc  # noqa: E402
+
+SEARCH = ("EXEC dbo.sp_search_users @Limit = ?, @Q = ?, @Email = ?, @NamePrefix = ?, @Sort = ?, "
+          "@Descending = ?, @AfterKey = ?, @AfterId = ?")
+
+
+def search(limit=101, q=None, email=None, name_prefix=None, sort='id', descending=0, after_key=None, after_id=None):
+    return SEARCH, (limit, q, email, name_prefix, sort, descending, after_key, after_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000, help='users seeded before the run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db-path', help='SQLite file for the stand-in (temporary by default)')
+    args = parser.parse_args()
+
+    fake_pyodbc.configure(args.db_path)
+    started = time.perf_counter()
+    low, high = fake_pyodbc.seed_users(args.users)
+    print(f"seeded {high - low + 1} users in {time.perf_counter() - started:.1f}s")
+    target = low + (high - low) * 2 // 3
+    prefix = f'User {target}'[:-1]
+
+    conn = fake_pyodbc.connect()
+    cursor = conn.cursor()
+    statements = []
+    conn._db.set_trace_callback(statements.append)
+
+    cases = [
+        ('email =', search(email=f'user{target}@example.com')),
+        ('name_prefix, sort=name', search(name_prefix=prefix, sort='name')),
+        ('  next page', search(name_prefix=prefix, sort='name', after_key=f'User {target}', after_id=target)),
+        ('q (name or email)', search(q=f'user{prefix[5:]}')),
+        ('sort=-email, no filter', search(sort='email', descending=1)),
+        ('baseline: all users', ('EXEC dbo.sp_get_all_users', ())),
+        ('baseline: infix LIKE', ('SELECT id, name, email FROM users WHERE name LIKE ? ORDER BY name LIMIT 101',
+                                  (f'%{prefix[5:]}%',))),
+        ('baseline: LOWER(email) =', ('SELECT id, name, email FROM users WHERE LOWER(email) = ? LIMIT 101',
+                                      (f'user{target}@example.com',))),
+    ]
+    print(f"{'query':<26} {'rows':>8} {'ms':>9}  plan")
+    for name, (sql, params) in cases:
+        best = None
+        for _ in range(args.repeat):
+            statements.clear()
+            start = time.perf_counter()
+            rows = cursor.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        query = [s for s in statements if 'FROM users' in s][-1]
+        plan = '; '.join(row[3] for row in conn._db.execute('EXPLAIN QUERY PLAN ' + query))
+        print(f"{name:<26} {len(rows):>8} {best * 1000:9.2f}  {plan}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""
+SQLite-backed stand-in for the subset of pyodbc this API uses.
+
+It lets create_app() run without SQL Server or an ODBC driver: install it with
+install() *before* importing `app`, and every `EXEC dbo.sp_*` statement is
+dispatched to a Python re-implementation of that stored procedure (see
+PROCEDURES) running against a local SQLite file. Other statements are passed
+to SQLite as-is.
+
+An optional per-statement delay simulates the network round-trip to a real
+database server.
+"""
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+version = '0.0-fake'
+pooling = False
+
+
+class Error(Exception):
+    pass
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class IntegrityError(DatabaseError):
+    pass
+
+
+_settings = {'path': None, 'latency': 0.0}
+_init_lock = threading.Lock()
+# SQLite allows one writer at a time and resolves contention by sleeping
+# and retrying; queueing writers on a lock instead keeps the latency
+# distribution closer to SQL Server's lock waits.
+_write_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    row_ver INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_users_row_ver ON users(row_ver);
+-- NOCASE stands in for SQL Server's case-insensitive default collation
+CREATE INDEX IF NOT EXISTS ix_users_email ON users(email COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS ix_users_name ON users(name COLLATE NOCASE, id);
+CREATE TABLE IF NOT EXISTS users_deleted (
+    row_ver INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL,
+    deleted_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS users_deleted_horizon (pruned_through INTEGER NOT NULL);
+INSERT INTO users_deleted_horizon SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM users_deleted_horizon);
+-- Emulates SQL Server's database-wide rowversion counter
+CREATE TABLE IF NOT EXISTS rowversion_seq (v INTEGER NOT NULL);
+INSERT INTO rowversion_seq SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM rowversion_seq);
+CREATE TRIGGER IF NOT EXISTS users_row_ver_insert AFTER INSERT ON users BEGIN
+    UPDATE rowversion_seq SET v = v + 1;
+    UPDATE users SET row_ver = (SELECT v FROM rowversion_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS users_row_ver_update AFTER UPDATE OF name, email ON users BEGIN
+    UPDATE rowversion_seq SET v = v + 1;
+    UPDATE users SET row_ver = (SELECT v FROM rowversion_seq) WHERE id = NEW.id;
+END;
+CREATE TABLE IF NOT EXISTS logins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL
+);
+"""
+
+
+def configure(path=None, latency_ms=0.0):
+    """
+    Point the fake at a SQLite file (a temporary one by default) and set the
+    simulated round-trip latency. Creates the schema and the admin login.
+    """
+    with _init_lock:
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='fake-mssql-', suffix='.db')
+            os.close(fd)
+        _settings['path'] = path
+        _settings['latency'] = latency_ms / 1000.0
+        db = sqlite3.connect(path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        if db.execute("SELECT COUNT(1) FROM logins WHERE username = 'admin'").fetchone()[0] == 0:
+            db.execute("INSERT INTO logins(username, password) VALUES ('admin', 'admin')")
+        db.commit()
+        db.close()
+    return path
+
+
+def seed_users(count, batch=10000):
+    """Insert `count` generated users."""
+    db = sqlite3.connect(_settings['path'])
+    start = db.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+    for offset in range(0, count, batch):
+        n = min(batch, count - offset)
+        db.executemany(
+            'INSERT INTO users(name, email) VALUES (?, ?)',
+            ((f'User {i}', f'user{i}@example.com') for i in range(start + offset + 1, start + offset + n + 1)),
+        )
+    db.commit()
+    ids = db.execute('SELECT MIN(id), MAX(id) FROM users').fetchone()
+    db.close()
+    return ids
+
+
+def install():
+    """Register this module as `pyodbc` so `import pyodbc` in the app resolves to it."""
+    if _settings['path'] is None:
+        configure()
+    sys.modules['pyodbc'] = sys.modules[__name__]
+
+
+# --------------------------------------------------------------------------- #
+# Stored procedures
+# --------------------------------------------------------------------------- #
+PROCEDURES = {}
+
+
+def procedure(fn):
+    PROCEDURES[fn.__name__] = fn
+    return fn
+
+
+def _user_columns(fields, sort='id'):
+    # dbo.fn_user_columns
+    requested = {name.strip() for name in fields.split(',')} if fields is not None else {'name', 'email'}
+    columns = ['id'] + [name for name in ('name', 'email') if name in requested]
+    if sort != 'id' and sort not in columns:
+        columns.append(sort)
+    return ', '.join(columns)
+
+
+@procedure
+def sp_get_all_users(db, Fields=None):
+    return db.execute(f'SELECT {_user_columns(Fields)} FROM users')
+
+
+_VERSION_DESCRIPTION = (('version', None, None, None, None, None, None),)
+
+
+def _high_water(db):
+    # Writers are serialized by _write_lock, so the committed counter is the
+    # high-water mark (the equivalent of MIN_ACTIVE_ROWVERSION() - 1)
+    return db.execute('SELECT v FROM rowversion_seq').fetchone()[0]
+
+
+@procedure
+def sp_get_users_page(db, Limit, AfterId=None):
+    version = _high_water(db)
+    page = db.execute('SELECT id, name, email FROM users WHERE id > ? ORDER BY id LIMIT ?',
+                      (AfterId or 0, Limit))
+    return [(page.description, page.fetchall()), (_VERSION_DESCRIPTION, [(version,)])]
+
+
+def _like_prefix(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+@procedure
+def sp_search_users(db, Limit, Q=None, Email=None, NamePrefix=None, Sort='id', Descending=0,
+                    AfterKey=None, AfterId=None, Fields=None):
+    if Sort not in ('id', 'name', 'email'):
+        raise sqlite3.OperationalError('Invalid sort column')
+    version = _high_water(db)
+    op, direction = ('<', 'DESC') if Descending else ('>', 'ASC')
+    sql, params = [f'SELECT {_user_columns(Fields, Sort)} FROM users WHERE 1 = 1'], []
+    if Email is not None:
+        sql.append('AND email = ? COLLATE NOCASE')
+        params.append(Email)
+    if NamePrefix is not None:
+        sql.append("AND name LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(NamePrefix))
+    if Q is not None:
+        sql.append("AND (name LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\')")
+        params += [_like_prefix(Q)] * 2
+    if AfterId is not None:
+        if Sort == 'id':
+            sql.append(f'AND id {op} ?')
+            params.append(AfterId)
+        else:
+            sql.append(f'AND {Sort} COLLATE NOCASE {op}= ? AND ({Sort} COLLATE NOCASE {op} ? OR id {op} ?)')
+            params += [AfterKey, AfterKey, AfterId]
+    order = '' if Sort == 'id' else f'{Sort} COLLATE NOCASE {direction}, '
+    sql.append(f'ORDER BY {order}id {direction} LIMIT ?')
+    page = db.execute(' '.join(sql), params + [Limit])
+    return [(page.description, page.fetchall()), (_VERSION_DESCRIPTION, [(version,)])]
+
+
+@procedure
+def sp_get_users_version(db):
+    return [(_VERSION_DESCRIPTION, [(_high_water(db),)])]
+
+
+@procedure
+def sp_get_user_by_id(db, UserId, Fields=None):
+    return db.execute(f'SELECT {_user_columns(Fields)}, row_ver AS version FROM users WHERE id = ?', (UserId,))
+
+
+def _select_written(db, result):
+    # RETURNING reports row_ver as it was before the AFTER trigger stamped it
+    ids = [row[0] for row in result.fetchall()]
+    return db.execute('SELECT id, name, email, row_ver AS version FROM users WHERE id IN (%s) ORDER BY id'
+                      % ', '.join('?' * len(ids)), ids)
+
+
+@procedure
+def sp_create_user(db, Name, Email):
+    return _select_written(db, db.execute('INSERT INTO users(name, email) VALUES (?, ?) RETURNING id', (Name, Email)))
+
+
+@procedure
+def sp_create_users_bulk(db, Users):
+    db.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_output (RowNo INTEGER, id INTEGER, name TEXT, email TEXT)')
+    db.execute('DELETE FROM bulk_output')
+    for row_no, name, email in Users:
+        cur = db.execute('INSERT INTO users(name, email) VALUES (?, ?)', (name, email))
+        db.execute('INSERT INTO bulk_output VALUES (?, ?, ?, ?)', (row_no, cur.lastrowid, name, email))
+    return db.execute('SELECT RowNo, b.id, b.name, b.email, u.row_ver AS version '
+                      'FROM bulk_output b JOIN users u ON u.id = b.id')
+
+
+@procedure
+def sp_update_user(db, UserId, Name=None, Email=None, ExpectedVersion=None):
+    return _select_written(db, db.execute(
+        'UPDATE users SET name = COALESCE(?, name), email = COALESCE(?, email) '
+        'WHERE id = ? AND (? IS NULL OR row_ver = ?) RETURNING id',
+        (Name, Email, UserId, ExpectedVersion, ExpectedVersion),
+    ))
+
+
+@procedure
+def sp_delete_user(db, UserId, ExpectedVersion=None):
+    result = db.execute('DELETE FROM users WHERE id = ? AND (? IS NULL OR row_ver = ?) '
+                        'RETURNING id, name, email, row_ver AS version',
+                        (UserId, ExpectedVersion, ExpectedVersion))
+    rows = result.fetchall()
+    for row in rows:
+        db.execute('UPDATE rowversion_seq SET v = v + 1')
+        db.execute('INSERT INTO users_deleted(row_ver, id) SELECT v, ? FROM rowversion_seq', (row[0],))
+    return [(result.description, rows)]
+
+
+@procedure
+def sp_get_user_changes(db, Since=None, Limit=1000):
+    high_water = _high_water(db)
+    changes = db.execute(
+        'SELECT id, name, email, version, is_deleted FROM ('
+        '  SELECT id, name, email, row_ver AS version, 0 AS is_deleted FROM users'
+        '  WHERE row_ver > ? AND row_ver <= ?'
+        '  UNION ALL'
+        '  SELECT id, NULL, NULL, row_ver, 1 FROM users_deleted'
+        '  WHERE ? IS NOT NULL AND row_ver > ? AND row_ver <= ?'
+        ') ORDER BY version LIMIT ?',
+        (Since or 0, high_water, Since, Since or 0, high_water, Limit),
+    )
+    rows = changes.fetchall()
+    horizon = db.execute('SELECT ? AS high_water, pruned_through FROM users_deleted_horizon', (high_water,))
+    return [(changes.description, rows), (horizon.description, horizon.fetchall())]
+
+
+@procedure
+def sp_prune_user_tombstones(db, RetentionDays=30):
+    pruned = db.execute("DELETE FROM users_deleted WHERE deleted_at < datetime('now', ?) RETURNING row_ver",
+                        (f'{-RetentionDays} days',)).fetchall()
+    if pruned:
+        db.execute('UPDATE users_deleted_horizon SET pruned_through = ?', (max(row[0] for row in pruned),))
+    return [((('pruned', None, None, None, None, None, None),), [(len(pruned),)])]
+
+
+@procedure
+def sp_get_login(db, Username):
+    return db.execute('SELECT id, password FROM logins WHERE username = ?', (Username,))
+
+
+@procedure
+def sp_set_login_password(db, LoginId, Password, ExpectedPassword=None):
+    updated = db.execute('UPDATE logins SET password = ? WHERE id = ? AND (? IS NULL OR password = ?)',
+                         (Password, LoginId, ExpectedPassword, ExpectedPassword)).rowcount
+    return [((('updated', None, None, None, None, None, None),), [(updated,)])]
+
+
+# --------------------------------------------------------------------------- #
+# DB-API surface
+# --------------------------------------------------------------------------- #
+_EXEC_RE = re.compile(r'^\s*EXEC(?:UTE)?\s+(?:dbo\.)?(\w+)\s*(.*)$', re.IGNORECASE | re.DOTALL)
+_ARG_RE = re.compile(r'@(\w+)\s*=\s*\?')
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+        self._rows = []
+        self._sets = []
+        self._pos = 0
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (tuple, list)):
+            params = tuple(params[0])
+        self.connection._check()
+        if _settings['latency']:
+            time.sleep(_settings['latency'])
+        db = self.connection._db
+        try:
+            match = _EXEC_RE.match(sql)
+            if match:
+                if not match.group(1).startswith('sp_get_'):
+                    self.connection._begin_write()
+                fn = PROCEDURES.get(match.group(1))
+                if fn is None:
+                    raise ProgrammingError(f'Could not find stored procedure {match.group(1)!r}')
+                result = fn(db, **dict(zip(_ARG_RE.findall(match.group(2)), params)))
+            else:
+                if not sql.lstrip()[:6].upper() == 'SELECT':
+                    self.connection._begin_write()
+                result = db.execute(sql, params)
+        except sqlite3.IntegrityError as ex:
+            raise IntegrityError('23000', str(ex)) from ex
+        except sqlite3.Error as ex:
+            raise ProgrammingError('42000', str(ex)) from ex
+
+        # Materialize right away so SQLite statements never outlive the call.
+        # Procedures with several result sets return [(description, rows), ...].
+        if isinstance(result, list):
+            self._sets = result[1:]
+            self._load(*result[0])
+        else:
+            self._sets = []
+            description = result.description if result is not None else None
+            self._load(description, result.fetchall() if description else [])
+            if not description:
+                self.rowcount = result.rowcount if result else -1
+        return self
+
+    def _load(self, description, rows):
+        self.description = description
+        self._rows = rows
+        self.rowcount = len(rows) if description else -1
+        self._pos = 0
+
+    def executemany(self, sql, seq_of_params):
+        for params in seq_of_params:
+            self.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def nextset(self):
+        if not self._sets:
+            return False
+        self._load(*self._sets.pop(0))
+        return True
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._rows = []
+
+
+class Connection:
+    def __init__(self, autocommit=False):
+        self._db = sqlite3.connect(_settings['path'], timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA busy_timeout = 30000')
+        self.autocommit = autocommit
+        self.closed = False
+        self._writing = False
+
+    def _check(self):
+        if self.closed:
+            raise ProgrammingError('08003', 'Attempt to use a closed connection.')
+
+    def _begin_write(self):
+        if not self._writing:
+            _write_lock.acquire()
+            self._writing = True
+
+    def _end_write(self):
+        if self._writing:
+            self._writing = False
+            _write_lock.release()
+
+    def cursor(self):
+        self._check()
+        return Cursor(self)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._check()
+        try:
+            self._db.commit()
+        finally:
+            self._end_write()
+
+    def rollback(self):
+        self._check()
+        try:
+            self._db.rollback()
+        finally:
+            self._end_write()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._db.close()
+            self._end_write()
+
+
+def connect(connection_string='', timeout=0, autocommit=False, **kwargs):
+    if _settings['path'] is None:
+        configure()
+    if _settings['latency']:
+        time.sleep(_settings['latency'] * 3)  # login handshake costs a few round-trips
+    return Connection(autocommit=autocommit)
@@ -0,0 +1,282 @@
+"""
+HTTP load benchmark for the API against a local database stand-in.
+
+Boots create_app() on a threaded local HTTP server with benchmarks/fake_pyodbc
+standing in for SQL Server, seeds users, and drives every scenario from
+concurrent keep-alive clients. Throughput and p50/p95/p99 latency per scenario
+are printed and written as JSON, optionally compared with an earlier run.
+
+    python benchmarks/load_test.py --users 50000 --concurrency 16 --requests 2000
+    python benchmarks/load_test.py --latency-ms 1 --output after.json --compare before.json
+    python benchmarks/load_test.py --server asgi --concurrency 200 --latency-ms 20
+
+--server asgi serves the same app through asgi.py's adapter on uvicorn instead of
+Werkzeug's thread-per-connection server.
+"""
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+SCENARIOS = ('login', 'list', 'search', 'get', 'create', 'update', 'delete')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Client:
+    """One keep-alive HTTP connection."""
+
+    def __init__(self, port, token):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+
+    def request(self, method, path, body=None, auth=True):
+        headers = self.headers if auth else {'Content-Type': 'application/json'}
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            return 599
+
+
+def build_scenarios(id_range, delete_ids):
+    low, high = id_range
+
+    def login(client):
+        return client.request('POST', '/api/login', {'username': 'admin', 'password': 'admin'}, auth=False), 200
+
+    def list_users(client):
+        after = random.randint(low, high)
+        return client.request('GET', f'/api/users?limit=100&after_id={after}'), 200
+
+    def search_users(client):
+        prefix = f'User%20{random.randint(low, high)}'[:random.randint(9, 12)]
+        return client.request('GET', f'/api/users?name_prefix={prefix}&sort=name&limit=20'), 200
+
+    def get_user(client):
+        return client.request('GET', f'/api/users/{random.randint(low, high)}'), 200
+
+    def create_user(client):
+        n = random.randint(0, 10 ** 9)
+        return client.request('POST', '/api/users', {'name': f'Bench {n}', 'email': f'bench{n}@example.com'}), 201
+
+    def update_user(client):
+        n = random.randint(0, 10 ** 9)
+        return client.request('PUT', f'/api/users/{random.randint(low, high)}', {'name': f'Updated {n}'}), 200
+
+    def delete_user(client):
+        return client.request('DELETE', f'/api/users/{next(delete_ids)}'), 200
+
+    return {
+        'login': login,
+        'list': list_users,
+        'search': search_users,
+        'get': get_user,
+        'create': create_user,
+        'update': update_user,
+        'delete': delete_user,
+    }
+
+
+def run_scenario(name, fn, port, token, concurrency, total_requests, warmup):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        nonlocal failures
+        client = Client(port, token)
+        for _ in range(warmup):
+            fn(client)
+        local, bad = [], 0
+        while next(counter) < total_requests:
+            start = time.perf_counter()
+            status, expected = fn(client)
+            local.append(time.perf_counter() - start)
+            if status != expected:
+                bad += 1
+        with lock:
+            latencies.extend(local)
+            failures += bad
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+    return {
+        'requests': len(latencies),
+        'errors': failures,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+    }
+
+
+def serve_asgi(flask_app):
+    """Run the app behind app.helpers.asgi on uvicorn in a background thread."""
+    import uvicorn
+    from app.config import Config
+    from app.helpers.asgi import WSGIToASGI
+
+    # asyncio only sets TCP_NODELAY on connections when proto is explicit;
+    # without it keep-alive responses stall ~40 ms on delayed ACKs
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.bind(('127.0.0.1', 0))
+    config = uvicorn.Config(WSGIToASGI(flask_app, max_threads=Config.ASGI_THREADS),
+                            log_level='warning', access_log=False)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+    return sock.getsockname()[1], stop
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)['scenarios']
+    print(f"\nCompared with {baseline_path}:")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or not before.get('throughput_rps'):
+            continue
+        rps = (current['throughput_rps'] / before['throughput_rps'] - 1) * 100
+        p95 = (current['latency_ms']['p95'] / before['latency_ms']['p95'] - 1) * 100
+        print(f"  {name:<8} throughput {rps:+7.1f}%   p95 {p95:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000, help='users seeded before the run')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients per scenario')
+    parser.add_argument('--requests', type=int, default=1000, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per client')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated DB round-trip per statement')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset to run')
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi',
+                        help='threaded Werkzeug server or the ASGI adapter on uvicorn')
+    parser.add_argument('--db-path', help='SQLite file for the stand-in (temporary by default)')
+    parser.add_argument('--output', help='write results JSON here (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--verbose', action='store_true', help='keep slow-request/slow-query logging on')
+    args = parser.parse_args()
+
+    # Every client authenticates as "admin"; the per-subject rate limit would
+    # turn most of the run into 429s. Set RATE_LIMIT_BACKEND to measure it.
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'none')
+
+    import fake_pyodbc
+    fake_pyodbc.configure(args.db_path, args.latency_ms)
+    low, high = fake_pyodbc.seed_users(args.users)
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    # Rows reserved for the delete scenario so it never hits a 404
+    deletable = args.requests + args.concurrency * args.warmup if 'delete' in scenarios else 0
+    if deletable:
+        fake_pyodbc.seed_users(deletable)
+    delete_ids = itertools.count(high + 1)
+    fake_pyodbc.install()
+
+    import logging
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+    from app.helpers.auth import generate_jwt_token
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    if not args.verbose:
+        logging.getLogger('app.profiling').setLevel(logging.ERROR)  # slow logs would swamp the output
+    app = create_app()
+    if args.server == 'asgi':
+        port, stop = serve_asgi(app)
+    else:
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'  # keep-alive
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        port, stop = server.server_port, server.shutdown
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    token = generate_jwt_token('admin', expires_in=24 * 3600)
+
+    fns = build_scenarios((low, high), delete_ids)
+    results = {}
+    print(f"{'scenario':<8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in scenarios:
+        result = run_scenario(name, fns[name], port, token, args.concurrency, args.requests, args.warmup)
+        results[name] = result
+        lat = result['latency_ms']
+        print(f"{name:<8} {result['throughput_rps']:>9} {lat['p50']:>9} {lat['p95']:>9} {lat['p99']:>9} "
+              f"{result['errors']:>7}")
+    stop()
+
+    report = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'latency_ms': args.latency_ms,
+            'server': args.server,
+        },
+        'scenarios': results,
+    }
+    output = args.output or os.path.join(
+        HERE, 'results', datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
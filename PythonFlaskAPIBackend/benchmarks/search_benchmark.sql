@@ -0,0 +1,79 @@
+/*
+    Search benchmark for GET /api/users filters, against SQL Server.
+
+    Seeds dbo.users up to one million rows, then runs each search shape of
+    dbo.sp_search_users next to the query it replaces, with I/O statistics
+    and the actual plan operators. Run it in SSMS or sqlcmd against a
+    scratch copy of the database (it inserts rows and never removes them):
+
+        sqlcmd -S localhost -d flask_demo_bench -i benchmarks/search_benchmark.sql
+
+    What to look for in the output:
+      * "Table 'users'. Scan count ..., logical reads ..." per statement:
+        the searches read a handful of pages, the baselines read the table.
+      * STATISTICS PROFILE rows: PhysicalOp "Index Seek" on IX_users_name or
+        IX_users_email for the searches; "Clustered Index Scan" (or "Index
+        Scan") for the baselines.
+*/
+SET NOCOUNT ON;
+
+-- ---------------------------------------------------------------------------
+-- Seed
+-- ---------------------------------------------------------------------------
+DECLARE @Target INT = 1000000;
+DECLARE @Have INT = (SELECT COUNT(*) FROM dbo.users);
+
+IF @Have < @Target
+BEGIN
+    ;WITH n AS (
+        SELECT TOP (@Target - @Have) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) + @Have AS i
+        FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+    )
+    INSERT INTO dbo.users (name, email)
+    SELECT CONCAT(N'User ', i), CONCAT(N'user', i, N'@example.com')
+    FROM n;
+END
+
+UPDATE STATISTICS dbo.users WITH FULLSCAN;
+SELECT COUNT(*) AS users FROM dbo.users;
+
+-- ---------------------------------------------------------------------------
+-- Searches (dbo.sp_search_users, as called by GET /api/users)
+-- ---------------------------------------------------------------------------
+SET STATISTICS IO ON;
+SET STATISTICS TIME ON;
+SET STATISTICS PROFILE ON;
+
+PRINT '--- email = (seek on IX_users_email)';
+EXEC dbo.sp_search_users @Limit = 101, @Email = N'user654321@example.com';
+
+PRINT '--- name_prefix, sort=name (seek on IX_users_name, ordered, no sort operator)';
+EXEC dbo.sp_search_users @Limit = 101, @NamePrefix = N'User 65432', @Sort = N'name';
+
+PRINT '--- name_prefix, sort=name, second page (seek from the keyset position)';
+EXEC dbo.sp_search_users @Limit = 101, @NamePrefix = N'User 6', @Sort = N'name',
+    @AfterKey = N'User 654321', @AfterId = 654321;
+
+PRINT '--- q (name or email prefix: two seeks combined)';
+EXEC dbo.sp_search_users @Limit = 101, @Q = N'user65432';
+
+PRINT '--- sort=-email, no filter (ordered scan of IX_users_email, stops after TOP)';
+EXEC dbo.sp_search_users @Limit = 101, @Sort = N'email', @Descending = 1;
+
+-- ---------------------------------------------------------------------------
+-- Baselines: what the searches replace
+-- ---------------------------------------------------------------------------
+PRINT '--- baseline: sp_get_all_users (the Angular app filtered this on the client)';
+CREATE TABLE #all_users (id INT, name NVARCHAR(100), email NVARCHAR(120));
+INSERT INTO #all_users EXEC dbo.sp_get_all_users;  -- kept out of the output
+DROP TABLE #all_users;
+
+PRINT '--- baseline: infix match, not sargable (scan)';
+SELECT TOP (101) id, name, email FROM dbo.users WHERE name LIKE N'%65432%' ORDER BY name, id;
+
+PRINT '--- baseline: function on the column, not sargable (scan)';
+SELECT TOP (101) id, name, email FROM dbo.users WHERE LOWER(email) = N'user654321@example.com';
+
+SET STATISTICS PROFILE OFF;
+SET STATISTICS TIME OFF;
+SET STATISTICS IO OFF;
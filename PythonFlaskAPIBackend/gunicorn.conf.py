@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+# Pre-fork production server: gunicorn -c gunicorn.conf.py wsgi:app
+# Every setting comes from app.config (environment / .env); see README.
+from app.config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+# Threads per worker share that worker's connection pool and cache
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
+keepalive = Config.WEB_KEEPALIVE
+timeout = Config.WEB_TIMEOUT
+# Time in-flight requests get to finish on SIGTERM / SIGHUP before workers are killed
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+# Recycle workers periodically; the jitter keeps them from restarting together
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS_JITTER
+# Import and build the app once in the master so workers fork ready to serve
+preload_app = Config.WEB_PRELOAD
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    from app.helpers.worker import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    from app.helpers.worker import shutdown_worker
+    shutdown_worker()
@@ -0,0 +1,15 @@
+import os
+
+# Every test authenticates as "admin"; keep the per-subject rate limit out of
+# the way (tests/test_admission.py exercises it explicitly)
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'none')
+# Keep published events in process instead of a shared file in the temp dir
+os.environ.setdefault('EVENTS_BACKEND', 'memory')
+# Revoked tokens in process rather than in a shared file in the temp dir
+os.environ.setdefault('AUTH_REVOCATION_BACKEND', 'memory')
+# Hashing with production cost would make every login take a noticeable time
+os.environ.setdefault('PASSWORD_PBKDF2_ITERATIONS', '1000')
+# One process: the in-process user cache needs no cross-worker invalidation
+os.environ.setdefault('WEB_WORKERS', '1')
+# /metrics of this process only, not a shared file in the temp dir
+os.environ.setdefault('METRICS_BACKEND', 'memory')
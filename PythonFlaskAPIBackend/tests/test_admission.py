@@ -0,0 +1,111 @@
+import os
+import threading
+import pytest
+from app import create_app
+from app.helpers import admission, rate_limit
+from app.helpers.admission import ConcurrencyLimiter, Overloaded
+from app.helpers.auth import generate_jwt_token
+from app.helpers.rate_limit import MemoryBucketStore, SQLiteBucketStore
+
+
+class TestConcurrencyLimiter:
+    """Test slots, the bounded wait queue and its deadline."""
+
+    def test_rejects_when_queue_is_full(self):
+        limiter = ConcurrencyLimiter('read', limit=1, max_queue=0)
+        limiter.acquire()
+        with pytest.raises(Overloaded):
+            limiter.acquire()
+        limiter.release()
+        limiter.acquire()
+        assert limiter.stats()['rejected_full'] == 1
+
+    def test_queued_request_times_out(self):
+        limiter = ConcurrencyLimiter('write', limit=1, max_queue=1, queue_timeout=0.05)
+        limiter.acquire()
+        with pytest.raises(Overloaded) as exc:
+            limiter.acquire()
+        assert exc.value.retry_after == 1
+        assert limiter.stats()['rejected_timeout'] == 1
+
+    def test_queued_request_gets_released_slot(self):
+        limiter = ConcurrencyLimiter('read', limit=1, max_queue=1, queue_timeout=5)
+        limiter.acquire()
+        admitted = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            admitted.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        assert not admitted.wait(0.05)
+        limiter.release()
+        assert admitted.wait(1)
+        thread.join()
+        assert limiter.stats()['active'] == 1
+
+
+class TestBucketStores:
+    """Test token-bucket accounting in both stores."""
+
+    def test_memory_bucket_refills(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(rate_limit.time, 'time', lambda: now[0])
+        store = MemoryBucketStore(rate=1, burst=2)
+        assert store.take('alice') == 0
+        assert store.take('alice') == 0
+        assert store.take('alice') == pytest.approx(1.0)
+        assert store.take('bob') == 0  # buckets are per subject
+        now[0] += 1
+        assert store.take('alice') == 0
+
+    def test_sqlite_buckets_are_shared_between_stores(self, tmp_path):
+        path = str(tmp_path / 'buckets.db')
+        worker_a = SQLiteBucketStore(path, rate=0.001, burst=2)
+        worker_b = SQLiteBucketStore(path, rate=0.001, burst=2)
+        assert worker_a.take('alice') == 0
+        assert worker_b.take('alice') == 0
+        assert worker_a.take('alice') > 0
+        assert worker_b.stats()['limited'] == 0
+        assert worker_a.stats()['limited'] == 1
+
+
+class TestAdmissionRoutes:
+    """Test the 503 and 429 responses of the protected blueprint."""
+
+    @pytest.fixture
+    def client(self):
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    @pytest.fixture
+    def auth(self):
+        return {'Authorization': f"Bearer {generate_jwt_token('admin')}"}
+
+    def test_full_read_class_is_shed_with_503(self, client, auth, monkeypatch):
+        limiter = ConcurrencyLimiter('read', limit=1, max_queue=0)
+        monkeypatch.setitem(admission._limiters, 'read', limiter)
+        limiter.acquire()  # another request holds the only slot
+        response = client.get('/api/users', headers=auth)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        limiter.release()
+        assert client.get('/api/users', headers=auth).status_code == 200
+        assert limiter.stats()['active'] == 0
+
+    def test_health_bypasses_admission(self, client, monkeypatch):
+        limiter = ConcurrencyLimiter('read', limit=1, max_queue=0)
+        monkeypatch.setitem(admission._limiters, 'read', limiter)
+        limiter.acquire()
+        assert 'admission' in client.get('/api/health').get_json()  # reached the view
+
+    def test_subject_over_rate_gets_429(self, client, auth, monkeypatch):
+        monkeypatch.setattr(rate_limit, '_store', MemoryBucketStore(rate=0.001, burst=1))
+        monkeypatch.setattr(rate_limit, '_store_pid', os.getpid())
+        assert client.get('/api/users', headers=auth).status_code == 200
+        response = client.get('/api/users', headers=auth)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
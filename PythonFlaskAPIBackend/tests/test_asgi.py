@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from app.helpers.asgi import WSGIToASGI
+
+
+def receiver(body=b'', disconnect_after=None):
+    """ASGI receive(): the body, then http.disconnect after `disconnect_after` seconds (or never)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {'type': 'http.disconnect'}
+    return receive
+
+
+def run_asgi(app, method='GET', path='/', body=b'', headers=(), disconnect_after=None):
+    """Drive one HTTP request through an ASGI app and collect what it sends."""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'path': path,
+        'query_string': b'a=1', 'headers': list(headers), 'server': ('testserver', 80),
+    }
+    sent = []
+    receive = receiver(body, disconnect_after)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+class TestWSGIToASGI:
+    """Test the adapter that serves the Flask app from an ASGI server."""
+
+    def test_request_and_response_are_translated(self):
+        seen = {}
+
+        def wsgi_app(environ, start_response):
+            seen.update(environ)
+            seen['body'] = environ['wsgi.input'].read()
+            start_response('201 Created', [('Content-Type', 'text/plain'), ('X-Test', 'yes')])
+            return [b'he', b'', b'llo']
+
+        sent = run_asgi(WSGIToASGI(wsgi_app, max_threads=2), 'POST', '/api/users', b'{"a":1}',
+                        [(b'content-type', b'application/json'), (b'x-forwarded-for', b'1.2.3.4')])
+        assert seen['REQUEST_METHOD'] == 'POST'
+        assert seen['PATH_INFO'] == '/api/users'
+        assert seen['QUERY_STRING'] == 'a=1'
+        assert seen['CONTENT_TYPE'] == 'application/json'
+        assert seen['HTTP_X_FORWARDED_FOR'] == '1.2.3.4'
+        assert seen['body'] == b'{"a":1}'
+        assert sent[0]['status'] == 201
+        assert (b'x-test', b'yes') in sent[0]['headers']
+        assert [m['body'] for m in sent[1:]] == [b'he', b'llo']
+        assert sent[-1]['more_body'] is False
+
+    def test_requests_run_off_the_event_loop_in_parallel(self):
+        threads = set()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def wsgi_app(environ, start_response):
+            threads.add(threading.get_ident())
+            barrier.wait()  # deadlocks unless three requests run at once
+            start_response('200 OK', [])
+            return [b'ok']
+
+        app = WSGIToASGI(wsgi_app, max_threads=3)
+
+        async def many():
+            async def noop(message):
+                pass
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': []}
+            await asyncio.gather(*(app(scope, receiver(), noop) for _ in range(3)))
+
+        asyncio.run(many())
+        assert len(threads) == 3
+        assert threading.get_ident() not in threads
+
+    def test_disconnect_closes_the_streamed_body(self):
+        closed = threading.Event()
+
+        def wsgi_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+            def events():
+                try:
+                    for _ in range(100):
+                        yield b': keep-alive\n\n'
+                        time.sleep(0.02)
+                finally:
+                    closed.set()
+            return events()
+
+        start = time.perf_counter()
+        sent = run_asgi(WSGIToASGI(wsgi_app, max_threads=1), disconnect_after=0.1)
+        assert closed.is_set()
+        assert time.perf_counter() - start < 1.0  # not the full 2 s stream
+        assert len(sent) < 20
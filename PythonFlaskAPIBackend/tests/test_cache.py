@@ -0,0 +1,79 @@
+import os
+import time
+from app.config import Config
+from app.helpers import cache as cache_module, events
+from app.helpers.cache import LRUCache, NullCache, MISSING, build_cache
+from app.helpers.events import EventHub, MemoryChannel, SQLiteChannel
+
+
+class TestLRUCache:
+    """Test size bound, TTL and counters of the in-process cache."""
+
+    def test_get_set_and_counters(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        assert cache.get('a') is MISSING
+        cache.set('a', {'id': 1})
+        assert cache.get('a') == {'id': 1}
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # 'b' is now least recently used
+        cache.set('c', 3)
+        assert cache.get('b') is MISSING
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_entries_expire(self):
+        cache = LRUCache(maxsize=2, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        assert cache.get('a') is MISSING
+        assert cache.stats()['expirations'] == 1
+
+    def test_delete_invalidates(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.delete('a')
+        assert cache.get('a') is MISSING
+        assert cache.stats()['invalidations'] == 1
+
+    def test_build_cache_disabled(self):
+        assert isinstance(build_cache('none', 100, 10), NullCache)
+        assert isinstance(build_cache('memory', 100, 10), LRUCache)
+
+
+class TestUserCacheAcrossWorkers:
+    """Test that writes announced by other workers reach each worker's in-process cache."""
+
+    def test_events_from_other_workers_invalidate(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'events.db')
+        writer, reader = EventHub(SQLiteChannel(path, poll_interval=0.01)), EventHub(SQLiteChannel(path))
+        cache = LRUCache(maxsize=10, ttl=60)
+        monkeypatch.setattr(cache_module, '_user_cache', cache)
+        monkeypatch.setattr(cache_module, '_user_cache_pid', os.getpid())
+        for user_id in (1, 2, 3):
+            cache.set(f'user:{user_id}', {'id': user_id, 'version': 1})
+        reader.add_listener(cache_module._invalidate_from_events)
+
+        writer.publish('user.updated', [{'id': 1, 'version': 2}])
+        writer.publish('user.deleted', [{'id': 2}])
+        writer.publish('user.updated', [{'id': 3, 'version': 1}])  # the copy this worker already has
+        deadline = time.monotonic() + 5
+        while cache.peek('user:2') is not MISSING and time.monotonic() < deadline:
+            time.sleep(0.01)
+        reader.stop()
+        assert cache.peek('user:1') is MISSING
+        assert cache.peek('user:2') is MISSING
+        assert cache.peek('user:3') == {'id': 3, 'version': 1}
+
+    def test_memory_cache_needs_a_shared_channel_with_several_workers(self, monkeypatch):
+        monkeypatch.setattr(events, 'get_event_hub', lambda: EventHub(MemoryChannel()))
+        monkeypatch.setattr(Config, 'WEB_WORKERS', 4)
+        assert isinstance(cache_module._follow_other_workers(LRUCache()), NullCache)
+        monkeypatch.setattr(Config, 'WEB_WORKERS', 1)
+        assert isinstance(cache_module._follow_other_workers(LRUCache()), LRUCache)
@@ -0,0 +1,141 @@
+import os
+import pytest
+import pyodbc
+from app import create_app
+from app.helpers import db_connection, health
+from app.helpers.auth import generate_jwt_token
+from app.helpers.circuit_breaker import CircuitBreaker, DatabaseUnavailable
+from app.helpers.db_connection import retry_read
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestCircuitBreaker:
+    """Test the closed -> open -> half-open -> closed cycle."""
+
+    def test_opens_after_consecutive_failures(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()  # resets the run
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        with pytest.raises(DatabaseUnavailable) as exc:
+            breaker.allow()
+        assert exc.value.retry_after == 10
+        assert breaker.stats()['rejections'] == 1
+
+    def test_half_open_lets_one_probe_through(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.state == 'half_open'
+        breaker.allow()  # the probe
+        with pytest.raises(DatabaseUnavailable):
+            breaker.allow()
+        breaker.record_success()
+        assert breaker.state == 'closed'
+        breaker.allow()
+
+    def test_failed_probe_reopens(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        assert breaker.stats()['times_opened'] == 2
+        clock.now += 4
+        assert breaker.retry_after() == 6
+
+
+class TestRetryRead:
+    """Test which errors the read retry decorator retries."""
+
+    @pytest.fixture(autouse=True)
+    def fast_backoff(self, monkeypatch):
+        monkeypatch.setattr(db_connection.Config, 'DB_READ_RETRIES', 2)
+        monkeypatch.setattr(db_connection.Config, 'DB_RETRY_BACKOFF_BASE', 0)
+
+    def test_transient_errors_are_retried(self):
+        calls = []
+
+        @retry_read
+        def read():
+            calls.append(1)
+            if len(calls) < 3:
+                raise pyodbc.OperationalError('08S01', 'Communication link failure')
+            return 'ok'
+
+        assert read() == 'ok'
+        assert len(calls) == 3
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        @retry_read
+        def read():
+            calls.append(1)
+            raise pyodbc.OperationalError('08S01', 'Communication link failure')
+
+        with pytest.raises(pyodbc.OperationalError):
+            read()
+        assert len(calls) == 3
+
+    @pytest.mark.parametrize('error', [ValueError('bug'), DatabaseUnavailable(5)])
+    def test_other_errors_are_not_retried(self, error):
+        calls = []
+
+        @retry_read
+        def read():
+            calls.append(1)
+            raise error
+
+        with pytest.raises(type(error)):
+            read()
+        assert len(calls) == 1
+
+
+class TestBreakerRoutes:
+    """Test that an open breaker fails requests fast with 503 and Retry-After."""
+
+    @pytest.fixture
+    def client(self, monkeypatch, clock):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        monkeypatch.setattr(db_connection, '_breaker', breaker)
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_reads_are_rejected_with_retry_after(self, client):
+        token = generate_jwt_token('admin')
+        response = client.get('/api/users/987654', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '30'
+
+    def test_health_reports_breaker_state(self, client, monkeypatch):
+        monitor = health.HealthMonitor(health.probe_database)
+        monkeypatch.setattr(health, '_monitor', monitor)
+        monkeypatch.setattr(health, '_monitor_pid', os.getpid())
+        monitor.check_now()
+        response = client.get('/api/health')
+        assert response.status_code == 503
+        data = response.get_json()
+        assert data['db']['status'] == 'unavailable'
+        assert data['breaker']['state'] == 'open'
@@ -0,0 +1,106 @@
+import gzip
+import json
+import zlib
+import pytest
+from flask import Flask, Response, jsonify, request
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+from app.helpers import compression
+from app.helpers.conditional import expected_version, not_modified
+
+BIG = [{'id': i, 'name': f'User {i}', 'email': f'user{i}@example.com'} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    compression.reset_compression_cache()
+    app = Flask(__name__)
+
+    @app.route('/big', methods=['GET', 'PUT'])
+    def big():
+        if request.method == 'PUT':
+            return jsonify({'expected': expected_version()})
+        cached = not_modified('v42')
+        if cached is not None:
+            return cached
+        response = jsonify(BIG)
+        response.set_etag('v42')
+        return response
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(user) + '\n' for user in BIG), mimetype='application/x-ndjson')
+
+    @app.route('/raw')
+    def raw():
+        return Response(b'\x00' * 4096, mimetype='application/octet-stream')
+
+    compression.init_app(app)
+    return app.test_client()
+
+
+def accept(value):
+    return parse_accept_header(value, Accept)
+
+
+class TestCompression:
+    """Test Accept-Encoding negotiation, the size threshold, streaming and the compressed body cache."""
+
+    def test_negotiate(self, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', object())
+        assert compression.negotiate(accept('gzip, deflate, br')) == 'br'
+        assert compression.negotiate(accept('br;q=0.5, gzip')) == 'gzip'
+        assert compression.negotiate(accept('identity')) is None
+        monkeypatch.setattr(compression, 'brotli', None)
+        assert compression.negotiate(accept('br, gzip')) == 'gzip'
+        assert compression.negotiate(accept('br')) is None
+
+    def test_gzip_above_threshold_only(self, client):
+        response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.headers['ETag'] == '"v42-gzip"'
+        assert json.loads(gzip.decompress(response.data)) == BIG
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+        assert 'Content-Encoding' not in client.get('/big').headers
+        assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/raw', headers={'Accept-Encoding': 'gzip'}).headers
+
+    def test_each_coding_has_its_own_etag(self, client):
+        assert client.get('/big').headers['ETag'] == '"v42"'
+        gzipped = client.get('/big', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        assert gzipped == '"v42-gzip"'
+
+        # Preconditions compare the version underneath the coded ETag
+        response = client.get('/big', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped})
+        assert response.status_code == 304 and response.headers['ETag'] == gzipped
+        assert client.get('/big', headers={'If-None-Match': '"v41-gzip"'}).status_code == 200
+        assert client.put('/big', headers={'If-Match': gzipped}).get_json() == {'expected': 42}
+
+    def test_repeat_requests_use_the_cache(self, client):
+        first = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        second = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        assert second.data == first.data
+        stats = compression.get_compression_cache().stats()
+        assert (stats['hits'], stats['size']) == (1, 1)
+        # Same version, different URL: a separate entry
+        client.get('/big?page=2', headers={'Accept-Encoding': 'gzip'})
+        assert compression.get_compression_cache().stats()['size'] == 2
+
+    def test_streamed_body_is_compressed_per_chunk(self, client):
+        response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert [json.loads(line) for line in lines] == BIG
+
+    def test_each_streamed_chunk_is_decodable_on_arrival(self):
+        chunks = compression._compress_stream(iter([b'{"id": 1}\n', b'{"id": 2}\n']), 'gzip', 6)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        assert decoder.decompress(next(chunks)) == b'{"id": 1}\n'
+        assert decoder.decompress(next(chunks)) == b'{"id": 2}\n'
@@ -0,0 +1,24 @@
+from app.helpers.db_connection import compile_row_mapper, rows_to_dicts
+
+
+class FakeCursor:
+    def __init__(self, *names):
+        self.description = [(name, None, None, None, None, None, True) for name in names]
+
+
+class TestRowMapping:
+    """Test the cached per-layout row mappers."""
+
+    def test_rows_to_dicts(self):
+        cursor = FakeCursor('id', 'name')
+        assert rows_to_dicts(cursor, [(1, 'Sam'), (2, 'Jo')]) == [
+            {'id': 1, 'name': 'Sam'},
+            {'id': 2, 'name': 'Jo'},
+        ]
+
+    def test_quoted_column_names(self):
+        columns = ("it's", 'say "hi"', "x'] or __import__('os') or ['")
+        assert compile_row_mapper(columns)((1, 2, 3)) == dict(zip(columns, (1, 2, 3)))
+
+    def test_mapper_is_cached_per_layout(self):
+        assert compile_row_mapper(('id',)) is compile_row_mapper(('id',))
@@ -0,0 +1,150 @@
+import threading
+import time
+import pytest
+from app.helpers.db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *params):
+        if self.conn.broken:
+            raise RuntimeError('connection is dead')
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def make_pool(opened):
+    def factory(**kwargs):
+        def connect():
+            conn = FakeConnection()
+            opened.append(conn)
+            return conn
+        return ConnectionPool(connect, **kwargs)
+    return factory
+
+
+class TestConnectionPool:
+    """Test checkout, reuse and eviction in ConnectionPool."""
+
+    def test_connection_is_reused(self, make_pool, opened):
+        pool = make_pool(max_size=2)
+        with pool.acquire() as conn:
+            first = conn.raw
+        with pool.acquire() as conn:
+            assert conn.raw is first
+        assert len(opened) == 1
+        assert pool.stats()['checkouts'] == 2
+
+    def test_close_returns_to_pool(self, make_pool):
+        pool = make_pool(max_size=1)
+        conn = pool.acquire()
+        conn.close()
+        conn.close()  # second close is a no-op
+        stats = pool.stats()
+        assert stats['idle'] == 1
+        assert stats['in_use'] == 0
+
+    def test_uncommitted_work_is_rolled_back(self, make_pool):
+        pool = make_pool(max_size=1)
+        with pool.acquire() as conn:
+            conn.cursor().execute('UPDATE users SET name = ?', ('x',))
+            raw = conn.raw
+        assert raw.rollbacks == 1
+
+    def test_checkout_times_out_when_exhausted(self, make_pool):
+        pool = make_pool(max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        held.close()
+        assert pool.stats()['timeouts'] == 1
+
+    def test_waiter_gets_released_connection(self, make_pool):
+        pool = make_pool(max_size=1, timeout=2)
+        held = pool.acquire()
+        got = []
+        t = threading.Thread(target=lambda: got.append(pool.acquire()))
+        t.start()
+        time.sleep(0.05)
+        held.close()
+        t.join(1)
+        assert got and got[0].raw is held.raw
+
+    def test_idle_connections_are_evicted(self, make_pool, opened):
+        pool = make_pool(max_size=2, idle_timeout=0.01)
+        pool.acquire().close()
+        time.sleep(0.03)
+        pool.prune()
+        assert opened[0].closed
+        assert pool.stats()['size'] == 0
+
+    def test_dead_connection_is_replaced_on_checkout(self, make_pool, opened):
+        pool = make_pool(max_size=1, validate_after=0)
+        pool.acquire().close()
+        opened[0].broken = True
+        with pool.acquire() as conn:
+            assert conn.raw is opened[1]
+        assert pool.stats()['validation_failures'] == 1
+
+    def test_fill_opens_min_size(self, make_pool, opened):
+        pool = make_pool(min_size=2, max_size=4)
+        pool.fill()
+        assert len(opened) == 2
+        assert pool.stats()['idle'] == 2
+
+
+class TestWorkerLifecycle:
+    """Test the per-worker hooks that gunicorn.conf.py runs after fork and on exit."""
+
+    def test_init_worker_drops_inherited_pool_without_closing_it(self, monkeypatch):
+        from app.helpers import db_connection, worker
+        inherited = ConnectionPool(FakeConnection, min_size=1)
+        inherited.fill()
+        raw = inherited._idle[0].raw
+        inherited.pid = -1  # as if created in the master before fork
+        monkeypatch.setattr(db_connection, '_pool', inherited)
+        worker.init_worker()
+        assert db_connection._pool is None
+        assert not raw.closed  # the socket still belongs to the master
+
+    def test_shutdown_worker_closes_own_pool(self, monkeypatch):
+        from app.helpers import db_connection, worker
+        pool = ConnectionPool(FakeConnection, min_size=1)
+        pool.fill()
+        raw = pool._idle[0].raw
+        monkeypatch.setattr(db_connection, '_pool', pool)
+        worker.shutdown_worker()
+        assert db_connection._pool is None
+        assert raw.closed
@@ -0,0 +1,123 @@
+import os
+import time
+import pytest
+from app import create_app
+from app.helpers import events
+from app.helpers.admission import Overloaded
+from app.helpers.auth import generate_jwt_token
+from app.helpers.events import EventHub, MemoryChannel, SQLiteChannel
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+class TestChannels:
+    """Test event numbering, replay and the shared SQLite channel."""
+
+    def test_memory_replay_and_gap(self):
+        channel = MemoryChannel(history=3)
+        channel.publish([('user.created', '{"id": %d}' % i) for i in range(5)])
+        assert [e.id for e in channel.read(3)] == [4, 5]
+        assert channel.read(5) == []
+        assert channel.read(1) is None  # events 1-2 fell out of the history
+        assert channel.read(9) is None  # an id this channel never issued
+
+    def test_sqlite_channel_is_shared(self, tmp_path):
+        path = str(tmp_path / 'events.db')
+        writer, reader = SQLiteChannel(path), SQLiteChannel(path)
+        writer.publish([('user.updated', '{"id": 1}'), ('user.deleted', '{"id": 2}')])
+        assert [(e.id, e.type) for e in reader.read(0)] == [(1, 'user.updated'), (2, 'user.deleted')]
+        assert reader.last_id() == 2
+        assert reader.read(2) == [] and reader.read(7) is None
+
+
+class TestEventHub:
+    """Test fan-out, dropping slow subscribers and the subscriber cap."""
+
+    def test_delivers_to_subscribers(self):
+        hub = EventHub(MemoryChannel(), max_queue=10)
+        subscription = hub.subscribe()
+        hub.publish('user.created', [{'id': 1}])
+        event = subscription.get(timeout=2)
+        assert (event.type, event.data) == ('user.created', '{"id": 1}')
+        hub.stop()
+
+    def test_slow_subscriber_is_dropped(self):
+        hub = EventHub(MemoryChannel(), max_queue=2)
+        slow, fast = hub.subscribe(), hub.subscribe()
+        hub.publish('user.created', [{'id': i} for i in range(3)])
+        wait_for(lambda: slow.dropped)
+        assert fast.dropped  # both queues overflowed on the same batch
+        assert hub.stats()['subscribers'] == 0
+        hub.stop()
+
+    def test_unknown_last_event_id_resyncs_then_streams(self):
+        hub = EventHub(MemoryChannel(), max_queue=10)
+        subscription = hub.subscribe()
+        hub.publish('user.created', [{'id': 1}])
+        body = ''.join(events.stream_events(hub, subscription, last_event_id=99, heartbeat=0.05, max_seconds=0.3))
+        assert body.index('event: resync') < body.index('id: 1\n')
+        hub.stop()
+
+    def test_subscriber_cap(self):
+        hub = EventHub(MemoryChannel(), max_subscribers=1)
+        subscription = hub.subscribe()
+        with pytest.raises(Overloaded):
+            hub.subscribe()
+        hub.unsubscribe(subscription)
+        hub.subscribe()
+        hub.stop()
+
+
+class TestStreamRoute:
+    """Test GET /api/users/stream end to end."""
+
+    @pytest.fixture
+    def hub(self, monkeypatch):
+        hub = EventHub(MemoryChannel(), max_queue=16)
+        monkeypatch.setattr(events, '_hub', hub)
+        monkeypatch.setattr(events, '_hub_pid', os.getpid())
+        monkeypatch.setattr(events.Config, 'EVENTS_MAX_STREAM_SECONDS', 0.2)
+        yield hub
+        hub.stop()
+
+    @pytest.fixture
+    def client(self, hub):
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    @pytest.fixture
+    def headers(self):
+        return {'Authorization': f"Bearer {generate_jwt_token('admin')}"}
+
+    def test_requires_token(self, client):
+        assert client.get('/api/users/stream').status_code == 401
+
+    def test_replays_after_last_event_id(self, client, hub, headers):
+        created = client.post('/api/users', json={'name': 'Ev', 'email': 'ev@example.com'},
+                              headers=headers).get_json()
+        client.delete(f"/api/users/{created['id']}", headers=headers)
+
+        response = client.get('/api/users/stream', headers={**headers, 'Last-Event-ID': '1'})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        assert 'event: user.deleted' in body
+        assert 'id: 2\n' in body and 'id: 1\n' not in body
+        assert hub.stats()['subscribers'] == 0
+
+    def test_resync_when_history_is_gone(self, client, hub, headers, monkeypatch):
+        monkeypatch.setattr(hub, 'channel', MemoryChannel(history=1))
+        hub.channel.publish([('user.created', '{}'), ('user.created', '{}')])
+        body = client.get('/api/users/stream', headers={**headers, 'Last-Event-ID': '0'}).get_data(as_text=True)
+        assert 'event: resync' in body
+
+    def test_invalid_last_event_id(self, client, headers):
+        response = client.get('/api/users/stream', headers={**headers, 'Last-Event-ID': 'abc'})
+        assert response.status_code == 400
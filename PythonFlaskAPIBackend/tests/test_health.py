@@ -0,0 +1,97 @@
+import os
+import time
+import pytest
+from app import create_app
+from app.helpers import health
+from app.helpers.health import HealthMonitor
+
+
+class TestHealthMonitor:
+    """Test that probe outcomes are recorded and go stale."""
+
+    def test_records_success_and_failure(self):
+        outcome = {'fail': False}
+
+        def probe():
+            if outcome['fail']:
+                raise RuntimeError('login timeout')
+
+        monitor = HealthMonitor(probe, interval=60, stale_after=60)
+        assert monitor.snapshot()['ready'] is False  # nothing probed yet
+        monitor.check_now()
+        state = monitor.snapshot()
+        assert state['status'] == 'ok'
+        assert state['ready'] is True
+        assert state['latency_ms'] >= 0
+
+        outcome['fail'] = True
+        monitor.check_now()
+        monitor.check_now()
+        state = monitor.snapshot()
+        assert state['status'] == 'error'
+        assert state['ready'] is False
+        assert state['consecutive_failures'] == 2
+        assert 'login timeout' in state['last_error']
+
+    def test_old_result_is_stale(self):
+        monitor = HealthMonitor(lambda: None, interval=60, stale_after=0.01)
+        monitor.check_now()
+        time.sleep(0.02)
+        assert monitor.snapshot()['stale'] is True
+        assert monitor.snapshot()['ready'] is False
+
+    def test_background_thread_probes(self):
+        calls = []
+        monitor = HealthMonitor(lambda: calls.append(1), interval=0.01).start()
+        time.sleep(0.1)
+        monitor.stop()
+        assert len(calls) >= 2
+
+
+class TestHealthEndpoints:
+    """Test /livez, /readyz and the detailed /api/health view."""
+
+    @pytest.fixture
+    def client(self):
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    @pytest.fixture
+    def monitor(self, monkeypatch):
+        state = {'fail': False}
+
+        def probe():
+            if state['fail']:
+                raise RuntimeError('db down')
+
+        monitor = HealthMonitor(probe, interval=60, stale_after=60)
+        monitor.state = state
+        monkeypatch.setattr(health, '_monitor', monitor)
+        monkeypatch.setattr(health, '_monitor_pid', os.getpid())
+        return monitor
+
+    def test_livez_has_no_dependencies(self, client, monitor):
+        monitor.state['fail'] = True
+        monitor.check_now()
+        assert client.get('/livez').status_code == 200
+
+    def test_readyz_follows_cached_probe(self, client, monitor):
+        assert client.get('/readyz').status_code == 503  # not probed yet
+        monitor.check_now()
+        assert client.get('/readyz').status_code == 200
+        monitor.state['fail'] = True
+        monitor.check_now()
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.get_json()['db'] == 'error'
+
+    def test_detailed_health(self, client, monitor):
+        monitor.check_now()
+        response = client.get('/api/health')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['db']['status'] == 'ok'
+        for section in ('pool', 'breaker', 'cache', 'admission', 'rate_limit'):
+            assert section in data
@@ -0,0 +1,49 @@
+import datetime
+import decimal
+import json
+import uuid
+import pytest
+from app import create_app
+from app.helpers.json_provider import RowSet, rows_to_json
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+class TestFastJSONProvider:
+    """Test serialization of SQL Server types and RowSet payloads."""
+
+    def test_sql_server_types(self, app):
+        with app.app_context():
+            data = json.loads(app.json.dumps({
+                'created': datetime.datetime(2024, 1, 2, 3, 4, 5),
+                'amount': decimal.Decimal('10.50'),
+                'guid': uuid.UUID(int=1),
+                'version': b'\x00\x00\x00\x00\x00\x00\x07\xd1',
+            }))
+        assert data['created'] == '2024-01-02T03:04:05'
+        assert data['amount'] == '10.50'
+        assert data['guid'] == '00000000-0000-0000-0000-000000000001'
+        assert data['version'] == '00000000000007d1'
+
+    def test_rowset_matches_dicts(self, app):
+        rows = [(1, 'Sam', 'sam@example.com'), (2, 'Jo "J"', 'jo@example.com')]
+        columns = ('id', 'name', 'email')
+        expected = [dict(zip(columns, row)) for row in rows]
+        assert json.loads(rows_to_json(columns, rows)) == expected
+        with app.test_request_context():
+            response = app.json.response(RowSet(columns, rows))
+        assert json.loads(response.data) == expected
+
+    def test_quoted_column_names(self):
+        columns = ("it's", 'say "hi"', 'back\\slash')
+        rows = [(1, 'a', None)]
+        assert json.loads(rows_to_json(columns, rows)) == [dict(zip(columns, rows[0]))]
+
+    def test_rowset_behaves_like_list(self):
+        users = RowSet(('id', 'name'), [(1, 'a'), (2, 'b')])
+        assert len(users) == 2
+        assert users[-1] == {'id': 2, 'name': 'b'}
+        assert list(users[:1]) == [{'id': 1, 'name': 'a'}]
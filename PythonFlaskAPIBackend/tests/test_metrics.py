@@ -0,0 +1,55 @@
+import os
+import subprocess
+from app.helpers.metrics import Counter, Gauge, Histogram, Registry, SQLiteMetricsStore, merge_families, \
+    render_families
+
+
+def worker_registry(requests, in_flight, latencies):
+    registry = Registry()
+    registry.register(Counter('requests_total', 'Requests.', ('status',))).inc('200', amount=requests)
+    registry.register(Gauge('in_flight', 'In flight.')).set(in_flight)
+    histogram = registry.register(Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0)))
+    for value in latencies:
+        histogram.observe(value)
+    registry.add_collector(lambda: [('pool_timeouts', 'Timeouts (since start).', requests, 'counter'),
+                                    ('pool_idle', 'Idle connections.', 1)])
+    return registry
+
+
+def dead_pid():
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+class TestWorkerAggregation:
+    """Test that /metrics combines the workers of a host into one consistent exposition."""
+
+    def test_counters_sum_and_gauges_keep_the_worker(self):
+        merged = merge_families([(1, worker_registry(3, 2, [0.05]).snapshot()),
+                                 (2, worker_registry(4, 5, [0.5, 5]).snapshot())])
+        text = render_families(merged)
+        assert '# TYPE requests_total counter' in text
+        assert 'requests_total{status="200"} 7' in text
+        assert '# TYPE pool_timeouts counter' in text and 'pool_timeouts 7' in text
+        assert 'in_flight{worker="1"} 2' in text and 'in_flight{worker="2"} 5' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_totals_of_exited_workers_are_kept(self, tmp_path):
+        store = SQLiteMetricsStore(str(tmp_path / 'metrics.db'))
+        gone = dead_pid()
+        store.publish(gone, worker_registry(10, 9, []).snapshot())
+        store.publish(os.getpid(), worker_registry(1, 1, []).snapshot())
+
+        text = render_families(merge_families(store.collect()))
+        assert 'requests_total{status="200"} 11' in text
+        assert f'in_flight{{worker="{gone}"}}' not in text
+        assert f'in_flight{{worker="{os.getpid()}"}} 1' in text
+
+        # Retiring this worker too keeps the total where it was
+        store.retire(os.getpid(), worker_registry(2, 1, []).snapshot())
+        text = render_families(merge_families(store.collect()))
+        assert 'requests_total{status="200"} 12' in text
+        assert 'in_flight' not in text
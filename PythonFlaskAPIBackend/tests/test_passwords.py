@@ -0,0 +1,117 @@
+import threading
+import pytest
+from app import create_app
+from app.helpers import passwords
+from app.helpers.admission import Overloaded
+from app.helpers.passwords import PasswordHasher, VerifierPool
+from app.services.services import LoginService
+
+
+class TestPasswordHasher:
+    """Test the stored hash format, verification and rehash detection."""
+
+    def test_pbkdf2_round_trip(self):
+        hasher = PasswordHasher(iterations=1000)
+        encoded = hasher.hash('s3cret')
+        assert encoded.startswith('pbkdf2_sha256$1000$')
+        assert hasher.verify('s3cret', encoded)
+        assert not hasher.verify('S3cret', encoded)
+        assert hasher.hash('s3cret') != encoded  # fresh salt every time
+
+    def test_scrypt_round_trip(self):
+        hasher = PasswordHasher('scrypt', scrypt_n=2 ** 10)
+        encoded = hasher.hash('s3cret')
+        assert encoded.startswith('scrypt$1024$8$1$')
+        assert hasher.verify('s3cret', encoded)
+
+    def test_needs_rehash(self):
+        old = PasswordHasher(iterations=1000).hash('pw')
+        assert not PasswordHasher(iterations=1000).needs_rehash(old)
+        assert PasswordHasher(iterations=2000).needs_rehash(old)
+        assert PasswordHasher('scrypt').needs_rehash(old)
+        assert PasswordHasher(iterations=2000).verify('pw', old)  # old parameters still verify
+
+    def test_legacy_plaintext_and_malformed(self):
+        hasher = PasswordHasher(iterations=1000)
+        assert hasher.verify('admin', 'admin') and hasher.needs_rehash('admin')
+        assert not hasher.verify('admin', 'pbkdf2_sha256$x$y$z')
+
+
+class TestVerifierPool:
+    """Test that hashing work beyond the pool's capacity is shed."""
+
+    def occupy(self, pool, release):
+        started = threading.Event()
+        blocker = threading.Thread(target=pool.run, args=(lambda: started.set() or release.wait(),))
+        blocker.start()
+        started.wait(2)
+        return blocker
+
+    def test_rejects_when_full(self):
+        pool = VerifierPool(workers=1, max_queue=0, queue_timeout=5)
+        release = threading.Event()
+        blocker = self.occupy(pool, release)
+        try:
+            with pytest.raises(Overloaded):
+                pool.run(lambda: None)
+        finally:
+            release.set()
+            blocker.join()
+        assert pool.run(lambda: 42) == 42
+        assert pool.stats()['rejected_full'] == 1
+        pool.shutdown()
+
+    def test_cancels_jobs_past_the_queue_deadline(self):
+        pool = VerifierPool(workers=1, max_queue=1, queue_timeout=0.05)
+        release = threading.Event()
+        ran = []
+        blocker = self.occupy(pool, release)
+        try:
+            with pytest.raises(Overloaded):
+                pool.run(ran.append, 1)
+        finally:
+            release.set()
+            blocker.join()
+        pool.shutdown()
+        assert ran == [] and pool.stats()['rejected_timeout'] == 1
+
+
+class TestLogin:
+    """Test /api/login against hashed and legacy stored passwords."""
+
+    @pytest.fixture
+    def client(self):
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    @pytest.fixture
+    def admin(self):
+        login_id, stored = LoginService._get_login('admin')
+        yield login_id
+        LoginService._set_password(login_id, stored)
+
+    def login(self, client, password='admin'):
+        return client.post('/api/login', json={'username': 'admin', 'password': password})
+
+    def test_plaintext_is_upgraded_on_login(self, client, admin):
+        LoginService._set_password(admin, 'admin')
+        assert self.login(client, 'wrong').status_code == 401
+        assert LoginService._get_login('admin')[1] == 'admin'
+
+        assert self.login(client).status_code == 200
+        stored = LoginService._get_login('admin')[1]
+        assert stored.startswith('pbkdf2_sha256$1000$')
+        assert self.login(client).status_code == 200
+        assert LoginService._get_login('admin')[1] == stored
+
+    def test_rehash_when_cost_changes(self, client, admin, monkeypatch):
+        LoginService.set_password('admin', 'admin')
+        monkeypatch.setattr(passwords, '_hasher', PasswordHasher(iterations=1500))
+        assert self.login(client).status_code == 200
+        assert LoginService._get_login('admin')[1].startswith('pbkdf2_sha256$1500$')
+
+    def test_unknown_user(self, client):
+        response = client.post('/api/login', json={'username': 'nobody', 'password': 'admin'})
+        assert response.status_code == 401
@@ -2,6 +2,9 @@ import pytest
 import json
 from app import create_app
 from app.helpers.auth import generate_jwt_token
+from app.helpers.db_connection import get_db_connection
+from app.helpers.pagination import encode_cursor
+from app.services.services import UserService
 
 
 @pytest.fixture
@@ -78,6 +81,174 @@ class TestUserRoutes:
         data = json.loads(response.data)
         assert 'Invalid or expired token' in data['error']
     
+    def test_get_users_page_limit(self, client, valid_token):
+        """Test GET /api/users honours the limit parameter."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.get('/api/users?limit=1', headers=headers)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert isinstance(data, list)
+        assert len(data) <= 1
+        if 'X-Next-Cursor' in response.headers:
+            next_page = client.get(
+                f"/api/users?limit=1&cursor={response.headers['X-Next-Cursor']}",
+                headers=headers
+            )
+            assert next_page.status_code == 200
+            assert all(u['id'] > data[-1]['id'] for u in json.loads(next_page.data))
+
+    def test_get_users_invalid_pagination(self, client, valid_token):
+        """Test GET /api/users rejects malformed limit and cursor values."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        assert client.get('/api/users?limit=0', headers=headers).status_code == 400
+        assert client.get('/api/users?limit=abc', headers=headers).status_code == 400
+        assert client.get('/api/users?after_id=x', headers=headers).status_code == 400
+        assert client.get('/api/users?cursor=%%%', headers=headers).status_code == 400
+
+    def test_search_users(self, client, valid_token):
+        """Test GET /api/users filters, sorts and pages by the sort key."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        people = [('Srch_b', 'srch.b@example.com'), ('srchB', 'srch.c@example.com'),
+                  ('Srch_a', 'zz.srch@example.com')]
+        ids = [client.post('/api/users', json={'name': n, 'email': e}, headers=headers).get_json()['id']
+               for n, e in people]
+
+        def names(query):
+            response = client.get(f'/api/users?{query}', headers=headers)
+            assert response.status_code == 200
+            return [u['name'] for u in response.get_json()]
+
+        # "_" is matched literally, and matching is case-insensitive
+        assert names('name_prefix=srch_&sort=name') == ['Srch_a', 'Srch_b']
+        assert names('email=SRCH.C@example.com') == ['srchB']
+        assert names('q=srch.&sort=-email') == ['srchB', 'Srch_b']
+
+        seen, url = [], '/api/users?q=srch&sort=-name&limit=1'
+        while url:
+            response = client.get(url, headers=headers)
+            seen += [u['name'] for u in response.get_json()]
+            url = response.headers.get('Link', '').partition('>')[0][1:]
+        assert seen == ['srchB', 'Srch_b', 'Srch_a']
+
+        for user_id in ids:
+            client.delete(f'/api/users/{user_id}', headers=headers)
+
+    def test_search_users_invalid(self, client, valid_token):
+        """Test GET /api/users rejects unknown sorts and mismatched cursors."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        assert client.get('/api/users?sort=password', headers=headers).status_code == 400
+        assert client.get('/api/users?sort=name&after_id=1', headers=headers).status_code == 400
+        assert client.get('/api/users?name_prefix=' + 'x' * 101, headers=headers).status_code == 400
+        page = client.get('/api/users?sort=name&limit=1', headers=headers)
+        if 'X-Next-Cursor' in page.headers:
+            cursor = page.headers['X-Next-Cursor']
+            assert client.get(f'/api/users?sort=email&cursor={cursor}', headers=headers).status_code == 400
+
+    def test_sparse_fieldsets(self, client, valid_token):
+        """Test ?fields= narrows list, single-user and export payloads to the named fields plus id."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        user = client.post('/api/users', json={'name': 'Sparse', 'email': 'sparse@example.com'},
+                           headers=headers).get_json()
+
+        page = client.get('/api/users?fields=name&limit=2', headers=headers)
+        assert page.status_code == 200
+        assert all(set(u) == {'id', 'name'} for u in page.get_json())
+        if 'Link' in page.headers:
+            assert 'fields=name' in page.headers['Link']
+        # The sort column is read for the cursor but not returned
+        sorted_page = client.get('/api/users?fields=name&sort=-email&email=sparse@example.com', headers=headers)
+        assert sorted_page.get_json() == [{'id': user['id'], 'name': 'Sparse'}]
+
+        single = client.get(f"/api/users/{user['id']}?fields=email", headers=headers)
+        assert single.get_json() == {'id': user['id'], 'email': 'sparse@example.com'}
+        assert single.headers['ETag'] == client.get(f"/api/users/{user['id']}", headers=headers).headers['ETag']
+        # The projection is made in SQL, not by trimming a whole row
+        assert set(UserService.get_user_by_id(user['id'], ('id', 'email'))) == {'id', 'email', 'version'}
+        export = client.get('/api/users/export?format=csv&fields=email', headers=headers)
+        assert export.get_data(as_text=True).splitlines()[0] == 'id,email'
+
+        for url in ('/api/users?fields=password', f"/api/users/{user['id']}?fields=name,version",
+                    '/api/users/export?fields=token'):
+            assert client.get(url, headers=headers).status_code == 400
+        client.delete(f"/api/users/{user['id']}", headers=headers)
+
+    def test_user_changes_since_token(self, client, valid_token):
+        """Test GET /api/users/changes returns only what changed after the token."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        token = None
+        while True:
+            url = '/api/users/changes?limit=500' + (f'&since={token}' if token else '')
+            data = client.get(url, headers=headers).get_json()
+            token = data['token']
+            if not data['has_more']:
+                break
+
+        created = client.post('/api/users', json={'name': 'Sync', 'email': 'sync@example.com'},
+                              headers=headers).get_json()
+        doomed = client.post('/api/users', json={'name': 'Gone', 'email': 'gone@example.com'},
+                             headers=headers).get_json()
+        client.put(f"/api/users/{created['id']}", json={'name': 'Synced'}, headers=headers)
+        client.delete(f"/api/users/{doomed['id']}", headers=headers)
+
+        response = client.get(f'/api/users/changes?since={token}', headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['users'] == [{'id': created['id'], 'name': 'Synced', 'email': 'sync@example.com'}]
+        assert data['deleted'] == [doomed['id']]
+        assert data['has_more'] is False
+
+        again = client.get(f"/api/users/changes?since={data['token']}", headers=headers).get_json()
+        assert again['users'] == [] and again['deleted'] == []
+        assert again['token'] == data['token']
+
+    def test_user_changes_token_older_than_tombstones(self, client, valid_token):
+        """Test GET /api/users/changes answers 410 once deletions after the token are pruned."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        doomed = client.post('/api/users', json={'name': 'Pruned', 'email': 'pruned@example.com'},
+                             headers=headers)
+        version = int(doomed.headers['ETag'].strip('"v'))
+        token = encode_cursor({'v': version})
+        doomed = doomed.get_json()
+        client.delete(f"/api/users/{doomed['id']}", headers=headers)
+        with get_db_connection() as conn:
+            conn.cursor().execute("EXEC dbo.sp_prune_user_tombstones @RetentionDays = ?", (-1,))
+            conn.commit()
+
+        assert client.get(f'/api/users/changes?since={token}', headers=headers).status_code == 410
+        fresh = client.get('/api/users/changes?limit=1', headers=headers)
+        assert fresh.status_code == 200
+        assert client.get(f"/api/users/changes?since={fresh.get_json()['token']}",
+                          headers=headers).status_code == 200
+
+    def test_user_changes_invalid_token(self, client, valid_token):
+        """Test GET /api/users/changes rejects malformed tokens."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        assert client.get('/api/users/changes?since=%%%', headers=headers).status_code == 400
+        assert client.get('/api/users/changes?since=e30', headers=headers).status_code == 400
+
+    def test_export_users_ndjson(self, client, valid_token):
+        """Test GET /api/users/export streams one JSON object per line."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.get('/api/users/export', headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        for line in response.data.decode().splitlines():
+            assert 'id' in json.loads(line)
+
+    def test_export_users_csv(self, client, valid_token):
+        """Test GET /api/users/export?format=csv starts with a header row."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.get('/api/users/export?format=csv', headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.data.decode().splitlines()[0] == 'id,name,email'
+
+    def test_export_users_invalid_format(self, client, valid_token):
+        """Test GET /api/users/export rejects unknown formats."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.get('/api/users/export?format=xml', headers=headers)
+        assert response.status_code == 400
+
     def test_create_user_without_token(self, client):
         """Test POST /api/users without token returns 401."""
         response = client.post('/api/users',
@@ -94,6 +265,8 @@ class TestUserRoutes:
         )
         # Will depend on DB connectivity; expect 201 if DB is available
         assert response.status_code in [201, 500]  # 500 if DB not available
+        if response.status_code == 201:
+            assert 'id' in json.loads(response.data)
     
     def test_create_user_validation_failure(self, client, valid_token):
         """Test POST /api/users with invalid data (missing email)."""
@@ -106,6 +279,122 @@ class TestUserRoutes:
         data = json.loads(response.data)
         assert 'Validation failed' in data['error']
     
+    def test_bulk_create_reports_row_errors(self, client, valid_token):
+        """Test POST /api/users/bulk creates valid rows and reports invalid ones by index."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.post('/api/users/bulk',
+            json=[
+                {'name': 'Bulk One', 'email': 'bulk1@example.com'},
+                {'name': 'Bulk Two', 'email': 'not-an-email'},
+            ],
+            headers=headers
+        )
+        assert response.status_code in [201, 500]  # 500 if DB not available
+        if response.status_code == 201:
+            data = json.loads(response.data)
+            assert [u['index'] for u in data['created']] == [0]
+            assert 'id' in data['created'][0]
+            assert '1' in data['errors']
+
+    def test_bulk_create_rejects_non_list(self, client, valid_token):
+        """Test POST /api/users/bulk requires a non-empty array."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.post('/api/users/bulk', json={'name': 'x'}, headers=headers)
+        assert response.status_code == 400
+
+    def test_batch_reports_each_operation(self, client, valid_token):
+        """Test POST /api/batch runs operations in order with their own status codes."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.post('/api/batch', headers=headers, json={'operations': [
+            {'method': 'POST', 'path': '/users', 'body': {'name': 'Batch', 'email': 'batch@example.com'}},
+            {'method': 'GET', 'path': '/users/987654'},
+            {'method': 'PUT', 'path': '/users/987654', 'body': {'email': 'bad'}},
+            {'method': 'PATCH', 'path': '/users/1'},
+        ]})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['committed'] is True
+        assert [r['status'] for r in data['results']] == [201, 404, 400, 405]
+        created = data['results'][0]['body']
+        assert client.get(f"/api/users/{created['id']}", headers=headers).status_code == 200
+
+    def test_atomic_batch_rolls_back(self, client, valid_token):
+        """Test an atomic batch applies nothing when one operation fails."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.post('/api/batch', headers=headers, json={'atomic': True, 'operations': [
+            {'method': 'POST', 'path': '/users', 'body': {'name': 'Atomic', 'email': 'atomic@example.com'}},
+            {'method': 'DELETE', 'path': '/users/987654'},
+            {'method': 'GET', 'path': '/users/1'},
+        ]})
+        data = response.get_json()
+        assert data['committed'] is False
+        assert [r['status'] for r in data['results']] == [424, 404, 424]
+        changes = client.get('/api/users/changes?limit=1000', headers=headers).get_json()
+        while changes['has_more']:
+            changes = client.get(f"/api/users/changes?limit=1000&since={changes['token']}",
+                                 headers=headers).get_json()
+        assert all(u['email'] != 'atomic@example.com' for u in changes['users'])
+
+    def test_batch_rejects_malformed_payload(self, client, valid_token):
+        """Test POST /api/batch validates the envelope."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        assert client.post('/api/batch', headers=headers, json=[]).status_code == 400
+        assert client.post('/api/batch', headers=headers, json={'operations': []}).status_code == 400
+
+    def test_get_user_conditional(self, client, valid_token):
+        """Test GET /api/users/<id> answers a matching If-None-Match with 304."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        created = client.post('/api/users', json={'name': 'Tag', 'email': 'tag@example.com'}, headers=headers)
+        etag = created.headers['ETag']
+        user_id = created.get_json()['id']
+
+        response = client.get(f'/api/users/{user_id}', headers=headers)
+        assert response.headers['ETag'] == etag
+        assert 'version' not in response.get_json()
+        assert 'no-cache' in response.headers['Cache-Control']
+
+        response = client.get(f'/api/users/{user_id}', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        # Weak comparison: a cache that weakened the tag still revalidates
+        response = client.get(f'/api/users/{user_id}', headers={**headers, 'If-None-Match': f'W/{etag}'})
+        assert response.status_code == 304
+
+        client.put(f'/api/users/{user_id}', json={'name': 'Tag 2'}, headers=headers)
+        response = client.get(f'/api/users/{user_id}', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_list_conditional(self, client, valid_token):
+        """Test GET /api/users revalidates against the collection version."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        etag = client.get('/api/users?limit=5', headers=headers).headers['ETag']
+        response = client.get('/api/users?limit=5', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+
+        client.post('/api/users', json={'name': 'List', 'email': 'list@example.com'}, headers=headers)
+        response = client.get('/api/users?limit=5', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_if_match_guards_writes(self, client, valid_token):
+        """Test PUT/DELETE with a stale If-Match get 412 and change nothing."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        created = client.post('/api/users', json={'name': 'Lock', 'email': 'lock@example.com'}, headers=headers)
+        user_id, stale = created.get_json()['id'], created.headers['ETag']
+
+        first = client.put(f'/api/users/{user_id}', json={'name': 'First'}, headers={**headers, 'If-Match': stale})
+        assert first.status_code == 200
+        second = client.put(f'/api/users/{user_id}', json={'name': 'Second'}, headers={**headers, 'If-Match': stale})
+        assert second.status_code == 412
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert client.delete(f'/api/users/{user_id}', headers={**headers, 'If-Match': stale}).status_code == 412
+        assert client.get(f'/api/users/{user_id}', headers=headers).get_json()['name'] == 'First'
+
+        response = client.delete(f'/api/users/{user_id}', headers={**headers, 'If-Match': first.headers['ETag']})
+        assert response.status_code == 200
+        response = client.delete('/api/users/987654', headers={**headers, 'If-Match': stale})
+        assert response.status_code == 404
+
     def test_update_user_without_token(self, client):
         """Test PUT /api/users/<id> without token returns 401."""
         response = client.put('/api/users/1',
@@ -113,6 +402,33 @@ class TestUserRoutes:
         )
         assert response.status_code == 401
     
+    def test_update_missing_user_returns_404(self, client, valid_token):
+        """Test PUT /api/users/<id> for an unknown id returns 404."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.put('/api/users/2147483647',
+            json={'name': 'Nobody'},
+            headers=headers
+        )
+        assert response.status_code in [404, 500]  # 500 if DB not available
+
+    def test_delete_user_returns_the_row_without_version(self, client, valid_token):
+        """Test DELETE /api/users/<id> echoes the row like other mutations, version only in the service result."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        created = client.post('/api/users', json={'name': 'Bye', 'email': 'bye@example.com'}, headers=headers)
+        user_id = created.get_json()['id']
+        response = client.delete(f'/api/users/{user_id}', headers=headers)
+        assert response.get_json()['user'] == {'id': user_id, 'name': 'Bye', 'email': 'bye@example.com'}
+
+        again = client.post('/api/users', json={'name': 'Bye', 'email': 'bye@example.com'}, headers=headers)
+        deleted = UserService.delete_user(again.get_json()['id'])
+        assert f"\"v{deleted['version']}\"" == again.headers['ETag']
+
+    def test_delete_missing_user_returns_404(self, client, valid_token):
+        """Test DELETE /api/users/<id> for an unknown id returns 404."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.delete('/api/users/2147483647', headers=headers)
+        assert response.status_code in [404, 500]  # 500 if DB not available
+
     def test_delete_user_without_token(self, client):
         """Test DELETE /api/users/<id> without token returns 401."""
         response = client.delete('/api/users/1')
@@ -150,5 +466,27 @@ class TestInputValidation:
         assert response.status_code == 400
 
 
+class TestMonitoring:
+    """Test the operational endpoints."""
+
+    def test_metrics_exposition(self, client):
+        """Test /metrics serves Prometheus text including request metrics."""
+        client.get('/api/users')  # 401, but still counted
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        body = response.data.decode()
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'http_requests_total{method="GET",endpoint="users.get_users",status="401"}' in body
+
+    def test_server_timing_header(self, client, valid_token):
+        """Test responses carry a Server-Timing breakdown."""
+        headers = {'Authorization': f'Bearer {valid_token}'}
+        response = client.get('/api/users', headers=headers)
+        timing = response.headers.get('Server-Timing', '')
+        assert 'auth;dur=' in timing
+        assert 'total;dur=' in timing
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
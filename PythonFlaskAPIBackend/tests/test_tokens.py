@@ -0,0 +1,86 @@
+import jwt
+import pytest
+from app import create_app
+from app.helpers.auth import generate_jwt_token
+from app.helpers.tokens import KeyRing, MemoryRevocationList, SQLiteRevocationList, TokenVerifier
+
+
+def make_verifier(keys=None, active='k1'):
+    return TokenVerifier(KeyRing(keys or {'k1': 'secret-1'}, active), MemoryRevocationList())
+
+
+class TestTokenVerifier:
+    """Test the verified-token cache, key rotation and revocation."""
+
+    def test_repeat_token_skips_verification(self, monkeypatch):
+        verifier = make_verifier()
+        token = verifier.issue({'username': 'admin'}, 60)
+        calls = []
+        decode = verifier.keyring.decode
+        monkeypatch.setattr(verifier.keyring, 'decode', lambda t: calls.append(t) or decode(t))
+        assert verifier.decode(token)['username'] == 'admin'
+        assert verifier.decode(token)['username'] == 'admin'
+        assert len(calls) == 1
+        with pytest.raises(jwt.InvalidSignatureError):
+            verifier.decode(token[:-2] + ('AA' if not token.endswith('AA') else 'BB'))
+
+    def test_expiry_is_honored_for_cached_tokens(self):
+        verifier = make_verifier()
+        token = verifier.issue({'username': 'admin'}, 60)
+        verifier.decode(token)['exp'] = 0  # as if the minute had passed
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verifier.decode(token)
+        assert verifier.cache.stats()['size'] == 0
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verifier.decode(verifier.issue({'username': 'admin'}, -1))
+
+    def test_key_rotation(self):
+        old = make_verifier({'k1': 'secret-1'}, 'k1')
+        token = old.issue({'username': 'admin'}, 60)
+        rotated = make_verifier({'k1': 'secret-1', 'k2': 'secret-2'}, 'k2')
+        assert rotated.decode(token)['username'] == 'admin'
+        assert jwt.get_unverified_header(rotated.issue({'username': 'admin'}, 60))['kid'] == 'k2'
+        with pytest.raises(jwt.InvalidTokenError):
+            make_verifier({'k2': 'secret-2'}, 'k2').decode(token)
+        legacy = jwt.encode({'username': 'admin'}, 'secret-2', algorithm='HS256')  # no kid
+        assert rotated.decode(legacy)['username'] == 'admin'
+
+    def test_keys_from_config(self):
+        ring = KeyRing.from_config('a:one, b:two', '', 'fallback')
+        assert (ring.keys, ring.active_kid) == ({'a': 'one', 'b': 'two'}, 'a')
+        assert KeyRing.from_config('', '', 'fallback').keys == {'default': 'fallback'}
+        with pytest.raises(ValueError):
+            KeyRing.from_config('a:one', 'b', 'fallback')
+
+    def test_revoked_token_is_refused_even_when_cached(self):
+        verifier = make_verifier()
+        token = verifier.issue({'username': 'admin'}, 60)
+        payload = verifier.decode(token)
+        verifier.revocations.revoke(payload['jti'], payload['exp'])
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.decode(token)
+
+    def test_sqlite_revocations_are_shared(self, tmp_path):
+        path = str(tmp_path / 'revoked.db')
+        first, second = SQLiteRevocationList(path, 0), SQLiteRevocationList(path, 0)
+        assert not second.is_revoked('abc')
+        first.revoke('abc', 2 ** 31)
+        assert second.is_revoked('abc')
+
+
+class TestLogout:
+    """Test POST /api/logout and refresh of a revoked token."""
+
+    @pytest.fixture
+    def client(self):
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_logout_revokes_the_token(self, client):
+        headers = {'Authorization': f"Bearer {generate_jwt_token('admin')}"}
+        assert client.get('/api/users?limit=1', headers=headers).status_code == 200
+        assert client.post('/api/logout', headers=headers).status_code == 204
+        assert client.get('/api/users?limit=1', headers=headers).status_code == 401
+        assert client.post('/api/refresh-token', headers=headers).status_code == 401
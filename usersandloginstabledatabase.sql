@@ -1,37 +1,149 @@
-CREATE TABLE users (
+-- Schema and stored procedures for the API. Every object is created only if it
+-- is missing (tables, indexes, types) or with CREATE OR ALTER (functions,
+-- procedures), so the script can be re-run to upgrade an existing database.
+-- Batches are separated with GO, as SSMS and sqlcmd expect.
+
+IF OBJECT_ID(N'dbo.users', N'U') IS NULL
+CREATE TABLE dbo.users (
     id INT IDENTITY(1,1) PRIMARY KEY,
     name NVARCHAR(100) NOT NULL,
     email NVARCHAR(120) NOT NULL
 );
 
-CREATE TABLE logins (
+IF OBJECT_ID(N'dbo.logins', N'U') IS NULL
+CREATE TABLE dbo.logins (
     id INT IDENTITY(1,1) PRIMARY KEY,
     username NVARCHAR(100) NOT NULL,
     password NVARCHAR(255) NOT NULL
 );
 
-insert into logins(username,password) values('admin','admin')
+IF NOT EXISTS (SELECT 1 FROM dbo.logins WHERE username = N'admin')
+    INSERT INTO dbo.logins (username, password) VALUES (N'admin', N'admin');
+GO
+
+-- Change feed. Every insert/update stamps users.row_ver with the next
+-- database-wide rowversion; deletes leave a tombstone that gets one too, so
+-- "everything since version N" covers all three kinds of change.
+IF COL_LENGTH(N'dbo.users', N'row_ver') IS NULL
+    ALTER TABLE dbo.users ADD row_ver ROWVERSION NOT NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_users_row_ver' AND object_id = OBJECT_ID(N'dbo.users'))
+    CREATE UNIQUE INDEX IX_users_row_ver ON dbo.users (row_ver) INCLUDE (name, email);
+
+-- Search. Both indexes are non-unique, so SQL Server appends the clustering
+-- key: their key order is (email, id) and (name, id), exactly the keyset
+-- order of a page sorted by that column, and INCLUDE makes them covering.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_users_email' AND object_id = OBJECT_ID(N'dbo.users'))
+    CREATE INDEX IX_users_email ON dbo.users (email) INCLUDE (name);
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_users_name' AND object_id = OBJECT_ID(N'dbo.users'))
+    CREATE INDEX IX_users_name ON dbo.users (name) INCLUDE (email);
+
+-- Credentials. logins.password holds a self-describing salted hash
+-- (pbkdf2_sha256$<iterations>$<salt>$<hash> or scrypt$<n>$<r>$<p>$<salt>$<hash>);
+-- rows still holding a plaintext password, like the seeded admin above, are
+-- rehashed by the API on their next successful login. Hashes are produced
+-- with: python -m app.helpers.passwords
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_logins_username' AND object_id = OBJECT_ID(N'dbo.logins'))
+    CREATE UNIQUE INDEX IX_logins_username ON dbo.logins (username) INCLUDE (password);
+
+IF OBJECT_ID(N'dbo.users_deleted', N'U') IS NULL
+CREATE TABLE dbo.users_deleted (
+    row_ver ROWVERSION NOT NULL CONSTRAINT PK_users_deleted PRIMARY KEY,
+    id INT NOT NULL,
+    deleted_at DATETIME2 NOT NULL CONSTRAINT DF_users_deleted_at DEFAULT SYSUTCDATETIME()
+);
+
+-- Newest tombstone version removed by sp_prune_user_tombstones. A sync token
+-- below it may have missed a delete, so sp_get_user_changes reports it and
+-- the API answers 410 (sync again without a token).
+IF OBJECT_ID(N'dbo.users_deleted_horizon', N'U') IS NULL
+CREATE TABLE dbo.users_deleted_horizon (
+    pruned_through BIGINT NOT NULL
+);
+
+IF NOT EXISTS (SELECT 1 FROM dbo.users_deleted_horizon)
+    INSERT INTO dbo.users_deleted_horizon (pruned_through) VALUES (0);
 
+-- Table-valued parameter for bulk inserts. RowNo is the caller's position of
+-- the row in its request so generated ids can be mapped back.
+IF TYPE_ID(N'dbo.UserTableType') IS NULL
+CREATE TYPE dbo.UserTableType AS TABLE (
+    RowNo INT NOT NULL PRIMARY KEY,
+    name NVARCHAR(100) NOT NULL,
+    email NVARCHAR(120) NOT NULL
+);
+GO
+
+-- Sparse fieldsets (?fields=...). Column list for a query: id, then the
+-- requested columns among name and email in table order (all of them when
+-- @Fields is NULL), then @Sort if it was not requested, since the keyset
+-- cursor needs it. Only literal column names are ever returned, so the
+-- result is safe to splice into dynamic SQL; unknown names are ignored (the
+-- API rejects them before calling).
+CREATE OR ALTER FUNCTION dbo.fn_user_columns (@Fields NVARCHAR(100), @Sort NVARCHAR(10) = N'id')
+RETURNS NVARCHAR(100)
+AS
+BEGIN
+    DECLARE @Requested TABLE (name NVARCHAR(100));
+    INSERT INTO @Requested (name) SELECT TRIM(value) FROM STRING_SPLIT(@Fields, N',');
+
+    DECLARE @Columns NVARCHAR(100) = N'id';
+    IF @Fields IS NULL OR EXISTS (SELECT 1 FROM @Requested WHERE name = N'name')
+        SET @Columns += N', name';
+    IF @Fields IS NULL OR EXISTS (SELECT 1 FROM @Requested WHERE name = N'email')
+        SET @Columns += N', email';
+    IF @Sort = N'name' AND @Columns NOT LIKE N'%name%'
+        SET @Columns += N', name';
+    IF @Sort = N'email' AND @Columns NOT LIKE N'%email%'
+        SET @Columns += N', email';
+    RETURN @Columns;
+END
+GO
 
-CREATE PROCEDURE dbo.sp_get_all_users
+-- Every user (GET /api/users/export), optionally only some columns
+CREATE OR ALTER PROCEDURE dbo.sp_get_all_users
+    @Fields NVARCHAR(100) = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
-    SELECT id, name, email
-    FROM dbo.users;
+    IF @Fields IS NULL
+        SELECT id, name, email FROM dbo.users;
+    ELSE
+    BEGIN
+        DECLARE @Sql NVARCHAR(MAX) = N'SELECT ' + dbo.fn_user_columns(@Fields, N'id') + N' FROM dbo.users';
+        EXEC sp_executesql @Sql;
+    END
 END
+GO
 
-CREATE PROCEDURE dbo.sp_get_user_by_id
-    @UserId INT
+-- Conditional requests. Reads and writes of a single user also return its
+-- rowversion (as BIGINT "version") for the ETag, and updates/deletes accept
+-- the version the caller last saw: when it no longer matches nothing is
+-- changed and the result is empty (If-Match -> 412).
+-- With @Fields only those columns (see fn_user_columns) plus the version.
+CREATE OR ALTER PROCEDURE dbo.sp_get_user_by_id
+    @UserId INT,
+    @Fields NVARCHAR(100) = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
-    SELECT id, name, email
-    FROM dbo.users
-    WHERE id = @UserId;
+    IF @Fields IS NULL
+        SELECT id, name, email, CAST(row_ver AS BIGINT) AS version
+        FROM dbo.users
+        WHERE id = @UserId;
+    ELSE
+    BEGIN
+        DECLARE @Sql NVARCHAR(MAX) = N'SELECT ' + dbo.fn_user_columns(@Fields, N'id')
+                                     + N', CAST(row_ver AS BIGINT) AS version FROM dbo.users WHERE id = @UserId';
+        EXEC sp_executesql @Sql, N'@UserId INT', @UserId;
+    END
 END
+GO
 
-CREATE PROCEDURE dbo.sp_create_user
+-- Mutations return the affected row through OUTPUT so callers need no
+-- follow-up read: an empty result means the user did not exist.
+CREATE OR ALTER PROCEDURE dbo.sp_create_user
     @Name NVARCHAR(200),
     @Email NVARCHAR(200)
 AS
@@ -39,38 +151,248 @@ BEGIN
     SET NOCOUNT ON;
 
     INSERT INTO dbo.users (name, email)
+    OUTPUT inserted.id, inserted.name, inserted.email, CAST(inserted.row_ver AS BIGINT) AS version
     VALUES (@Name, @Email);
 END
+GO
 
-CREATE PROCEDURE dbo.sp_update_user
+CREATE OR ALTER PROCEDURE dbo.sp_create_users_bulk
+    @Users dbo.UserTableType READONLY
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- MERGE instead of INSERT ... SELECT because only MERGE's OUTPUT clause
+    -- can reference source columns (RowNo) next to the generated id.
+    MERGE INTO dbo.users AS target
+    USING @Users AS src
+    ON 1 = 0
+    WHEN NOT MATCHED THEN
+        INSERT (name, email) VALUES (src.name, src.email)
+    OUTPUT src.RowNo, inserted.id, inserted.name, inserted.email, CAST(inserted.row_ver AS BIGINT) AS version;
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_update_user
     @UserId INT,
-    @Name NVARCHAR(200),
-    @Email NVARCHAR(200)
+    @Name NVARCHAR(200) = NULL,
+    @Email NVARCHAR(200) = NULL,
+    @ExpectedVersion BIGINT = NULL
 AS
 BEGIN
     SET NOCOUNT ON;
 
+    -- NULL keeps the current value, so partial updates are supported
     UPDATE dbo.users
-    SET name = @Name,
-        email = @Email
-    WHERE id = @UserId;
+    SET name = COALESCE(@Name, name),
+        email = COALESCE(@Email, email)
+    OUTPUT inserted.id, inserted.name, inserted.email, CAST(inserted.row_ver AS BIGINT) AS version
+    WHERE id = @UserId
+      AND (@ExpectedVersion IS NULL OR row_ver = CAST(@ExpectedVersion AS BINARY(8)));
+END
+GO
+
+-- Tombstone written by the same statement as the delete. (A trigger would
+-- not work: SQL Server rejects OUTPUT without INTO on tables with triggers.)
+CREATE OR ALTER PROCEDURE dbo.sp_delete_user
+    @UserId INT,
+    @ExpectedVersion BIGINT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DELETE FROM dbo.users
+    OUTPUT deleted.id INTO dbo.users_deleted (id)
+    OUTPUT deleted.id, deleted.name, deleted.email, CAST(deleted.row_ver AS BIGINT) AS version
+    WHERE id = @UserId
+      AND (@ExpectedVersion IS NULL OR row_ver = CAST(@ExpectedVersion AS BINARY(8)));
+END
+GO
+
+-- Keyset (seek) pagination over the primary key: the plan is a clustered
+-- index seek on id, so the cost of a page does not grow with its position.
+-- The page is followed by the high-water mark of committed changes, which
+-- is the page's ETag: any insert, update or delete moves it. It is read
+-- before the rows, so a change committing meanwhile can only make the ETag
+-- older than the page (one extra 200 later), never newer.
+CREATE OR ALTER PROCEDURE dbo.sp_get_users_page
+    @Limit INT,
+    @AfterId INT = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DECLARE @Version BIGINT = CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1;
 
-    -- Return the updated row (or nothing if id not found)
-    SELECT id, name, email
+    SELECT TOP (@Limit) id, name, email
     FROM dbo.users
-    WHERE id = @UserId;
+    WHERE id > ISNULL(@AfterId, 0)
+    ORDER BY id;
+
+    SELECT @Version AS version;
 END
+GO
 
-CREATE PROCEDURE dbo.sp_delete_user
-    @UserId INT
+-- Just the high-water mark, to answer If-None-Match without reading a page
+CREATE OR ALTER PROCEDURE dbo.sp_get_users_version
 AS
 BEGIN
     SET NOCOUNT ON;
+    SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1 AS version;
+END
+GO
 
-    DELETE FROM dbo.users
-    WHERE id = @UserId;
+-- A page of users filtered and sorted, followed by the high-water mark of
+-- committed changes (the page's ETag, as in sp_get_users_page).
+--   @Email       exact match (seek on IX_users_email)
+--   @NamePrefix  name starts with (seek on IX_users_name)
+--   @Q           name or email starts with (two seeks); an infix match
+--                (LIKE '%x%') can never seek, so it is deliberately not offered
+--   @Sort        id, name or email; @Descending reverses it
+--   @AfterKey/@AfterId  keyset position: sort value and id of the last row
+--   @Fields      columns to return (see fn_user_columns); the projection is
+--                narrowed in SQL, so unrequested columns are never read into
+--                the result, sent over the wire or mapped
+-- Only whitelisted fragments are concatenated and every value stays a
+-- parameter, so each combination of filters gets its own cached, sargable
+-- plan instead of one catch-all plan full of (@X IS NULL OR ...) scans.
+CREATE OR ALTER PROCEDURE dbo.sp_search_users
+    @Limit INT,
+    @Q NVARCHAR(120) = NULL,
+    @Email NVARCHAR(120) = NULL,
+    @NamePrefix NVARCHAR(100) = NULL,
+    @Sort NVARCHAR(10) = N'id',
+    @Descending BIT = 0,
+    @AfterKey NVARCHAR(120) = NULL,
+    @AfterId INT = NULL,
+    @Fields NVARCHAR(100) = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    IF @Sort NOT IN (N'id', N'name', N'email')
+        THROW 50001, 'Invalid sort column', 1;
+
+    DECLARE @Version BIGINT = CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1;
+    DECLARE @Op NVARCHAR(2) = CASE WHEN @Descending = 1 THEN N'<' ELSE N'>' END;
+    DECLARE @Dir NVARCHAR(4) = CASE WHEN @Descending = 1 THEN N'DESC' ELSE N'ASC' END;
+    -- Prefix patterns with LIKE wildcards escaped, so user input stays literal
+    DECLARE @NamePattern NVARCHAR(210) = REPLACE(REPLACE(REPLACE(REPLACE(
+        @NamePrefix, N'\', N'\\'), N'%', N'\%'), N'_', N'\_'), N'[', N'\[') + N'%';
+    DECLARE @QPattern NVARCHAR(250) = REPLACE(REPLACE(REPLACE(REPLACE(
+        @Q, N'\', N'\\'), N'%', N'\%'), N'_', N'\_'), N'[', N'\[') + N'%';
+
+    DECLARE @Sql NVARCHAR(MAX) = N'SELECT TOP (@Limit) ' + dbo.fn_user_columns(@Fields, @Sort)
+                                 + N' FROM dbo.users WHERE 1 = 1';
+    IF @Email IS NOT NULL
+        SET @Sql += N' AND email = @Email';
+    IF @NamePrefix IS NOT NULL
+        SET @Sql += N' AND name LIKE @NamePattern ESCAPE ''\''';
+    IF @Q IS NOT NULL
+        SET @Sql += N' AND (name LIKE @QPattern ESCAPE ''\'' OR email LIKE @QPattern ESCAPE ''\'')';
+    IF @AfterId IS NOT NULL
+        -- (key, id) > (@AfterKey, @AfterId), written so the key comparison can seek
+        SET @Sql += CASE WHEN @Sort = N'id' THEN N' AND id ' + @Op + N' @AfterId'
+                         ELSE N' AND ' + @Sort + N' ' + @Op + N'= @AfterKey AND (' + @Sort + N' ' + @Op
+                              + N' @AfterKey OR id ' + @Op + N' @AfterId)' END;
+    SET @Sql += N' ORDER BY ' + CASE WHEN @Sort = N'id' THEN N'' ELSE @Sort + N' ' + @Dir + N', ' END
+                + N'id ' + @Dir;
+
+    EXEC sp_executesql @Sql,
+        N'@Limit INT, @Email NVARCHAR(120), @NamePattern NVARCHAR(210), @QPattern NVARCHAR(250),
+          @AfterKey NVARCHAR(120), @AfterId INT',
+        @Limit, @Email, @NamePattern, @QPattern, @AfterKey, @AfterId;
+
+    SELECT @Version AS version;
+END
+GO
+
+-- Rows and tombstones changed after @Since, oldest first, followed by a
+-- second result set with the high-water mark a caller may resume from once it
+-- has consumed every row, and the version tombstones were pruned through.
+-- Versions at or above MIN_ACTIVE_ROWVERSION() may still belong to open
+-- transactions that could commit after this read, so they are held back
+-- until the next call.
+CREATE OR ALTER PROCEDURE dbo.sp_get_user_changes
+    @Since BIGINT = NULL,
+    @Limit INT = 1000
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @From BINARY(8) = CAST(ISNULL(@Since, 0) AS BINARY(8));
+    DECLARE @Until BINARY(8) = MIN_ACTIVE_ROWVERSION();
+
+    SELECT TOP (@Limit) id, name, email, version, is_deleted
+    FROM (
+        SELECT id, name, email, CAST(row_ver AS BIGINT) AS version, CAST(0 AS BIT) AS is_deleted
+        FROM dbo.users
+        WHERE row_ver > @From AND row_ver < @Until
+        UNION ALL
+        -- Without @Since the caller has no copy yet, so deletions are moot
+        SELECT id, NULL, NULL, CAST(row_ver AS BIGINT), CAST(1 AS BIT)
+        FROM dbo.users_deleted
+        WHERE @Since IS NOT NULL AND row_ver > @From AND row_ver < @Until
+    ) AS changes
+    ORDER BY version;
+
+    SELECT CAST(@Until AS BIGINT) - 1 AS high_water, pruned_through
+    FROM dbo.users_deleted_horizon;
+END
+GO
 
-    -- Return a small status so caller knows if delete happened
-    SELECT @@ROWCOUNT AS RowsAffected;
+-- Tombstone retention: removes tombstones older than @RetentionDays and moves
+-- the horizon past them. Clients polling more often than that never notice;
+-- older tokens get a full sync. Run it daily, e.g. from a SQL Server Agent job:
+--     EXEC dbo.sp_prune_user_tombstones @RetentionDays = 30;
+CREATE OR ALTER PROCEDURE dbo.sp_prune_user_tombstones
+    @RetentionDays INT = 30
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @Pruned TABLE (version BIGINT NOT NULL);
+
+    BEGIN TRANSACTION;
+
+    DELETE FROM dbo.users_deleted
+    OUTPUT CAST(deleted.row_ver AS BIGINT) INTO @Pruned (version)
+    WHERE deleted_at < DATEADD(DAY, -@RetentionDays, SYSUTCDATETIME());
+
+    UPDATE dbo.users_deleted_horizon
+    SET pruned_through = (SELECT MAX(version) FROM @Pruned)
+    WHERE EXISTS (SELECT 1 FROM @Pruned);
+
+    COMMIT TRANSACTION;
+
+    SELECT COUNT(*) AS pruned FROM @Pruned;
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_get_login
+    @Username NVARCHAR(100)
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SELECT id, password
+    FROM dbo.logins
+    WHERE username = @Username;
 END
+GO
+
+-- With @ExpectedPassword, only replaces that exact stored value, so a rehash
+-- on login never overwrites a password changed in the meantime
+CREATE OR ALTER PROCEDURE dbo.sp_set_login_password
+    @LoginId INT,
+    @Password NVARCHAR(255),
+    @ExpectedPassword NVARCHAR(255) = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
 
+    UPDATE dbo.logins
+    SET password = @Password
+    WHERE id = @LoginId
+      AND (@ExpectedPassword IS NULL OR password COLLATE Latin1_General_BIN2 = @ExpectedPassword);
+
+    SELECT @@ROWCOUNT AS updated;
+END
+GO